@@ -4,14 +4,68 @@ Uses Inside Airbnb dataset for Montreal.
 """
 
 import os
+import hashlib
+import json
+import re
+import tempfile
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
-import requests
 from datetime import datetime
 import pickle
 
+from http_cache import cached_session
+
+# Bundled data directory (Inside Airbnb snapshot, property storage)
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# Seconds a downloaded Inside Airbnb snapshot stays fresh with HTTP_CACHE_MODE=cache
+DOWNLOAD_CACHE_TTL = 7 * 24 * 3600
+
+# Inside Airbnb page linking every published snapshot, and the Montreal
+# snapshot used until a newer one has been downloaded
+SNAPSHOT_INDEX_URL = os.getenv('AIRBNB_SNAPSHOT_INDEX_URL', 'https://insideairbnb.com/get-the-data/')
+DEFAULT_SNAPSHOT_URL = "http://data.insideairbnb.com/canada/qc/montreal/2024-06-23/data/listings.csv.gz"
+SNAPSHOT_URL_PATTERN = re.compile(
+    r'https?://[^\s"\'<>]+/canada/qc/montreal/(\d{4}-\d{2}-\d{2})/data/listings\.csv\.gz'
+)
+# Seconds the snapshot index page stays fresh with HTTP_CACHE_MODE=cache
+SNAPSHOT_INDEX_CACHE_TTL = 12 * 3600
+
+# Downloaded snapshot and its metadata ({'url', 'date', 'downloaded_at'}), in the data directory
+SNAPSHOT_FILE = "montreal_airbnb_listings.csv.gz"
+SNAPSHOT_INFO_FILE = "montreal_airbnb_snapshot.json"
+
+
+def snapshot_info(data_dir):
+    """Get the metadata of the downloaded snapshot, or {} if none was downloaded."""
+    try:
+        with open(os.path.join(data_dir, SNAPSHOT_INFO_FILE), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def find_latest_snapshot():
+    """
+    Find the newest Montreal listings snapshot linked from the Inside Airbnb index.
+
+    Returns:
+        Tuple (date, url), dates being YYYY-MM-DD strings
+
+    Raises:
+        RuntimeError: If the index has no Montreal snapshot
+        requests.RequestException: If the index can't be fetched
+    """
+    response = cached_session(ttl=SNAPSHOT_INDEX_CACHE_TTL).get(SNAPSHOT_INDEX_URL, timeout=30)
+    response.raise_for_status()
+    snapshots = {match.group(1): match.group(0) for match in SNAPSHOT_URL_PATTERN.finditer(response.text)}
+    if not snapshots:
+        raise RuntimeError(f"No Montreal snapshot linked from {SNAPSHOT_INDEX_URL}")
+    latest = max(snapshots)
+    return latest, snapshots[latest]
+
 
 class AirbnbAnalyzer:
     def __init__(self, data_dir='../data'):
@@ -21,28 +75,43 @@ class AirbnbAnalyzer:
         self.scaler = None
         self.avg_price_per_bedroom = {}
         self.dataset_loaded = False
+        self.model_version = None
 
-    def download_airbnb_data(self):
+    def download_airbnb_data(self, url=None):
         """
         Download Inside Airbnb dataset for Montreal.
         Dataset URL: http://data.insideairbnb.com/canada/qc/montreal/
+
+        Args:
+            url: Snapshot to download; defaults to the one downloaded last,
+                or DEFAULT_SNAPSHOT_URL
+
+        Returns:
+            Path of the downloaded file, or None if the download failed
         """
         print("Downloading Inside Airbnb data for Montreal...")
 
-        # Inside Airbnb Montreal dataset URL (latest)
-        # Note: Update the date to the latest available
-        base_url = "http://data.insideairbnb.com/canada/qc/montreal/2024-06-23/data/"
-        listings_file = "listings.csv.gz"
-
-        url = base_url + listings_file
-        output_path = os.path.join(self.data_dir, "montreal_airbnb_listings.csv.gz")
+        url = url or snapshot_info(self.data_dir).get('url') or DEFAULT_SNAPSHOT_URL
+        output_path = os.path.join(self.data_dir, SNAPSHOT_FILE)
 
         try:
-            response = requests.get(url, timeout=30)
+            response = cached_session(ttl=DOWNLOAD_CACHE_TTL).get(url, timeout=30)
             response.raise_for_status()
 
-            with open(output_path, 'wb') as f:
+            # Replace the file in one step, other processes may be reading it
+            fd, tmp_path = tempfile.mkstemp(dir=self.data_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
                 f.write(response.content)
+            os.replace(tmp_path, output_path)
+
+            match = SNAPSHOT_URL_PATTERN.match(url)
+            info = {
+                'url': url,
+                'date': match.group(1) if match else None,
+                'downloaded_at': datetime.now().isoformat()
+            }
+            with open(os.path.join(self.data_dir, SNAPSHOT_INFO_FILE), 'w') as f:
+                json.dump(info, f)
 
             print(f"Downloaded data to {output_path}")
             return output_path
@@ -51,6 +120,26 @@ class AirbnbAnalyzer:
             print("Will use sample data for demonstration")
             return None
 
+    def check_for_new_snapshot(self):
+        """
+        Download the newest Montreal snapshot if it is newer than the local one.
+
+        Returns:
+            dict: {'updated': bool, 'date': newest date, 'previous': local date or None}
+
+        Raises:
+            RuntimeError: If the index or the download fails
+        """
+        previous = snapshot_info(self.data_dir).get('date')
+        date, url = find_latest_snapshot()
+        local_file = os.path.exists(os.path.join(self.data_dir, SNAPSHOT_FILE))
+        if local_file and previous is not None and previous >= date:
+            return {'updated': False, 'date': date, 'previous': previous}
+
+        if self.download_airbnb_data(url) is None:
+            raise RuntimeError(f"Failed to download the {date} snapshot")
+        return {'updated': True, 'date': date, 'previous': previous}
+
     def load_data(self, filepath=None):
         """Load and preprocess Airbnb data."""
         if filepath is None:
@@ -167,9 +256,22 @@ class AirbnbAnalyzer:
         self.model = RandomForestRegressor(n_estimators=100, random_state=42, max_depth=10)
         self.model.fit(X_scaled, y)
 
+        # Identify the model by its training data so restarts on the same
+        # snapshot report the same version
+        data_hash = pd.util.hash_pandas_object(df[features + ['price']], index=False)
+        self.model_version = hashlib.sha1(data_hash.values.tobytes()).hexdigest()[:12]
+
         print("Model trained successfully")
 
-        # Calculate average price per bedroom for simple estimation
+        self.compute_price_averages(df)
+
+    def compute_price_averages(self, df):
+        """
+        Calculate average price per bedroom for simple estimation.
+
+        This is cheap compared to training and is all predict_nightly_rate
+        needs to serve estimates while the model is not available.
+        """
         self.avg_price_per_bedroom = df.groupby('bedrooms')['price'].mean().to_dict()
 
     def predict_nightly_rate(self, bedrooms, bathrooms=1, sqft=None, latitude=45.5017, longitude=-73.5673):
@@ -201,6 +303,42 @@ class AirbnbAnalyzer:
 
         return max(50, predicted_price)  # Minimum $50/night
 
+    def predict_nightly_rates(self, bedrooms, bathrooms, latitudes, longitudes):
+        """
+        Predict nightly Airbnb rates for many properties in one model call.
+
+        Args:
+            bedrooms: Sequence of bedroom counts
+            bathrooms: Sequence of bathroom counts
+            latitudes: Sequence of property latitudes
+            longitudes: Sequence of property longitudes
+
+        Returns:
+            numpy array of predicted nightly rates, in input order
+        """
+        bedrooms = np.asarray(bedrooms, dtype=float)
+        if len(bedrooms) == 0:
+            return np.empty(0)
+
+        # Estimate accommodates based on bedrooms
+        accommodates = bedrooms * 2 + 1
+
+        if self.model and self.scaler:
+            features = np.column_stack([
+                bedrooms,
+                np.asarray(bathrooms, dtype=float),
+                accommodates,
+                np.asarray(latitudes, dtype=float),
+                np.asarray(longitudes, dtype=float)
+            ])
+            predicted_prices = self.model.predict(self.scaler.transform(features))
+        else:
+            predicted_prices = np.array([
+                self.avg_price_per_bedroom.get(count, 150) for count in bedrooms.tolist()
+            ], dtype=float)
+
+        return np.maximum(50, predicted_prices)  # Minimum $50/night
+
     def forecast_annual_revenue(self, nightly_rate, occupancy_rate=0.65):
         """
         Forecast annual Airbnb revenue.
@@ -243,13 +381,30 @@ class AirbnbAnalyzer:
             'estimated_occupied_nights': round(365 * 0.65)
         }
 
+    def analyze_properties(self, bedrooms, bathrooms, latitudes, longitudes):
+        """
+        Vectorized version of analyze_property.
+
+        Returns:
+            Dictionary with nightly_rate, monthly_revenue and annual_revenue
+            arrays aligned with the inputs, plus the scalar occupancy figures
+        """
+        nightly_rates = self.predict_nightly_rates(bedrooms, bathrooms, latitudes, longitudes)
+        annual_revenues = self.forecast_annual_revenue(nightly_rates)
+        monthly_revenues = annual_revenues / 12
+
+        return {
+            'nightly_rate': np.round(nightly_rates, 2),
+            'monthly_revenue': np.round(monthly_revenues, 2),
+            'annual_revenue': np.round(annual_revenues, 2),
+            'occupancy_rate': 0.65,
+            'estimated_occupied_nights': round(365 * 0.65)
+        }
+
 
 def initialize_analyzer():
     """Initialize and prepare the Airbnb analyzer."""
-    # Determine the correct data directory path
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    data_dir = os.path.join(current_dir, 'data')
-    analyzer = AirbnbAnalyzer(data_dir=data_dir)
+    analyzer = AirbnbAnalyzer(data_dir=DATA_DIR)
 
     # Try to load existing data
     df = analyzer.load_data()
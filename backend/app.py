@@ -2,42 +2,371 @@
 Flask API for Montreal Real Estate Investment Analyzer.
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+import csv
+import heapq
+import io
+import json
 import os
+import tempfile
+import threading
+import time
+import numpy as np
 from dotenv import load_dotenv
 
 from centris_apify import CentrisApify
 from mortgage_calculator import MortgageCalculator, InvestmentAnalyzer
-from airbnb_analyzer import AirbnbAnalyzer, initialize_analyzer
+from airbnb_analyzer import AirbnbAnalyzer, DATA_DIR, snapshot_info
 from property_storage import PropertyStorage
+from job_manager import JobManager
+from listing_enricher import ListingEnricher
+from pipeline import Pipeline, format_stats
+from scheduler import JobSkipped, Scheduler
+from metrics import metrics
 
 load_dotenv()
 
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider that records serialization time as a pipeline stage."""
+
+    def dumps(self, obj, **kwargs):
+        with metrics.timer('cashflow_stage_duration_seconds', stage='serialization'):
+            return super().dumps(obj, **kwargs)
+
+
 app = Flask(__name__)
+app.json = TimedJSONProvider(app)
 CORS(app)
 
 # Initialize components
 mortgage_calc = MortgageCalculator()
 investment_analyzer = InvestmentAnalyzer()
-airbnb_analyzer = None
-property_storage = PropertyStorage()
-
-# Cache for analyzed properties
-analyzed_properties = []
+# Serves the default nightly rate until warmup publishes a better analyzer
+airbnb_analyzer = AirbnbAnalyzer(data_dir=DATA_DIR)
+property_storage = PropertyStorage(
+    os.getenv('STORAGE_PATH') or None,
+    backend=os.getenv('STORAGE_BACKEND', 'json'),
+    history_file=os.getenv('PRICE_HISTORY_PATH') or None
+)
+job_manager = JobManager(max_workers=int(os.getenv('JOB_WORKERS', '2')))
+scheduler = Scheduler()
+
+# Cache of the last /api/analyze result (an AnalyzedPortfolio), and the
+# (storage version, model version) it was built from when it came from storage
+analyzed_portfolio = None
+analyzed_portfolio_key = None
+
+# Inside Airbnb snapshot date the current model was trained on (None for the bundled data)
+loaded_snapshot_date = None
+
+# Progress of the background warmup, reported by the health endpoints
+warmup_state = {
+    'status': 'starting',  # starting -> warming -> ready, or failed
+    'phase': None,
+    'phase_seconds': {},
+    'total_seconds': None,
+    'model': 'default_rate',  # default_rate -> price_per_bedroom -> random_forest
+    'error': None
+}
+
+# Listings per vectorized prediction/financing pass when streaming
+ANALYSIS_BATCH_SIZE = int(os.getenv('ANALYSIS_BATCH_SIZE', '200'))
+
+# Maximum number of properties accepted by /api/forecast/batch
+FORECAST_BATCH_LIMIT = int(os.getenv('FORECAST_BATCH_LIMIT', '5000'))
+
+# Best analyses returned in full by a scrape job with analyze=true
+SCRAPE_TOP_RESULTS = int(os.getenv('SCRAPE_TOP_RESULTS', '100'))
+
+# Rows written per storage transaction by /api/admin/properties/bulk
+BULK_IMPORT_BATCH_SIZE = int(os.getenv('BULK_IMPORT_BATCH_SIZE', '1000'))
+
+# Periodic jobs, off unless SCHEDULER_ENABLED=true; an interval of 0 disables a job
+SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+REFRESH_INTERVAL = float(os.getenv('REFRESH_INTERVAL', str(6 * 3600)))
+REFRESH_MAX_LISTINGS = int(os.getenv('REFRESH_MAX_LISTINGS', '10000'))
+# Largest share of the stored listings a scheduled refresh may remove as delisted
+REFRESH_MAX_REMOVED_FRACTION = float(os.getenv('REFRESH_MAX_REMOVED_FRACTION', '0.1'))
+AIRBNB_CHECK_INTERVAL = float(os.getenv('AIRBNB_CHECK_INTERVAL', str(24 * 3600)))
+CACHE_WARM_INTERVAL = float(os.getenv('CACHE_WARM_INTERVAL', '300'))
+
+# Bounds of the limit and days parameters of /api/price-drops
+PRICE_DROPS_LIMIT = 500
+PRICE_DROPS_MAX_DAYS = 3650
+
+
+def _run_startup_phase(name, func):
+    """Run one warmup phase, recording and logging how long it took."""
+    start = time.perf_counter()
+    warmup_state['phase'] = name
+    result = func()
+    elapsed = time.perf_counter() - start
+    warmup_state['phase_seconds'][name] = round(elapsed, 3)
+    print(f"Startup phase '{name}' took {elapsed:.2f}s")
+    return result
 
 
 def initialize_app():
-    """Initialize the application components."""
-    global airbnb_analyzer
+    """
+    Initialize the application components.
+
+    The Airbnb analyzer is published in two steps: first a fallback that
+    estimates nightly rates from the average price per bedroom, then the
+    fully trained model. Each step swaps in a new analyzer object, so
+    requests never see a half-trained model.
+    """
+    global airbnb_analyzer, loaded_snapshot_date
     print("Initializing Airbnb Analyzer...")
-    airbnb_analyzer = initialize_analyzer()
-    print("Application initialized successfully")
+    start = time.perf_counter()
+    warmup_state['status'] = 'warming'
+
+    try:
+        loaded_snapshot_date = snapshot_info(DATA_DIR).get('date')
+        fallback = AirbnbAnalyzer(data_dir=DATA_DIR)
+        df = _run_startup_phase('load_data', fallback.load_data)
+        _run_startup_phase('price_averages', lambda: fallback.compute_price_averages(df))
+        airbnb_analyzer = fallback
+        warmup_state['model'] = 'price_per_bedroom'
+
+        trained = AirbnbAnalyzer(data_dir=DATA_DIR)
+        trained.dataset_loaded = fallback.dataset_loaded
+        _run_startup_phase('train_model', lambda: trained.train_revenue_model(df))
+        airbnb_analyzer = trained
+        warmup_state['model'] = 'random_forest'
+        warmup_state['status'] = 'ready'
+    except Exception as e:
+        warmup_state['status'] = 'failed'
+        warmup_state['error'] = str(e)
+        print(f"Error initializing application: {str(e)}")
+        return
+
+    warmup_state['phase'] = None
+    warmup_state['total_seconds'] = round(time.perf_counter() - start, 3)
+    print(f"Application initialized successfully in {warmup_state['total_seconds']:.2f}s")
+    if SCHEDULER_ENABLED:
+        scheduler.run_now('cache_warmup')
 
 
-# Initialize components when module is imported (for gunicorn)
+# Initialize components in the background when the module is imported (for
+# gunicorn), so health checks and routes respond while the model trains
 print("Initializing application components...")
-initialize_app()
+warmup_thread = threading.Thread(target=initialize_app, name='warmup', daemon=True)
+warmup_thread.start()
+
+
+class AnalyzedPortfolio:
+    """
+    Investment analyses of a set of listings, kept as columns.
+
+    Forecasts and investment metrics are computed for every listing in one
+    vectorized pass and ranked with numpy; the nested analysis dicts are
+    only built for the rows a response actually returns.
+    """
+
+    def __init__(self, listings, rows, prices, bedrooms, bathrooms, latitudes, longitudes,
+                 annual_taxes=None, annual_condo_fees=None):
+        """
+        Analyze listings from their numeric columns.
+
+        Args:
+            listings: Sequence of listing dicts
+            rows: Indices of the analyzed listings, aligned with the arrays
+            prices, bedrooms, bathrooms, latitudes, longitudes: float arrays
+            annual_taxes, annual_condo_fees: Optional float arrays of costs
+                known from detail pages, NaN where the defaults apply
+        """
+        self.listings = listings
+        self.rows = np.asarray(rows, dtype=int)
+        self.ranking_columns = {}
+        self._forecast_columns = self._metric_columns = self._cost_columns = {}
+
+        if len(self.rows):
+            # Forecast Airbnb revenue with location data, then calculate mortgage, costs and returns
+            with metrics.timer('cashflow_stage_duration_seconds', stage='prediction'):
+                forecasts = airbnb_analyzer.analyze_properties(bedrooms, bathrooms, latitudes, longitudes)
+            with metrics.timer('cashflow_stage_duration_seconds', stage='financing'):
+                monthly_costs = mortgage_calc.calculate_total_monthly_costs_batch(
+                    prices, annual_taxes, annual_condo_fees
+                )
+                investments = investment_analyzer.analyze_investments(
+                    prices, forecasts['monthly_revenue'], monthly_costs
+                )
+
+            self.ranking_columns = {key: value for key, value in investments.items() if key != 'monthly_costs'}
+            self._forecast_columns = _to_columns(forecasts)
+            self._metric_columns = _to_columns(investments)
+            self._cost_columns = self._metric_columns.pop('monthly_costs')
+
+        self.positions = {
+            str(listings[row].get('centris_id')): position
+            for position, row in enumerate(self.rows.tolist())
+        }
+        # Best cash-on-cash return first; the base order for other rankings
+        self.order = np.arange(len(self.rows))
+        self.order = self.ranking('cash_on_cash_return')
+
+    @classmethod
+    def from_listings(cls, listings):
+        """
+        Analyze listing dicts, skipping those with invalid numbers.
+
+        Returns:
+            Tuple (portfolio, errors) where errors maps listing indices to messages
+        """
+        errors = {}
+        values = []
+        for index, listing in enumerate(listings):
+            try:
+                values.append((
+                    index,
+                    float(listing.get('price')),
+                    float(listing.get('bedrooms', 2)),
+                    float(listing.get('bathrooms', 1)),
+                    float(listing.get('latitude', 45.5017)),  # Default Montreal coords
+                    float(listing.get('longitude', -73.5673)),
+                    _optional_float(listing.get('municipal_taxes')),
+                    _optional_float(listing.get('school_taxes')),
+                    _optional_float(listing.get('condo_fees'))
+                ))
+            except (TypeError, ValueError) as e:
+                errors[index] = f"Invalid listing data: {str(e)}"
+
+        columns = [np.array(column, dtype=float) for column in zip(*values)] if values else [np.array([])] * 9
+        rows, prices, bedrooms, bathrooms, latitudes, longitudes, municipal, school, condo_fees = columns
+        return cls(listings, rows.astype(int), prices, bedrooms, bathrooms, latitudes, longitudes,
+                   total_annual_taxes(municipal, school), condo_fees), errors
+
+    @classmethod
+    def from_columns(cls, listings, columns, rows=None):
+        """
+        Analyze stored properties straight from their columnar mirror.
+
+        Args:
+            listings: Stored property dicts, aligned with columns
+            columns: PortfolioColumns from PropertyStorage.get_portfolio()
+            rows: Optional row numbers to analyze (e.g. from select_rows)
+        """
+        rows = np.arange(len(listings)) if rows is None else np.asarray(rows, dtype=int)
+        rows = rows[~np.isnan(columns.price[rows])]  # Listings without a price can't be analyzed
+
+        def filled(column, default):
+            values = column[rows]
+            return np.where(np.isnan(values), default, values)
+
+        return cls(
+            listings, rows,
+            columns.price[rows],
+            filled(columns.bedrooms, 2),
+            filled(columns.bathrooms, 1),
+            filled(columns.latitude, 45.5017),  # Default Montreal coords
+            filled(columns.longitude, -73.5673),
+            total_annual_taxes(columns.municipal_taxes[rows], columns.school_taxes[rows]),
+            columns.condo_fees[rows]
+        )
+
+    def __len__(self):
+        return len(self.rows)
+
+    def ranking(self, sort_by='cash_on_cash_return', descending=True):
+        """
+        Order positions by an investment metric, starting from self.order.
+
+        Ties keep their order, and an unknown metric leaves the order as is.
+        """
+        values = self.ranking_columns.get(sort_by)
+        if values is None or not len(self.order):
+            return self.order
+        values = values[self.order]
+        return self.order[np.argsort(-values if descending else values, kind='stable')]
+
+    def analysis(self, position):
+        """Build the analysis dict of the listing at a position."""
+        listing = self.listings[self.rows[position]]
+        airbnb_forecast = {key: _column_value(value, position)
+                           for key, value in self._forecast_columns.items()}
+        investment_metrics = {key: values[position] for key, values in self._metric_columns.items()}
+        investment_metrics['monthly_costs'] = {key: values[position]
+                                               for key, values in self._cost_columns.items()}
+
+        # Combine all data
+        return {
+            'listing': listing,
+            'airbnb_forecast': airbnb_forecast,
+            'investment_analysis': investment_metrics,
+            'summary': {
+                'address': listing.get('address'),
+                'price': listing.get('price'),
+                'centris_url': listing.get('url'),
+                'image_url': listing.get('image_url'),
+                'down_payment': investment_metrics['down_payment'],
+                'monthly_mortgage': investment_metrics['monthly_costs']['mortgage'],
+                'monthly_revenue': airbnb_forecast['monthly_revenue'],
+                'monthly_cashflow': investment_metrics['monthly_cashflow'],
+                'cash_on_cash_return': investment_metrics['cash_on_cash_return'],
+                'cap_rate': investment_metrics['cap_rate'],
+                'bedrooms': listing.get('bedrooms', 2),
+                'bathrooms': listing.get('bathrooms', 1),
+                'sqft': listing.get('sqft')
+            }
+        }
+
+    def page(self, order, offset=0, limit=None):
+        """Build the analysis dicts for one page of an ordering."""
+        end = None if limit is None else offset + limit
+        return [self.analysis(position) for position in order[offset:end].tolist()]
+
+
+def analyze_listings(listings):
+    """
+    Analyze a batch of listings with one vectorized prediction and financing pass.
+
+    Args:
+        listings: List of property dictionaries from Centris
+
+    Returns:
+        Tuple (analyses, errors). analyses is aligned with listings and holds
+        None for any listing that could not be analyzed; errors maps those
+        indices to an error message.
+    """
+    portfolio, errors = AnalyzedPortfolio.from_listings(listings)
+    analyses = [None] * len(listings)
+    for position, index in enumerate(portfolio.rows.tolist()):
+        analyses[index] = portfolio.analysis(position)
+    return analyses, errors
+
+
+def _optional_float(value):
+    """Convert an optional number, giving NaN when it is missing or invalid."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def total_annual_taxes(municipal, school):
+    """Add municipal and school taxes per listing; NaN where neither is known."""
+    municipal = np.asarray(municipal, dtype=float)
+    school = np.asarray(school, dtype=float)
+    return np.where(np.isnan(municipal) & np.isnan(school), np.nan,
+                    np.nan_to_num(municipal) + np.nan_to_num(school))
+
+
+def _to_columns(values):
+    """Convert numpy arrays in a (possibly nested) dict to plain Python lists."""
+    return {
+        key: _to_columns(value) if isinstance(value, dict)
+        else value.tolist() if isinstance(value, np.ndarray)
+        else value
+        for key, value in values.items()
+    }
+
+
+def _column_value(value, position):
+    """Pick one row from a column, passing scalar fields through unchanged."""
+    return value[position] if isinstance(value, list) else value
 
 
 def analyze_listing(listing):
@@ -50,79 +379,42 @@ def analyze_listing(listing):
     Returns:
         Dictionary with complete investment analysis
     """
-    price = listing.get('price')
-    bedrooms = listing.get('bedrooms', 2)
-    bathrooms = listing.get('bathrooms', 1)
-    sqft = listing.get('sqft')
-    latitude = listing.get('latitude', 45.5017)  # Default Montreal coords
-    longitude = listing.get('longitude', -73.5673)
-
-    # Calculate mortgage and costs
-    down_payment = mortgage_calc.calculate_down_payment(price)
-    monthly_costs = mortgage_calc.calculate_total_monthly_costs(price)
-
-    # Forecast Airbnb revenue with location data
-    airbnb_forecast = airbnb_analyzer.analyze_property(
-        bedrooms=bedrooms,
-        bathrooms=bathrooms,
-        sqft=sqft,
-        price=price,
-        latitude=latitude,
-        longitude=longitude
-    )
-
-    monthly_revenue = airbnb_forecast['monthly_revenue']
+    analyses, errors = analyze_listings([listing])
+    if errors:
+        raise ValueError(errors[0])
+    return analyses[0]
 
-    # Calculate investment metrics
-    investment_metrics = investment_analyzer.analyze_investment(
-        price=price,
-        monthly_revenue=monthly_revenue,
-        monthly_costs_breakdown=monthly_costs
-    )
-
-    # Combine all data
-    result = {
-        'listing': listing,
-        'airbnb_forecast': airbnb_forecast,
-        'investment_analysis': investment_metrics,
-        'summary': {
-            'address': listing.get('address'),
-            'price': price,
-            'centris_url': listing.get('url'),
-            'image_url': listing.get('image_url'),
-            'down_payment': investment_metrics['down_payment'],
-            'monthly_mortgage': investment_metrics['monthly_costs']['mortgage'],
-            'monthly_revenue': monthly_revenue,
-            'monthly_cashflow': investment_metrics['monthly_cashflow'],
-            'cash_on_cash_return': investment_metrics['cash_on_cash_return'],
-            'cap_rate': investment_metrics['cap_rate'],
-            'bedrooms': bedrooms,
-            'bathrooms': bathrooms,
-            'sqft': sqft
-        }
-    }
 
-    return result
+def iter_unique_listings(listings):
+    """Yield listings, skipping duplicate Centris IDs."""
+    seen_ids = set()
+    for listing in listings:
+        centris_id = str(listing.get('centris_id'))
+        if centris_id in seen_ids:
+            continue  # Skip duplicates
+        seen_ids.add(centris_id)
+        yield listing
 
 
-@app.route('/api/health', methods=['GET'])
-def health_check():
-    """Health check endpoint."""
-    return jsonify({
-        'status': 'healthy',
-        'airbnb_analyzer_ready': airbnb_analyzer is not None
-    })
+def iter_listing_batches(listings, batch_size=ANALYSIS_BATCH_SIZE):
+    """Yield lists of at most batch_size listings."""
+    batch = []
+    for listing in listings:
+        batch.append(listing)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
 
-@app.route('/api/analyze', methods=['POST'])
-def analyze_properties():
+def load_listings_for_analysis(data):
     """
-    Analyze properties from Centris and return investment opportunities.
-    Optionally accepts a list of properties to analyze.
-    """
-    global analyzed_properties
+    Collect the listings an analysis request asks for.
 
-    data = request.get_json() or {}
+    Stored properties are used by default; sample or freshly scraped listings
+    are only used when explicitly requested via use_stored=False.
+    """
     use_sample = data.get('use_sample', True)
     use_stored = data.get('use_stored', True)  # Use stored properties by default
     max_listings = data.get('max_listings', 10)
@@ -151,54 +443,229 @@ def analyze_properties():
                 print("Scraping failed")
                 listings = []
 
-    # Analyze each listing (avoid duplicates)
-    analyzed_properties = []
-    seen_ids = set()
+    return listings
 
-    for listing in listings:
-        try:
-            centris_id = str(listing.get('centris_id'))
-            if centris_id in seen_ids:
-                continue  # Skip duplicates
 
-            seen_ids.add(centris_id)
-            analysis = analyze_listing(listing)
-            analyzed_properties.append(analysis)
-        except Exception as e:
-            print(f"Error analyzing listing {listing.get('address')}: {str(e)}")
-            continue
+def analysis_source(data):
+    """Describe where analyzed listings came from."""
+    use_stored = data.get('use_stored', True)
+    return 'stored' if use_stored and property_storage.get_property_count() > 0 else 'sample'
 
-    # Sort by cash-on-cash return (best opportunities first)
-    analyzed_properties.sort(
-        key=lambda x: x['investment_analysis']['cash_on_cash_return'],
-        reverse=True
-    )
+
+@app.before_request
+def start_request_timer():
+    """Remember when the request started for the latency histogram."""
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Record request count and latency per route."""
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('cashflow_http_request_duration_seconds', time.perf_counter() - start,
+                        {'method': request.method, 'route': route})
+        metrics.inc('cashflow_http_requests_total',
+                    {'method': request.method, 'route': route, 'status': response.status_code})
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Expose metrics in Prometheus text format."""
+    gauges = [
+        ('cashflow_model_info', {
+            'model': warmup_state['model'],
+            'version': airbnb_analyzer.model_version or 'none'
+        }, 1),
+        ('cashflow_portfolio_size', None, property_storage.get_property_count())
+    ]
+
+    # Hit ratios are derived from the aggregated lookup counters
+    lookups = {}
+    for key, value in metrics.counter_totals('cashflow_cache_requests_total').items():
+        labels = dict(key)
+        hits, total = lookups.get(labels['cache'], (0, 0))
+        lookups[labels['cache']] = (hits + (value if labels['result'] == 'hit' else 0), total + value)
+    for cache, (hits, total) in sorted(lookups.items()):
+        gauges.append(('cashflow_cache_hit_ratio', {'cache': cache}, hits / total if total else 0.0))
+
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/health', methods=['GET'])
+def health_check():
+    """Health check endpoint."""
+    return jsonify({
+        'status': 'healthy' if warmup_state['status'] == 'ready' else warmup_state['status'],
+        'airbnb_analyzer_ready': warmup_state['status'] == 'ready',
+        'model': warmup_state['model'],
+        'warmup': warmup_state
+    })
+
+
+@app.route('/api/health/live', methods=['GET'])
+def liveness_check():
+    """Liveness probe: the process is up and serving requests."""
+    return jsonify({'status': 'alive'})
+
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    """
+    Readiness probe: 200 once the trained model is serving, 503 while
+    warming up (fallback estimates only) or after a failed warmup.
+    """
+    ready = warmup_state['status'] == 'ready'
+    return jsonify({
+        'ready': ready,
+        'status': warmup_state['status'],
+        'model': warmup_state['model'],
+        'phase': warmup_state['phase'],
+        'error': warmup_state['error']
+    }), 200 if ready else 503
+
+
+def _is_non_negative_int(value):
+    """Whether a JSON value is an integer >= 0 (booleans are not integers here)."""
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+@app.route('/api/analyze', methods=['POST'])
+def analyze_properties():
+    """
+    Analyze properties from Centris and return investment opportunities.
+    Optionally accepts a list of properties to analyze.
+
+    Stored properties are analyzed straight from the storage columns and can
+    be screened with min_price, max_price and bedrooms. Results are ranked by
+    cash-on-cash return; offset and limit select the page to return.
+    """
+    global analyzed_portfolio, analyzed_portfolio_key
+
+    data = request.get_json() or {}
+    offset = data.get('offset')
+    offset = 0 if offset is None else offset
+    limit = data.get('limit')
+    for name, value in (('offset', offset), ('limit', limit)):
+        if value is not None and not _is_non_negative_int(value):
+            return jsonify({
+                'success': False,
+                'error': f'Field "{name}" must be a non-negative integer'
+            }), 400
+
+    # Read before the listings, so changes made meanwhile are not skipped by /api/changes
+    version = property_storage.get_version()
+    stored, columns = property_storage.get_portfolio() if data.get('use_stored', True) else ((), None)
+
+    # Analyze every listing in one vectorized pass
+    if stored:
+        print(f"Loaded {len(stored)} properties from storage")
+        rows = property_storage.select_rows(
+            columns,
+            min_price=data.get('min_price'),
+            max_price=data.get('max_price'),
+            bedrooms=data.get('bedrooms')
+        )
+        portfolio = AnalyzedPortfolio.from_columns(stored, columns, rows)
+    else:
+        listings = list(iter_unique_listings(load_listings_for_analysis(data)))
+        portfolio, errors = AnalyzedPortfolio.from_listings(listings)
+        for index, error in errors.items():
+            print(f"Error analyzing listing {listings[index].get('address')}: {error}")
+
+    # Best opportunities first; dicts are only built for the requested page
+    analyzed_portfolio = portfolio
+    analyzed_portfolio_key = (version, airbnb_analyzer.model_version) if stored else None
+    properties = portfolio.page(portfolio.order, offset, limit)
 
     return jsonify({
         'success': True,
-        'count': len(analyzed_properties),
-        'properties': analyzed_properties,
-        'source': 'stored' if use_stored and property_storage.get_property_count() > 0 else 'sample'
+        'count': len(properties),
+        'total': len(portfolio),
+        'properties': properties,
+        'source': analysis_source(data),
+        'version': version
     })
 
 
+@app.route('/api/analyze/stream', methods=['POST'])
+def analyze_properties_stream():
+    """
+    Stream property analyses as newline-delimited JSON.
+
+    Each listing is emitted as a {"type": "property", ...} line as soon as its
+    batch has been analyzed. A final {"type": "summary", ...} line carries the
+    count and the ranking (Centris IDs by cash-on-cash return, best first).
+    Only the ranking keys are kept in memory, not the analyses themselves.
+    """
+    data = request.get_json() or {}
+    listings = load_listings_for_analysis(data)
+    source = analysis_source(data)
+
+    def generate():
+        ranking = []
+
+        for batch in iter_listing_batches(iter_unique_listings(listings)):
+            analyses, errors = analyze_listings(batch)
+            for index, analysis in enumerate(analyses):
+                if analysis is None:
+                    print(f"Error analyzing listing {batch[index].get('address')}: {errors[index]}")
+                    continue
+
+                ranking.append((
+                    analysis['investment_analysis']['cash_on_cash_return'],
+                    str(analysis['listing'].get('centris_id'))
+                ))
+                yield app.json.dumps({'type': 'property', 'property': analysis}) + '\n'
+
+        ranking.sort(key=lambda entry: entry[0], reverse=True)
+        yield app.json.dumps({
+            'type': 'summary',
+            'success': True,
+            'count': len(ranking),
+            'ranking': [centris_id for _, centris_id in ranking],
+            'source': source
+        }) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 @app.route('/api/properties', methods=['GET'])
 def get_properties():
-    """Get all analyzed properties."""
+    """
+    Get the analyzed properties, sorted by an investment metric.
+    Optional query parameters: sort_by, order (asc or desc), offset, limit.
+    """
     sort_by = request.args.get('sort_by', 'cash_on_cash_return')
     order = request.args.get('order', 'desc')
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', type=int)
+    for name, value in (('offset', offset), ('limit', limit)):
+        if value is not None and value < 0:
+            return jsonify({
+                'success': False,
+                'error': f'Query parameter "{name}" must be a non-negative integer'
+            }), 400
 
-    # Sort properties
-    sorted_properties = sorted(
-        analyzed_properties,
-        key=lambda x: x['investment_analysis'].get(sort_by, 0),
-        reverse=(order == 'desc')
-    )
+    if analyzed_portfolio is None:
+        return jsonify({
+            'success': True,
+            'count': 0,
+            'total': 0,
+            'properties': []
+        })
+
+    # Sort the metric column, then build dicts for the page only
+    ranking = analyzed_portfolio.ranking(sort_by, descending=(order == 'desc'))
+    properties = analyzed_portfolio.page(ranking, offset, limit)
 
     return jsonify({
         'success': True,
-        'count': len(sorted_properties),
-        'properties': sorted_properties
+        'count': len(properties),
+        'total': len(analyzed_portfolio),
+        'properties': properties
     })
 
 
@@ -206,28 +673,30 @@ def get_properties():
 def get_property(centris_id):
     """Get a single property by Centris ID."""
     # First check the cache
-    for prop in analyzed_properties:
-        if str(prop['listing'].get('centris_id')) == str(centris_id):
+    portfolio = analyzed_portfolio
+    position = portfolio.positions.get(str(centris_id)) if portfolio is not None else None
+    if position is not None:
+        metrics.inc('cashflow_cache_requests_total', {'cache': 'analyzed_properties', 'result': 'hit'})
+        return jsonify({
+            'success': True,
+            'property': portfolio.analysis(position)
+        })
+    metrics.inc('cashflow_cache_requests_total', {'cache': 'analyzed_properties', 'result': 'miss'})
+
+    # If not in cache, try to fetch from storage and analyze it
+    listing = property_storage.get_property(centris_id)
+    if listing is not None:
+        try:
+            analysis = analyze_listing(listing)
             return jsonify({
                 'success': True,
-                'property': prop
+                'property': analysis
             })
-
-    # If not in cache, try to fetch from storage and analyze it
-    stored_properties = property_storage.get_all_properties()
-    for listing in stored_properties:
-        if str(listing.get('centris_id')) == str(centris_id):
-            try:
-                analysis = analyze_listing(listing)
-                return jsonify({
-                    'success': True,
-                    'property': analysis
-                })
-            except Exception as e:
-                return jsonify({
-                    'success': False,
-                    'error': f'Error analyzing property: {str(e)}'
-                }), 500
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': f'Error analyzing property: {str(e)}'
+            }), 500
 
     return jsonify({
         'success': False,
@@ -235,46 +704,399 @@ def get_property(centris_id):
     }), 404
 
 
+@app.route('/api/property/<centris_id>/history', methods=['GET'])
+def get_property_history(centris_id):
+    """Get a property's price and status changes, oldest first."""
+    history = property_storage.get_history(centris_id)
+    if not history:
+        return jsonify({
+            'success': False,
+            'error': f'No history for property {centris_id}'
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'centris_id': str(centris_id),
+        'count': len(history),
+        'history': history
+    })
+
+
+@app.route('/api/price-drops', methods=['GET'])
+def get_price_drops():
+    """
+    Get the listings whose price fell the most recently.
+    Optional query parameters: days (default 7) and limit (default 20).
+    """
+    days = request.args.get('days', 7, type=int)
+    limit = request.args.get('limit', 20, type=int)
+    if days is None or not 1 <= days <= PRICE_DROPS_MAX_DAYS:
+        return jsonify({
+            'success': False,
+            'error': f'Query parameter "days" must be between 1 and {PRICE_DROPS_MAX_DAYS}'
+        }), 400
+    if limit is None or not 1 <= limit <= PRICE_DROPS_LIMIT:
+        return jsonify({
+            'success': False,
+            'error': f'Query parameter "limit" must be between 1 and {PRICE_DROPS_LIMIT}'
+        }), 400
+
+    drops = property_storage.get_price_drops(days, limit)
+    for drop in drops:
+        drop['property'] = property_storage.get_property(drop['centris_id'])
+
+    return jsonify({
+        'success': True,
+        'days': days,
+        'count': len(drops),
+        'drops': drops
+    })
+
+
+@app.route('/api/changes', methods=['GET'])
+def get_changes():
+    """
+    Get stored properties changed after a version, with fresh analyses.
+
+    Query parameter `since` is the `version` of an earlier response from
+    /api/analyze, /api/admin/properties or /api/changes. Returns the
+    properties added or updated since then (`upserts`) with their
+    `analyses`, the Centris IDs deleted since then (`deletes`, to apply
+    first: an ID deleted and added again is in both) and the current
+    `version` to pass next time. If `since` is newer than the store
+    (e.g. it was recreated), or older than the deletes the store still
+    remembers (see STORAGE_TOMBSTONE_RETENTION), `full_resync` is true and
+    the client should reload everything.
+    """
+    since = request.args.get('since', type=int)
+    if since is None or since < 0:
+        return jsonify({
+            'success': False,
+            'error': 'Query parameter "since" must be a non-negative integer version'
+        }), 400
+
+    changes = property_storage.get_changes(since)
+    if since > changes['version'] or since < changes['pruned_version']:
+        return jsonify({
+            'success': True,
+            'full_resync': True,
+            'since': since,
+            'version': changes['version'],
+            'upserts': [],
+            'analyses': [],
+            'deletes': []
+        })
+
+    analyses, errors = analyze_listings(changes['upserts'])
+    for index, error in errors.items():
+        print(f"Error analyzing listing {changes['upserts'][index].get('address')}: {error}")
+
+    return jsonify({
+        'success': True,
+        'full_resync': False,
+        'since': since,
+        'version': changes['version'],
+        'upserts': changes['upserts'],
+        'analyses': [analysis for analysis in analyses if analysis is not None],
+        'deletes': changes['deletes']
+    })
+
+
+def run_scrape_job(report_progress, max_listings=10, store=False, analyze=False, complete=False,
+                   enrich=False, top=SCRAPE_TOP_RESULTS, max_removed_fraction=None):
+    """
+    Fetch Centris listings via Apify, optionally storing and analyzing them.
+
+    Runs on the job manager's thread pool; report_progress(message) updates
+    the job status seen by /api/jobs/<job_id>.
+
+    Storing or analyzing streams the scrape through a staged pipeline
+    (fetch -> parse -> normalize -> geocode -> upsert -> predict -> rank),
+    each stage on its own thread with bounded buffers in between, so a
+    large refresh never holds more than a few pages in memory. Listings are
+    then not echoed back: the result counts them, reports per-stage
+    throughput under 'stages', and with analyze=True ranks every analyzed
+    listing by cash-on-cash return ('ranking', ids only) and includes the
+    `top` best analyses in full under 'properties'.
+
+    When storing, listings are compared with the stored ones by content
+    hash: only new and changed listings are written and analyzed, and the
+    result's 'ingest' summary counts new, changed, unchanged and removed
+    listings. With complete=True the scrape is taken to cover the whole
+    market, so stored listings it didn't return are removed, but only
+    after a clean scrape: any error fetching the scrape fails the job, and
+    nothing is removed if a listing failed to store or the scrape stopped
+    at max_listings. max_removed_fraction caps the share of the stored
+    listings one scrape may remove; a scrape that would remove more is
+    suspect (e.g. a run that succeeded with too few items) and removes
+    nothing. A skipped removal is reported under 'removal_skipped'
+    ('max_listings', 'store_errors' or 'too_many_removed').
+
+    With enrich=True each listing's detail page is fetched (concurrently,
+    see listing_enricher.py) for its coordinates, taxes and condo fees,
+    which storage keeps and the analysis uses instead of the estimates;
+    the result's 'enrichment' counts the pages fetched and failed. When
+    storing, only new and changed listings are enriched; the others, and
+    later ingests without enrich, keep the stored details.
+    """
+    print(f"Fetching Centris listings via Apify (max {max_listings})...")
+    centris_scraper = CentrisApify()
+    # A failed run or page fails the job rather than passing for a shorter, finished scrape
+    pages = centris_scraper.iter_item_pages(max_results=max_listings, progress_callback=report_progress,
+                                            strict=True)
+
+    enricher = ListingEnricher() if enrich else None
+
+    if not store and not analyze:
+        listings = [listing for items in pages for listing in centris_scraper.parse_items(items)]
+        if not listings:
+            raise RuntimeError('Failed to fetch listings from Centris API')
+        result = {
+            'count': len(listings),
+            'listings': listings
+        }
+        if enricher:
+            report_progress(f"Fetching details of {len(listings)} listings")
+            enricher.enrich_listings(listings)
+            enricher.close()
+            result['enrichment'] = enricher.stats
+        return result
+
+    # Each counter is only updated by one stage's thread
+    seen_ids = set()
+    analyzed_ids = set()
+    hashes = {}
+    store_errors = []
+    ingest = {'new': 0, 'changed': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+    best = []  # Min-heap of (cash_on_cash_return, -sequence, analysis), at most `top` long
+    ranking = []  # (cash_on_cash_return, sequence, centris_id) of every analyzed listing
+
+    def parse(items):
+        listings = centris_scraper.parse_items(items)
+        seen_ids.update(str(listing.get('centris_id')) for listing in listings)
+        return listings
+
+    def normalize(listings):
+        results = property_storage.prepare_batch(listings, skip_unchanged=True, hashes=hashes)
+        changed = []
+        for result in results:
+            if not result['success']:
+                ingest['failed'] += 1
+                store_errors.append({
+                    'centris_id': listings[result['row']].get('centris_id'),
+                    'error': result['error']
+                })
+            elif 'property' in result:
+                changed.append(result['property'])
+            else:
+                ingest['unchanged'] += 1
+        return changed
+
+    def geocode(properties):
+        property_storage.geocode_missing(properties)
+        return properties
+
+    def upsert(properties):
+        created = property_storage.write_properties(properties)
+        ingest['new'] += sum(created)
+        ingest['changed'] += len(created) - sum(created)
+        return properties
+
+    def predict(listings):
+        unique = [listing for listing in iter_unique_listings(listings)
+                  if str(listing.get('centris_id')) not in analyzed_ids]
+        analyzed_ids.update(str(listing.get('centris_id')) for listing in unique)
+        analyses, _ = analyze_listings(unique)
+        return [analysis for analysis in analyses if analysis is not None]
+
+    def rank(analyses):
+        for analysis in analyses:
+            score = analysis['investment_analysis']['cash_on_cash_return']
+            sequence = len(ranking)
+            ranking.append((score, sequence, str(analysis['listing'].get('centris_id'))))
+            if top > 0:
+                entry = (score, -sequence, analysis)
+                if len(best) < top:
+                    heapq.heappush(best, entry)
+                elif entry[:2] > best[0][:2]:
+                    heapq.heapreplace(best, entry)
+
+    def fetch_details(listings):
+        return enricher.enrich_listings(listings)
+
+    # When storing, only new and changed listings reach the enrich stage, so a
+    # refresh fetches detail pages for the churn rather than the whole market
+    stages = [('parse', parse)]
+    if store:
+        stages.append(('normalize', normalize))
+    if enrich:
+        stages.append(('enrich', fetch_details))
+    if store:
+        stages += [('geocode', geocode), ('upsert', upsert)]
+    if analyze:
+        stages.append(('predict', predict))
+
+    def sink(batch):
+        if analyze:
+            rank(batch)
+        message = f"Parsed {pipeline.stats[1].items_out} listings"
+        if store:
+            message += f", stored {ingest['new'] + ingest['changed']}"
+        if analyze:
+            message += f", analyzed {len(ranking)}"
+        report_progress(message)
+
+    pipeline = Pipeline(pages, stages, name='scrape')
+    try:
+        stats = pipeline.run(sink, sink_name='rank' if analyze else 'done')
+    finally:
+        if enricher:
+            enricher.close()
+    print(f"Scrape pipeline finished in {pipeline.elapsed():.2f}s:\n{format_stats(stats)}")
+
+    count = stats[1]['items_out']  # Listings out of the parse stage
+    if not count:
+        raise RuntimeError('Failed to fetch listings from Centris API')
+
+    result = {
+        'count': count,
+        'stages': stats
+    }
+
+    if enricher:
+        result['enrichment'] = enricher.stats
+
+    if store:
+        if complete and count >= max_listings:
+            # The scrape stopped at max_listings, so it may have missed listings still for sale
+            print(f"Not removing unseen listings: the scrape hit max_listings ({max_listings})")
+            result['removal_skipped'] = 'max_listings'
+        elif complete and store_errors:
+            print(f"Not removing unseen listings: {len(store_errors)} listing(s) failed to store")
+            result['removal_skipped'] = 'store_errors'
+        elif complete:
+            limit = None
+            if max_removed_fraction is not None:
+                limit = int(property_storage.get_property_count() * max_removed_fraction)
+            removed = property_storage.remove_missing(seen_ids, limit=limit)
+            if removed is None:
+                print(f"Not removing unseen listings: more than {limit} would be removed")
+                result['removal_skipped'] = 'too_many_removed'
+            else:
+                ingest['removed'] = len(removed)
+        print(f"Ingested {count} listings: {ingest['new']} new, {ingest['changed']} changed, "
+              f"{ingest['unchanged']} unchanged, {ingest['removed']} removed")
+        result['stored'] = ingest['new'] + ingest['changed']
+        result['store_errors'] = store_errors
+        result['ingest'] = ingest
+
+    if analyze:
+        ranking.sort(key=lambda entry: (-entry[0], entry[1]))
+        result['ranking'] = [centris_id for _, _, centris_id in ranking]
+        result['properties'] = [analysis for _, _, analysis in sorted(best, key=lambda entry: (-entry[0], -entry[1]))]
+
+    return result
+
+
+def _parse_positive_int(value):
+    """Coerce a JSON value such as 50 or "50" to an integer >= 1, or None if it isn't one."""
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return None
+    return number if number >= 1 else None
+
+
 @app.route('/api/scrape', methods=['POST'])
 def scrape_centris():
-    """Fetch fresh listings from Centris API."""
+    """
+    Start a background job fetching fresh listings from Centris.
+
+    Returns a job id immediately; poll /api/jobs/<job_id> for progress and
+    results. Pass store=true to save the listings and analyze=true to
+    rank them by investment return in the job result (with store=true,
+    only new and changed listings are written and analyzed). Either one
+    streams the scrape through the staged pipeline of run_scrape_job, and
+    the job result then reports per-stage throughput instead of echoing
+    the listings back. Pass complete=true with store=true when the scrape
+    covers the whole market, to remove stored listings that are no longer
+    listed. Pass enrich=true to fetch each listing's detail page for its
+    coordinates, taxes and condo fees, used instead of the estimates.
+    """
     data = request.get_json() or {}
-    max_listings = data.get('max_listings', 10)
+    max_listings = _parse_positive_int(data.get('max_listings', 10))
+    if max_listings is None:
+        return jsonify({
+            'success': False,
+            'error': 'Field "max_listings" must be a positive integer'
+        }), 400
 
-    print(f"Fetching Centris listings via Apify (max {max_listings})...")
-    centris_scraper = CentrisApify()
-    listings = centris_scraper.search_properties(max_results=max_listings)
+    job = job_manager.submit(
+        'scrape',
+        run_scrape_job,
+        max_listings=max_listings,
+        store=bool(data.get('store', False)),
+        analyze=bool(data.get('analyze', False)),
+        complete=bool(data.get('complete', False)),
+        enrich=bool(data.get('enrich', False))
+    )
+
+    return jsonify({
+        'success': True,
+        'job_id': job['id'],
+        'status': job['status'],
+        'status_url': f"/api/jobs/{job['id']}"
+    }), 202
+
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """List background jobs (without their results)."""
+    jobs = job_manager.list_jobs()
+    return jsonify({
+        'success': True,
+        'count': len(jobs),
+        'jobs': jobs
+    })
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get the status, progress and result of a background job."""
+    job = job_manager.get_job(job_id)
 
-    if not listings:
+    if job is None:
         return jsonify({
             'success': False,
-            'error': 'Failed to fetch listings from Centris API'
-        }), 500
+            'error': 'Job not found'
+        }), 404
 
     return jsonify({
         'success': True,
-        'count': len(listings),
-        'listings': listings
+        'job': job
     })
 
 
-@app.route('/api/forecast', methods=['POST'])
-def forecast_property():
+FORECAST_REQUIRED_FIELDS = ['bedrooms', 'price']
+FORECAST_NUMERIC_FIELDS = ['price', 'bedrooms', 'bathrooms', 'sqft', 'latitude', 'longitude']
+
+
+def build_forecast_listing(data):
     """
-    Forecast revenue for a custom property.
-    Expects: bedrooms, bathrooms, price, sqft (optional)
+    Create a listing object for a custom property forecast.
+
+    Returns:
+        Tuple (listing, error); listing is None when a required field is missing
     """
-    data = request.get_json()
+    if not isinstance(data, dict):
+        return None, 'Property must be a JSON object'
 
-    required_fields = ['bedrooms', 'price']
-    for field in required_fields:
-        if field not in data:
-            return jsonify({
-                'success': False,
-                'error': f'Missing required field: {field}'
-            }), 400
+    for field in FORECAST_REQUIRED_FIELDS:
+        if field not in data or data[field] in (None, ''):
+            return None, f'Missing required field: {field}'
 
-    # Create a listing object
     listing = {
         'price': data['price'],
         'bedrooms': data['bedrooms'],
@@ -284,6 +1106,65 @@ def forecast_property():
         'url': '#'
     }
 
+    # Location and known yearly costs are optional; analyze_listings falls
+    # back to downtown Montreal and the estimated taxes and maintenance
+    for field in ('latitude', 'longitude', 'municipal_taxes', 'school_taxes', 'condo_fees'):
+        if data.get(field) not in (None, ''):
+            listing[field] = data[field]
+
+    return listing, None
+
+
+def _parse_csv_number(value):
+    """Convert a CSV cell to int or float, leaving blanks and text untouched."""
+    if value is None or value.strip() == '':
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return int(number) if number.is_integer() else number
+
+
+def read_forecast_batch():
+    """
+    Read the properties of a batch forecast request.
+
+    Accepts a JSON array, a JSON object with a "properties" array, or a CSV
+    body (Content-Type: text/csv) with a header row.
+    """
+    if request.mimetype == 'text/csv':
+        reader = csv.DictReader(io.StringIO(request.get_data(as_text=True)))
+        return [
+            {
+                field: _parse_csv_number(value) if field in FORECAST_NUMERIC_FIELDS else value
+                for field, value in row.items()
+                if field is not None
+            }
+            for row in reader
+        ]
+
+    data = request.get_json()
+    if isinstance(data, dict):
+        data = data.get('properties')
+    return data
+
+
+@app.route('/api/forecast', methods=['POST'])
+def forecast_property():
+    """
+    Forecast revenue for a custom property.
+    Expects: bedrooms, bathrooms, price, sqft (optional)
+    """
+    data = request.get_json()
+
+    listing, error = build_forecast_listing(data)
+    if error:
+        return jsonify({
+            'success': False,
+            'error': error
+        }), 400
+
     try:
         analysis = analyze_listing(listing)
         return jsonify({
@@ -297,15 +1178,89 @@ def forecast_property():
         }), 500
 
 
+@app.route('/api/forecast/batch', methods=['POST'])
+def forecast_properties_batch():
+    """
+    Forecast revenue for many custom properties in one request.
+
+    Every property is validated up front, then all valid ones go through a
+    single vectorized prediction and financing pass. Results come back in
+    input order; invalid items carry an error instead of an analysis.
+    """
+    properties = read_forecast_batch()
+
+    if not isinstance(properties, list):
+        return jsonify({
+            'success': False,
+            'error': 'Expected a list of properties'
+        }), 400
+
+    if len(properties) > FORECAST_BATCH_LIMIT:
+        return jsonify({
+            'success': False,
+            'error': f'Too many properties: {len(properties)} (limit {FORECAST_BATCH_LIMIT})'
+        }), 400
+
+    # Validate everything first, keeping track of where each listing came from
+    errors = {}
+    listings = []
+    positions = []
+    for index, data in enumerate(properties):
+        listing, error = build_forecast_listing(data)
+        if error:
+            errors[index] = error
+        else:
+            listings.append(listing)
+            positions.append(index)
+
+    try:
+        analyses, analysis_errors = analyze_listings(listings)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+    results = [None] * len(properties)
+    for position, index in enumerate(positions):
+        if analyses[position] is None:
+            errors[index] = analysis_errors[position]
+        else:
+            results[index] = {'index': index, 'success': True, 'analysis': analyses[position]}
+    for index, error in errors.items():
+        results[index] = {'index': index, 'success': False, 'error': error}
+
+    return jsonify({
+        'success': True,
+        'count': len(results),
+        'succeeded': len(results) - len(errors),
+        'failed': len(errors),
+        'results': results
+    })
+
+
 @app.route('/api/admin/properties', methods=['GET'])
 def get_stored_properties():
-    """Get all stored properties from JSON storage."""
-    properties = property_storage.get_all_properties()
+    """
+    Get stored properties.
+    Optional query filters: min_price, max_price, bedrooms.
+    """
+    filters = {
+        'min_price': request.args.get('min_price', type=int),
+        'max_price': request.args.get('max_price', type=int),
+        'bedrooms': request.args.get('bedrooms', type=int)
+    }
+    version = property_storage.get_version()
+    if any(value is not None for value in filters.values()):
+        properties = property_storage.find_properties(**filters)
+    else:
+        properties = property_storage.get_all_properties()
     return jsonify({
         'success': True,
         'count': len(properties),
         'properties': properties,
-        'last_updated': property_storage.get_last_updated()
+        'last_updated': property_storage.get_last_updated(),
+        'version': version
     })
 
 
@@ -328,6 +1283,88 @@ def add_property():
         return jsonify(result), 400
 
 
+BULK_IMPORT_MIMETYPES = ('text/csv', 'application/x-ndjson', 'application/jsonl')
+
+# The WSGI input stream reads lines a byte at a time; buffer it in 64 KB chunks
+BULK_IMPORT_READ_BUFFER = 64 * 1024
+
+# Per-row results beyond this many characters are spooled to a temporary file
+BULK_IMPORT_SPOOL_SIZE = 1024 * 1024
+
+
+def iter_csv_rows(stream):
+    """Read property dicts from a CSV upload as it arrives, skipping blank cells."""
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    for row in csv.DictReader(text):
+        yield {
+            field: value for field, value in row.items()
+            if field is not None and value is not None and value.strip() != ''
+        }
+
+
+def iter_ndjson_rows(stream):
+    """Read property dicts from an NDJSON upload as it arrives, one per line."""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"Invalid JSON: {str(e)}")
+
+
+def iter_spooled_lines(spool):
+    """Stream the lines of a spooled results file, then close it."""
+    try:
+        spool.seek(0)
+        yield from spool
+    finally:
+        spool.close()
+
+
+@app.route('/api/admin/properties/bulk', methods=['POST'])
+def bulk_import_properties():
+    """
+    Add or update many properties from a CSV or NDJSON upload.
+
+    The body is parsed as it is read and written in batches of
+    BULK_IMPORT_BATCH_SIZE rows, one storage transaction each. Per-row
+    results are spooled to a temporary file (kept in memory while small),
+    so memory stays bounded however large the upload is. The whole upload
+    is read before responding; clients that send the full body before
+    reading the response would otherwise stall. The response is NDJSON:
+    one {"row": i, "success": ...} line per input row, then a
+    {"type": "summary", ...} line with the totals.
+    """
+    if request.mimetype not in BULK_IMPORT_MIMETYPES:
+        return jsonify({
+            'success': False,
+            'error': 'Send the properties as text/csv or application/x-ndjson'
+        }), 415
+
+    stream = io.BufferedReader(request.stream, BULK_IMPORT_READ_BUFFER)
+    if request.mimetype == 'text/csv':
+        rows = iter_csv_rows(stream)
+    else:
+        rows = iter_ndjson_rows(stream)
+
+    spool = tempfile.SpooledTemporaryFile(max_size=BULK_IMPORT_SPOOL_SIZE, mode='w+')
+    counts = {'created': 0, 'updated': 0, 'failed': 0}
+    for result in property_storage.add_properties(rows, batch_size=BULK_IMPORT_BATCH_SIZE):
+        counts[result['status'] if result['success'] else 'failed'] += 1
+        spool.write(app.json.dumps(result) + '\n')
+
+    spool.write(app.json.dumps({
+        'type': 'summary',
+        'success': counts['failed'] == 0,
+        'count': sum(counts.values()),
+        **counts
+    }) + '\n')
+
+    return Response(iter_spooled_lines(spool), mimetype='application/x-ndjson')
+
+
 @app.route('/api/admin/properties/<centris_id>', methods=['DELETE'])
 def delete_property(centris_id):
     """Delete a property from storage."""
@@ -356,21 +1393,178 @@ def get_storage_stats():
     })
 
 
+def reload_airbnb_model():
+    """
+    Train a model on the downloaded Inside Airbnb snapshot and swap it in.
+
+    Requests keep using the previous model until the new one is trained.
+    """
+    global airbnb_analyzer, loaded_snapshot_date
+    date = snapshot_info(DATA_DIR).get('date')
+    trained = AirbnbAnalyzer(data_dir=DATA_DIR)
+    df = trained.load_data()
+    trained.train_revenue_model(df)
+    airbnb_analyzer = trained
+    loaded_snapshot_date = date
+    warmup_state['model'] = 'random_forest'
+    print(f"Reloaded the revenue model on the {date} Inside Airbnb snapshot")
+
+
+def warm_caches():
+    """
+    Pre-build this process's caches so the first dashboard load is fast.
+
+    Retrains the model if another process downloaded a newer Inside Airbnb
+    snapshot, then analyzes every stored property and publishes the result
+    as the /api/properties cache, unless it is already current for the
+    storage and model versions. Building the portfolio also refreshes the
+    storage snapshot and its numeric columns.
+    """
+    global analyzed_portfolio, analyzed_portfolio_key
+    if warmup_state['status'] != 'ready':
+        raise JobSkipped('The revenue model is still loading')
+
+    if snapshot_info(DATA_DIR).get('date') != loaded_snapshot_date:
+        reload_airbnb_model()
+
+    version = property_storage.get_version()
+    key = (version, airbnb_analyzer.model_version)
+    if analyzed_portfolio is not None and analyzed_portfolio_key in (key, None):
+        # Current, or an analysis of listings that are not stored
+        raise JobSkipped('Caches are up to date')
+
+    stored, columns = property_storage.get_portfolio()
+    if not stored:
+        raise JobSkipped('No stored properties')
+    portfolio = AnalyzedPortfolio.from_columns(stored, columns)
+    analyzed_portfolio = portfolio
+    analyzed_portfolio_key = key
+    return {'version': version, 'model_version': key[1], 'properties': len(portfolio)}
+
+
+def _warm_caches_after(job):
+    """Warm this process's caches right after a job changed the data."""
+    try:
+        return warm_caches()
+    except JobSkipped as e:
+        print(f"Cache warmup after {job} skipped: {str(e)}")
+        return None
+
+
+def refresh_market():
+    """
+    Scheduled job: store a fresh scrape of the whole market, then warm the caches.
+
+    Delisted listings are only removed after a clean scrape (see
+    run_scrape_job), and never more than REFRESH_MAX_REMOVED_FRACTION of
+    the portfolio at once. A failed fetch raises; listings that failed to
+    store or a removal refused as too large fail the run too, so the
+    scheduler records them instead of a success.
+    """
+    if not os.getenv('APIFY_API_TOKEN'):
+        raise JobSkipped('APIFY_API_TOKEN is not set')
+    result = run_scrape_job(lambda message: None, max_listings=REFRESH_MAX_LISTINGS,
+                            store=True, complete=True, max_removed_fraction=REFRESH_MAX_REMOVED_FRACTION)
+    _warm_caches_after('centris_refresh')
+    summary = {
+        'count': result['count'],
+        'ingest': result['ingest'],
+        'store_errors': len(result['store_errors']),
+        'removal_skipped': result.get('removal_skipped')
+    }
+    if result['store_errors']:
+        raise RuntimeError(f"{len(result['store_errors'])} listing(s) failed to store, "
+                           f"nothing removed: {summary}")
+    if result.get('removal_skipped') == 'too_many_removed':
+        raise RuntimeError(f"Scrape would remove more than {REFRESH_MAX_REMOVED_FRACTION:.0%} "
+                           f"of the stored listings, nothing removed: {summary}")
+    return summary
+
+
+def check_airbnb_snapshot():
+    """Scheduled job: download a newer Inside Airbnb snapshot, retrain and warm the caches."""
+    result = airbnb_analyzer.check_for_new_snapshot()
+    if result['updated']:
+        reload_airbnb_model()
+        _warm_caches_after('airbnb_snapshot')
+    return result
+
+
+# Shared jobs run in one process at a time; caches are per process, so
+# every process warms its own
+scheduler.add('centris_refresh', refresh_market, REFRESH_INTERVAL)
+scheduler.add('airbnb_snapshot', check_airbnb_snapshot, AIRBNB_CHECK_INTERVAL)
+scheduler.add('cache_warmup', warm_caches, CACHE_WARM_INTERVAL, shared=False)
+if SCHEDULER_ENABLED:
+    scheduler.start()
+
+
+@app.route('/api/admin/scheduler', methods=['GET'])
+def get_scheduler_status():
+    """
+    Get the periodic jobs with their schedule and last run.
+
+    Shared jobs report the last run of any worker process (duration,
+    outcome, result or error); next_run and running_here are this
+    process's.
+    """
+    return jsonify({
+        'success': True,
+        'enabled': SCHEDULER_ENABLED,
+        'pid': os.getpid(),
+        'jobs': scheduler.status()
+    })
+
+
+@app.route('/api/admin/scheduler/<name>/run', methods=['POST'])
+def run_scheduled_job(name):
+    """Run a periodic job now, in the background; poll /api/admin/scheduler for the outcome."""
+    status = scheduler.run_now(name)
+    if status is None:
+        return jsonify({
+            'success': False,
+            'error': f"Unknown job: {name}"
+        }), 404
+    if status == 'running':
+        return jsonify({
+            'success': False,
+            'error': f"Job {name} is already running"
+        }), 409
+    return jsonify({
+        'success': True,
+        'job': name,
+        'status': status
+    }), 202
+
+
 if __name__ == '__main__':
     print("\nStarting Flask server on http://localhost:5001")
     print("API endpoints:")
     print("  GET  /api/health - Health check")
+    print("  GET  /api/health/live - Liveness probe")
+    print("  GET  /api/health/ready - Readiness probe (503 until the model is trained)")
+    print("  GET  /metrics - Prometheus metrics")
     print("  POST /api/analyze - Analyze properties from Centris")
+    print("  POST /api/analyze/stream - Stream analyses as NDJSON")
     print("  GET  /api/properties - Get all analyzed properties")
     print("  GET  /api/property/<id> - Get specific property")
-    print("  POST /api/scrape - Scrape fresh Centris listings")
+    print("  GET  /api/property/<id>/history - Price and status history of a property")
+    print("  GET  /api/price-drops?days=7 - Biggest recent price drops")
+    print("  GET  /api/changes?since=<version> - Properties changed since a version, re-analyzed")
+    print("  POST /api/scrape - Start a background Centris scrape job")
+    print("  GET  /api/jobs - List background jobs")
+    print("  GET  /api/jobs/<id> - Get job status and results")
     print("  POST /api/forecast - Forecast custom property")
+    print("  POST /api/forecast/batch - Forecast many custom properties (JSON or CSV)")
     print("\nAdmin endpoints:")
     print("  GET    /api/admin/properties - Get stored properties")
     print("  POST   /api/admin/properties - Add/update property")
+    print("  POST   /api/admin/properties/bulk - Import properties (CSV or NDJSON)")
     print("  DELETE /api/admin/properties/<id> - Delete property")
     print("  POST   /api/admin/properties/clear - Clear all properties")
     print("  GET    /api/admin/stats - Get storage statistics")
+    print("  GET    /api/admin/scheduler - Periodic jobs and their last runs")
+    print("  POST   /api/admin/scheduler/<job>/run - Run a periodic job now")
     print("\n")
 
     app.run(debug=True, host='0.0.0.0', port=5001)
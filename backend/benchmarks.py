@@ -0,0 +1,567 @@
+"""
+Benchmarks of the analysis hot paths on synthetic Montreal portfolios.
+
+Listings are generated rather than scraped: Inside Airbnb rows shaped like
+the real snapshot (raw "$120.00" prices, "1.5 baths" text, missing
+ratings, outliers) and Centris listings with addresses, coordinates, taxes
+and condo fees. Both are spread over Montreal neighbourhoods, with prices
+that depend on the neighbourhood and the size, so the model and the
+screens work on realistic data. The same seed always gives the same data.
+
+Each benchmark runs at every portfolio size: the Airbnb pipeline
+(load_data, train_revenue_model, predict_nightly_rate), analyze_listing,
+the /api/analyze handler through the Flask test client, and the
+PropertyStorage operations on a store of that size. A benchmark reports
+its best and mean wall time over a few runs and, in a separate traced run,
+the peak memory allocated (tracemalloc, which sees numpy and pandas
+buffers too). Per-call benchmarks also report the time per call.
+
+Results are written as JSON and compared with a stored baseline: a
+benchmark that got slower or allocates more than BENCHMARK_THRESHOLD
+(default 20%) beyond a small noise floor is reported as a regression, and
+the run exits with status 1. Baselines are per machine; record one with
+`baseline` before changing the code.
+
+    python benchmarks.py run [sizes] [--backend sqlite] [--no-memory] [--output file]
+    python benchmarks.py compare [results] [baseline]
+    python benchmarks.py baseline [results]   # store results as the baseline
+    python benchmarks.py generate <count> <file.csv.gz>   # write a synthetic Airbnb snapshot
+"""
+
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'benchmarks')
+BENCHMARK_RESULTS = os.path.join(BENCHMARK_DIR, 'latest.json')
+BENCHMARK_BASELINE = os.getenv('BENCHMARK_BASELINE') or os.path.join(BENCHMARK_DIR, 'baseline.json')
+
+# Portfolio sizes benchmarked by default
+BENCHMARK_SIZES = (1000, 10000, 100000)
+
+# Relative slowdown (or growth in peak memory) reported as a regression
+BENCHMARK_THRESHOLD = float(os.getenv('BENCHMARK_THRESHOLD', '0.2'))
+
+# Differences below these are noise, whatever the ratio
+MIN_SECONDS_DELTA = 0.005
+MIN_MEMORY_DELTA_MB = 1.0
+
+# Calls timed by the per-call benchmarks
+PREDICT_CALLS = 200
+ANALYZE_CALLS = 100
+LOOKUP_CALLS = 1000
+WRITE_CALLS = 20
+
+# (name, latitude, longitude, price factor, postal code prefix)
+NEIGHBOURHOODS = (
+    ('Ville-Marie', 45.5088, -73.5617, 1.30, 'H3B'),
+    ('Le Plateau-Mont-Royal', 45.5225, -73.5800, 1.15, 'H2J'),
+    ('Outremont', 45.5170, -73.6070, 1.25, 'H2V'),
+    ('Le Sud-Ouest', 45.4790, -73.5800, 1.05, 'H3J'),
+    ('Rosemont-La Petite-Patrie', 45.5440, -73.5900, 0.95, 'H1X'),
+    ('Côte-des-Neiges-Notre-Dame-de-Grâce', 45.4970, -73.6300, 0.95, 'H3S'),
+    ('Villeray-Saint-Michel-Parc-Extension', 45.5480, -73.6150, 0.90, 'H2R'),
+    ('Verdun', 45.4600, -73.5700, 0.90, 'H4G'),
+    ('Mercier-Hochelaga-Maisonneuve', 45.5450, -73.5450, 0.80, 'H1W'),
+)
+# Share of listings in each neighbourhood, downtown and the Plateau first
+NEIGHBOURHOOD_WEIGHTS = (0.22, 0.18, 0.04, 0.10, 0.12, 0.11, 0.09, 0.06, 0.08)
+
+STREETS = ('Rue Saint-Denis', 'Boulevard Saint-Laurent', 'Rue Sherbrooke Est', 'Avenue du Mont-Royal',
+           'Rue Ontario Est', 'Rue Wellington', 'Avenue Laurier Ouest', 'Rue Beaubien Est',
+           'Chemin de la Côte-des-Neiges', 'Rue Notre-Dame Ouest', 'Avenue Papineau', 'Rue Jarry Est')
+
+PROPERTY_TYPES = ('Condo', 'Condo', 'Condo', 'Duplex', 'Triplex', 'House')
+
+
+def _neighbourhoods(rng, count):
+    """Pick a neighbourhood per listing and scatter coordinates around its center."""
+    picks = rng.choice(len(NEIGHBOURHOODS), size=count, p=NEIGHBOURHOOD_WEIGHTS)
+    centers = np.array([(lat, lon, factor) for _, lat, lon, factor, _ in NEIGHBOURHOODS])[picks]
+    latitudes = np.round(centers[:, 0] + rng.normal(0, 0.007, count), 5)
+    longitudes = np.round(centers[:, 1] + rng.normal(0, 0.009, count), 5)
+    return picks, latitudes, longitudes, centers[:, 2]
+
+
+def generate_airbnb_listings(count, seed=42):
+    """
+    Generate an Inside Airbnb listings table for Montreal.
+
+    Like AirbnbAnalyzer._create_sample_data, but at any size and with the
+    snapshot's raw formats, so load_data's preprocessing does real work:
+    prices as "$1,234.00" strings, bathrooms as "1.5 baths" text, a few
+    missing bedrooms and ratings, unavailable listings and price outliers.
+
+    Returns:
+        DataFrame with the snapshot's columns
+    """
+    rng = np.random.default_rng(seed)
+    picks, latitudes, longitudes, factors = _neighbourhoods(rng, count)
+    bedrooms = rng.choice([0, 1, 2, 3, 4], size=count, p=[0.08, 0.42, 0.32, 0.13, 0.05]).astype(float)
+    bathrooms = np.minimum(1 + rng.choice([0, 0.5, 1], size=count, p=[0.7, 0.15, 0.15]) + bedrooms // 3, 4)
+    accommodates = np.maximum(1, bedrooms * 2 + rng.integers(-1, 3, size=count))
+    price = (55 + 42 * bedrooms + 18 * (bathrooms - 1)) * factors * rng.lognormal(0, 0.25, count)
+    outliers = rng.random(count) < 0.01
+    price[outliers] = rng.uniform(1000, 5000, outliers.sum())
+
+    bedrooms[rng.random(count) < 0.03] = np.nan
+    ratings = np.round(rng.uniform(3.8, 5.0, count), 2)
+    ratings[rng.random(count) < 0.15] = np.nan
+    availability = rng.integers(0, 366, size=count)
+
+    return pd.DataFrame({
+        'id': np.arange(count) + 10 ** 17,
+        'neighbourhood_cleansed': [NEIGHBOURHOODS[pick][0] for pick in picks],
+        'latitude': latitudes,
+        'longitude': longitudes,
+        'room_type': rng.choice(['Entire home/apt', 'Private room'], size=count, p=[0.8, 0.2]),
+        'accommodates': accommodates.astype(int),
+        'bathrooms_text': [f"{baths:g} bath" + ('s' if baths > 1 else '') for baths in bathrooms],
+        'bedrooms': bedrooms,
+        'price': [f"${value:,.2f}" for value in price],
+        'availability_365': availability,
+        'number_of_reviews': rng.integers(0, 400, size=count),
+        'review_scores_rating': ratings,
+    })
+
+
+def generate_centris_listings(count, seed=42, start_id=30000000):
+    """
+    Generate Centris listings for sale in Montreal, as stored by PropertyStorage.
+
+    Every listing has coordinates (so storing them never geocodes), and the
+    taxes and condo fees listing_enricher would add; plexes and houses have
+    no condo fees.
+
+    Returns:
+        List of listing dicts
+    """
+    rng = np.random.default_rng(seed + 1)
+    picks, latitudes, longitudes, factors = _neighbourhoods(rng, count)
+    bedrooms = rng.choice([1, 2, 3, 4, 5], size=count, p=[0.25, 0.38, 0.24, 0.09, 0.04])
+    bathrooms = 1 + (bedrooms >= 3) + (rng.random(count) < 0.15)
+    sqft = np.round(380 + 310 * bedrooms * rng.lognormal(0, 0.15, count), -1)
+    price = np.round(sqft * 520 * factors * rng.lognormal(0, 0.18, count), -3)
+    types = rng.choice(len(PROPERTY_TYPES), size=count)
+    numbers = rng.integers(100, 9999, size=count)
+    streets = rng.integers(0, len(STREETS), size=count)
+    postal = rng.integers(0, 10, size=(count, 3))
+
+    listings = []
+    for i in range(count):
+        centris_id = str(start_id + i)
+        _, _, _, _, prefix = NEIGHBOURHOODS[picks[i]]
+        property_type = PROPERTY_TYPES[types[i]]
+        listing = {
+            'centris_id': centris_id,
+            'address': f"{numbers[i]} {STREETS[streets[i]]}, Montréal, QC "
+                       f"{prefix} {postal[i, 0]}{chr(65 + postal[i, 1])}{postal[i, 2]}",
+            'price': int(price[i]),
+            'bedrooms': int(bedrooms[i]),
+            'bathrooms': int(bathrooms[i]),
+            'sqft': int(sqft[i]),
+            'property_type': property_type,
+            'url': f"https://www.centris.ca/en/condos~for-sale~montreal/{centris_id}",
+            'image_url': None,
+            'latitude': float(latitudes[i]),
+            'longitude': float(longitudes[i]),
+            'municipal_taxes': float(round(price[i] * 0.0068)),
+            'school_taxes': float(round(price[i] * 0.00095)),
+        }
+        if property_type == 'Condo':
+            listing['condo_fees'] = float(round(sqft[i] * 3.4, -1))
+        listings.append(listing)
+    return listings
+
+
+def measure(func, setup=None, repeat=3, memory=True, calls=None):
+    """
+    Time func over `repeat` runs, then trace one more run for its peak memory.
+
+    Args:
+        func: Callable run with the arguments setup returns
+        setup: Optional callable returning a tuple of arguments for func,
+            run (untimed) before every run
+        repeat: Timed runs
+        memory: Also trace a run with tracemalloc for its peak allocation
+        calls: Calls func makes per run, to report the time per call
+
+    Returns:
+        dict with seconds (best run), mean_seconds, runs, and peak_mb and
+        ms_per_call when measured
+    """
+    times = []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        gc.collect()
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+
+    result = {
+        'seconds': round(min(times), 6),
+        'mean_seconds': round(statistics.mean(times), 6),
+        'runs': repeat
+    }
+    if calls:
+        result['calls'] = calls
+        result['ms_per_call'] = round(min(times) / calls * 1000, 4)
+    if memory:
+        args = setup() if setup else ()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result['peak_mb'] = round(peak / 1e6, 3)
+    return result
+
+
+class BenchmarkRun:
+    def __init__(self, sizes=BENCHMARK_SIZES, backend='json', memory=True, seed=42):
+        """
+        Set up a benchmark run; nothing runs until run() is called.
+
+        Args:
+            sizes: Portfolio sizes to benchmark
+            backend: PropertyStorage backend, 'json' or 'sqlite'
+            memory: Measure peak memory (a traced run per benchmark)
+            seed: Seed of the synthetic listings
+        """
+        self.sizes = list(sizes)
+        self.backend = backend
+        self.memory = memory
+        self.seed = seed
+        self.results = {}
+        self.work_dir = None
+
+    def _record(self, name, size, func, setup=None, repeat=None, calls=None):
+        # Expensive benchmarks at 100k listings run once
+        repeat = repeat or (3 if size <= 10000 else 1)
+        result = measure(func, setup, repeat=repeat, memory=self.memory, calls=calls)
+        self.results.setdefault(name, {})[str(size)] = result
+        memory = f", peak {result['peak_mb']:.1f} MB" if 'peak_mb' in result else ''
+        per_call = f" ({result['ms_per_call']:.3f} ms/call)" if calls else ''
+        print(f"  {name:<32} {size:>7} {result['seconds']:>9.4f}s{per_call}{memory}")
+        return result
+
+    def _storage(self, name):
+        from property_storage import PropertyStorage
+
+        directory = os.path.join(self.work_dir, name)
+        os.makedirs(directory, exist_ok=True)
+        extension = 'db' if self.backend == 'sqlite' else 'json'
+        return PropertyStorage(os.path.join(directory, f"properties.{extension}"), backend=self.backend,
+                               history_file=os.path.join(directory, 'price_history.db'))
+
+    def _bench_airbnb(self, size):
+        """load_data, train_revenue_model and predict_nightly_rate on a snapshot of `size` rows."""
+        from airbnb_analyzer import AirbnbAnalyzer, SNAPSHOT_FILE
+
+        data_dir = os.path.join(self.work_dir, f"airbnb_{size}")
+        os.makedirs(data_dir, exist_ok=True)
+        generate_airbnb_listings(size, self.seed).to_csv(os.path.join(data_dir, SNAPSHOT_FILE),
+                                                         index=False, compression='gzip')
+
+        analyzer = AirbnbAnalyzer(data_dir=data_dir)
+        self._record('airbnb.load_data', size, analyzer.load_data)
+        df = analyzer.load_data()
+        self._record('airbnb.train_revenue_model', size, lambda: analyzer.train_revenue_model(df))
+
+        rng = np.random.default_rng(self.seed)
+        inputs = [(int(bedrooms), int(bathrooms), float(lat), float(lon)) for bedrooms, bathrooms, lat, lon in zip(
+            rng.integers(1, 5, PREDICT_CALLS), rng.integers(1, 3, PREDICT_CALLS),
+            rng.uniform(45.45, 45.56, PREDICT_CALLS), rng.uniform(-73.65, -73.53, PREDICT_CALLS)
+        )]
+
+        def predict():
+            for bedrooms, bathrooms, latitude, longitude in inputs:
+                analyzer.predict_nightly_rate(bedrooms, bathrooms, latitude=latitude, longitude=longitude)
+
+        self._record('airbnb.predict_nightly_rate', size, predict, calls=PREDICT_CALLS)
+        return analyzer
+
+    def _bench_storage(self, size, listings):
+        """Every PropertyStorage operation on a store of `size` listings."""
+        runs = iter(range(1000))
+
+        def empty_store():
+            return (self._storage(f"ingest_{size}_{next(runs)}"),)
+
+        def ingest(storage, skip_unchanged=False):
+            results = list(storage.add_properties(listings, skip_unchanged=skip_unchanged))
+            failed = [result for result in results if not result['success']]
+            if failed:
+                raise RuntimeError(f"Ingest failed: {failed[0]['error']}")
+
+        self._record('storage.add_properties', size, ingest, setup=empty_store)
+
+        storage = self._storage(f"store_{size}")
+        ingest(storage)
+        self._record('storage.add_properties_unchanged', size,
+                     lambda: ingest(storage, skip_unchanged=True))
+
+        def cold_store():
+            return (self._storage(f"store_{size}"),)
+
+        self._record('storage.get_all_properties', size, lambda store: store.get_all_properties(),
+                     setup=cold_store)
+
+        def loaded_store():
+            store = self._storage(f"store_{size}")
+            store.get_all_properties()
+            return (store,)
+
+        self._record('storage.get_portfolio', size, lambda store: store.get_portfolio(), setup=loaded_store)
+        storage.get_portfolio()
+        self._record('storage.find_properties', size,
+                     lambda: storage.find_properties(min_price=400000, max_price=700000, bedrooms=2))
+
+        ids = [listing['centris_id'] for listing in listings]
+        lookups = [ids[(i * 7919) % len(ids)] for i in range(LOOKUP_CALLS)]
+        self._record('storage.get_property', size,
+                     lambda: [storage.get_property(centris_id) for centris_id in lookups], calls=LOOKUP_CALLS)
+
+        version = storage.get_version()
+        new_listings = iter(generate_centris_listings(WRITE_CALLS * 4, self.seed + 7, start_id=90000000))
+
+        def add():
+            for _ in range(WRITE_CALLS):
+                result = storage.add_property(dict(next(new_listings)))
+                if not result['success']:
+                    raise RuntimeError(result['error'])
+
+        self._record('storage.add_property', size, add, repeat=3, calls=WRITE_CALLS)
+        self._record('storage.get_changes', size, lambda: storage.get_changes(version))
+
+        doomed = iter(ids)
+
+        def delete():
+            for _ in range(WRITE_CALLS):
+                storage.delete_property(next(doomed))
+
+        self._record('storage.delete_property', size, delete, repeat=3, calls=WRITE_CALLS)
+
+        # A full-market scrape that no longer returns 1% of the listings
+        seen = ids[::-1][:len(ids) - len(ids) // 100]
+
+        def copy_store():
+            directory = os.path.join(self.work_dir, f"remove_{size}_{next(runs)}")
+            os.makedirs(directory, exist_ok=True)
+            store_dir = os.path.join(self.work_dir, f"store_{size}")
+            for name in os.listdir(store_dir):
+                source = os.path.join(store_dir, name)
+                if os.path.isfile(source) and not name.endswith('.lock'):
+                    shutil.copy(source, directory)
+            store = self._storage(os.path.basename(directory))
+            store.get_all_properties()
+            return (store,)
+
+        self._record('storage.remove_missing', size, lambda store: store.remove_missing(seen), setup=copy_store)
+        return storage
+
+    def _bench_app(self, size, analyzer, storage, listings):
+        """analyze_listing and /api/analyze with the size-trained model and the stored portfolio."""
+        import app
+
+        app.warmup_thread.join()
+        app.airbnb_analyzer = analyzer
+        app.property_storage = storage
+        sample = listings[:ANALYZE_CALLS]
+
+        def analyze():
+            for listing in sample:
+                app.analyze_listing(listing)
+
+        self._record('app.analyze_listing', size, analyze, calls=ANALYZE_CALLS)
+
+        client = app.app.test_client()
+
+        def post(body):
+            response = client.post('/api/analyze', json=body)
+            if response.status_code != 200:
+                raise RuntimeError(f"/api/analyze returned {response.status_code}")
+            return response
+
+        self._record('api.analyze', size, lambda: post({'limit': 50}))
+        self._record('api.analyze_screened', size,
+                     lambda: post({'min_price': 400000, 'max_price': 700000, 'bedrooms': 2, 'limit': 50}))
+
+    def run(self):
+        """
+        Run every benchmark at every size.
+
+        Returns:
+            Results dict (see results_document)
+        """
+        self.work_dir = tempfile.mkdtemp(prefix='benchmarks-')
+        # The app's own store must not be the real one
+        os.environ.setdefault('STORAGE_PATH', os.path.join(self.work_dir, 'app', 'properties.json'))
+        os.environ.setdefault('PRICE_HISTORY_PATH', os.path.join(self.work_dir, 'app', 'price_history.db'))
+        os.makedirs(os.path.join(self.work_dir, 'app'), exist_ok=True)
+        # predict_nightly_rate passes an array to a scaler fitted on a DataFrame, warning on every call
+        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+        started = time.perf_counter()
+        try:
+            for size in self.sizes:
+                print(f"Benchmarking {size} listings...")
+                listings = generate_centris_listings(size, self.seed)
+                analyzer = self._bench_airbnb(size)
+                storage = self._bench_storage(size, listings)
+                self._bench_app(size, analyzer, self._storage(f"store_{size}"), listings)
+                del storage, analyzer
+        finally:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+        print(f"Benchmarks finished in {time.perf_counter() - started:.1f}s")
+        return self.results_document()
+
+    def results_document(self):
+        """The results with the machine and settings they were measured on."""
+        return {
+            'created_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'backend': self.backend,
+            'seed': self.seed,
+            'sizes': self.sizes,
+            'memory': self.memory,
+            'results': self.results
+        }
+
+
+def compare(current, baseline, threshold=BENCHMARK_THRESHOLD):
+    """
+    Compare benchmark results with a baseline.
+
+    The best time and the peak memory of each benchmark and size are
+    compared; a change beyond `threshold` (relative) and the noise floor
+    is a regression or an improvement.
+
+    Returns:
+        List of dicts (benchmark, size, metric, baseline, current, change,
+        status), status being 'regression', 'improvement' or 'ok'
+    """
+    rows = []
+    floors = {'seconds': MIN_SECONDS_DELTA, 'peak_mb': MIN_MEMORY_DELTA_MB}
+    for name, sizes in current.get('results', {}).items():
+        for size, result in sizes.items():
+            before = baseline.get('results', {}).get(name, {}).get(size)
+            if before is None:
+                continue
+            for metric, floor in floors.items():
+                if metric not in result or metric not in before:
+                    continue
+                old, new = before[metric], result[metric]
+                change = (new - old) / old if old else 0.0
+                status = 'ok'
+                if abs(new - old) >= floor and abs(change) > threshold:
+                    status = 'regression' if new > old else 'improvement'
+                rows.append({'benchmark': name, 'size': int(size), 'metric': metric, 'baseline': old,
+                             'current': new, 'change': round(change, 4), 'status': status})
+    return rows
+
+
+def format_comparison(rows):
+    """Render a comparison as a table for the terminal."""
+    lines = [f"  {'benchmark':<32} {'size':>7} {'metric':<8} {'baseline':>10} {'current':>10} {'change':>8}"]
+    for row in rows:
+        flag = {'regression': '  REGRESSION', 'improvement': '  improved'}.get(row['status'], '')
+        lines.append(f"  {row['benchmark']:<32} {row['size']:>7} {row['metric']:<8} {row['baseline']:>10.4f} "
+                     f"{row['current']:>10.4f} {row['change']:>+8.1%}{flag}")
+    return '\n'.join(lines)
+
+
+def compare_files(results_path=BENCHMARK_RESULTS, baseline_path=BENCHMARK_BASELINE, threshold=BENCHMARK_THRESHOLD):
+    """
+    Compare a results file with a baseline file and print the table.
+
+    Returns:
+        List of regression rows, or None without a baseline
+    """
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path}; store one with: python benchmarks.py baseline")
+        return None
+    with open(results_path, 'r') as f:
+        current = json.load(f)
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+    for key in ('platform', 'cpu_count', 'backend', 'seed'):
+        if current.get(key) != baseline.get(key):
+            print(f"Warning: {key} differs from the baseline ({baseline.get(key)} -> {current.get(key)})")
+
+    rows = compare(current, baseline, threshold)
+    print(f"Compared with the baseline of {baseline.get('created_at')} (threshold {threshold:.0%}):")
+    print(format_comparison(rows))
+    regressions = [row for row in rows if row['status'] == 'regression']
+    print(f"{len(regressions)} regression(s), "
+          f"{sum(1 for row in rows if row['status'] == 'improvement')} improvement(s)")
+    return regressions
+
+
+def save_json(document, path):
+    """Write a results document atomically."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(document, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'help'
+    args = sys.argv[2:]
+
+    if command == 'run':
+        sizes = BENCHMARK_SIZES
+        backend = 'json'
+        output = BENCHMARK_RESULTS
+        memory = True
+        while args:
+            arg = args.pop(0)
+            if arg == '--backend':
+                backend = args.pop(0)
+            elif arg == '--output':
+                output = args.pop(0)
+            elif arg == '--no-memory':
+                memory = False
+            else:
+                sizes = [int(size) for size in arg.split(',')]
+        document = BenchmarkRun(sizes, backend=backend, memory=memory).run()
+        save_json(document, output)
+        print(f"Results written to {output}")
+        regressions = compare_files(output)
+        sys.exit(1 if regressions else 0)
+    elif command == 'compare':
+        results_path = args[0] if args else BENCHMARK_RESULTS
+        baseline_path = args[1] if len(args) > 1 else BENCHMARK_BASELINE
+        regressions = compare_files(results_path, baseline_path)
+        sys.exit(1 if regressions else 0)
+    elif command == 'baseline':
+        results_path = args[0] if args else BENCHMARK_RESULTS
+        with open(results_path, 'r') as f:
+            save_json(json.load(f), BENCHMARK_BASELINE)
+        print(f"Stored {results_path} as the baseline ({BENCHMARK_BASELINE})")
+    elif command == 'generate':
+        count = int(args[0]) if args else 10000
+        path = args[1] if len(args) > 1 else 'listings.csv.gz'
+        generate_airbnb_listings(count).to_csv(path, index=False, compression='gzip')
+        print(f"Wrote {count} synthetic Airbnb listings to {path}")
+    else:
+        print(__doc__)
@@ -1,19 +1,93 @@
 """
 Centris API scraper to fetch real Montreal property listings.
 Uses the Centris.ca API directly.
+
+search_properties() returns the first result page for the whole island.
+crawl_properties() covers the island: it splits the bounding box into
+tiles, subdivides tiles whose results hit the API's cap (a quadtree), and
+fetches tile pages concurrently under a rate limit, deduplicating by Id.
 """
 
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 import requests
-import json
-from datetime import datetime
+
+from http_cache import CachingAdapter
+
+
+# Montreal island bounding box: (latitude min, latitude max, longitude min, longitude max)
+MONTREAL_BOUNDS = (45.4, 45.7, -73.9, -73.4)
+
+# Listings per result page, and the most results Centris returns for one query
+RESULTS_PER_PAGE = 20
+RESULT_CAP = 200
+
+# Tiles narrower than this (in degrees, about 200 m) are not split further
+MIN_TILE_SIZE = 0.002
+
+# Seconds search results stay fresh with HTTP_CACHE_MODE=cache (see http_cache.py)
+CACHE_TTL = 3600
+
+
+class RateLimiter:
+    """Token bucket shared by threads: at most `rate` calls per second, bursts up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a call is allowed."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+def split_tile(bounds):
+    """Split (lat_min, lat_max, lon_min, lon_max) into its four quadrants."""
+    lat_min, lat_max, lon_min, lon_max = bounds
+    lat_mid = (lat_min + lat_max) / 2
+    lon_mid = (lon_min + lon_max) / 2
+    return [
+        (lat_min, lat_mid, lon_min, lon_mid),
+        (lat_min, lat_mid, lon_mid, lon_max),
+        (lat_mid, lat_max, lon_min, lon_mid),
+        (lat_mid, lat_max, lon_mid, lon_max),
+    ]
 
 
 class CentrisAPI:
-    def __init__(self):
-        """Initialize the Centris API client."""
+    def __init__(self, pool_size=16):
+        """
+        Initialize the Centris API client.
+
+        Args:
+            pool_size: Connections kept open, at least the crawl's workers
+        """
         self.base_url = "https://www.centris.ca"
-        self.api_url = "https://www.centris.ca/property/UpdateQuery"
+        # Overridable so a local stand-in (tests/fake_centris.py) can be used
+        self.api_url = os.getenv('CENTRIS_API_URL', "https://www.centris.ca/property/UpdateQuery")
         self.session = requests.Session()
+        # UpdateQuery is a POST but only reads, so its responses can be cached too
+        adapter = CachingAdapter(ttl=CACHE_TTL, methods=('GET', 'POST'),
+                                 pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.last_crawl_stats = None
 
         # Set headers to mimic browser
         self.session.headers.update({
@@ -34,20 +108,43 @@ class CentrisAPI:
         Returns:
             List of property dictionaries
         """
-        # Centris API query payload
-        query = {
+        query = self._build_query(MONTREAL_BOUNDS, page=0, page_size=max_results,
+                                  center=(45.5017, -73.5673))
+
+        try:
+            print(f"Querying Centris API for Montreal properties...")
+            response = self.session.post(self.api_url, json=query, timeout=30)
+
+            if response.status_code == 200:
+                data = response.json()
+                properties = self._parse_response(data)
+                print(f"Found {len(properties)} properties from Centris API")
+                return properties
+            else:
+                print(f"API request failed with status {response.status_code}")
+                return []
+
+        except Exception as e:
+            print(f"Error querying Centris API: {str(e)}")
+            return []
+
+    def _build_query(self, bounds, page=0, page_size=RESULTS_PER_PAGE, center=None):
+        """Build the UpdateQuery payload for one result page of a bounding box (centered on it by default)."""
+        lat_min, lat_max, lon_min, lon_max = bounds
+        latitude, longitude = center or ((lat_min + lat_max) / 2, (lon_min + lon_max) / 2)
+        return {
             "query": {
                 "UseGeographyShapes": 0,
-                "Longitude": -73.5673,
-                "Latitude": 45.5017,
-                "LongitudeMin": -73.9,
-                "LongitudeMax": -73.4,
-                "LatitudeMin": 45.4,
-                "LatitudeMax": 45.7,
+                "Longitude": longitude,
+                "Latitude": latitude,
+                "LongitudeMin": lon_min,
+                "LongitudeMax": lon_max,
+                "LatitudeMin": lat_min,
+                "LatitudeMax": lat_max,
                 "Sort": "1",  # Sort by relevance
-                "CurrentPage": 0,
-                "MaximumResults": max_results,
-                "ResultsPerPage": max_results,
+                "CurrentPage": page,
+                "MaximumResults": page_size,
+                "ResultsPerPage": page_size,
                 "CultureId": 2,  # English
                 "ApplicationId": 1,
                 "RecaptchaToken": "",
@@ -65,22 +162,101 @@ class CentrisAPI:
             }
         }
 
-        try:
-            print(f"Querying Centris API for Montreal properties...")
-            response = self.session.post(self.api_url, json=query, timeout=30)
+    def _fetch_page(self, bounds, page, page_size, rate_limiter=None):
+        """
+        Fetch one result page of a bounding box.
 
-            if response.status_code == 200:
-                data = response.json()
-                properties = self._parse_response(data)
-                print(f"Found {len(properties)} properties from Centris API")
-                return properties
-            else:
-                print(f"API request failed with status {response.status_code}")
-                return []
+        Returns:
+            Tuple (raw listings, total results for the box or None if the
+            response doesn't say)
+        """
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        response = self.session.post(self.api_url, json=self._build_query(bounds, page, page_size), timeout=30)
+        response.raise_for_status()
+        result = (response.json() or {}).get('Result') or {}
+        return result.get('Listings') or [], result.get('Count')
 
-        except Exception as e:
-            print(f"Error querying Centris API: {str(e)}")
-            return []
+    def crawl_properties(self, bounds=MONTREAL_BOUNDS, workers=8, rate=10.0, page_size=RESULTS_PER_PAGE,
+                         result_cap=RESULT_CAP, min_tile_size=MIN_TILE_SIZE, progress_callback=None):
+        """
+        Fetch every listing in a bounding box, tiling it as a quadtree.
+
+        Page 0 of a tile tells how many listings it holds. A tile at the
+        result cap is split into four (down to min_tile_size); otherwise its
+        remaining pages are fetched. All requests run on a pool of `workers`
+        threads, throttled to `rate` requests per second, and listings are
+        deduplicated by Id. The crawl's counters (requests, tiles, split,
+        truncated, errors) are kept in last_crawl_stats.
+
+        Args:
+            bounds: (lat_min, lat_max, lon_min, lon_max)
+            workers: Requests in flight at once
+            rate: Requests per second across all workers (None for no limit)
+            page_size: Listings per page
+            result_cap: Most results the API returns for one query
+            min_tile_size: Smallest tile side, in degrees
+            progress_callback: Optional callable receiving progress messages
+
+        Returns:
+            List of property dictionaries
+        """
+        report = progress_callback or (lambda message: None)
+        rate_limiter = RateLimiter(rate, burst=workers) if rate else None
+        max_pages = -(-result_cap // page_size)
+        listings = {}
+        stats = {'requests': 0, 'tiles': 0, 'split': 0, 'truncated': 0, 'errors': 0}
+        start_time = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='centris-crawl') as executor:
+            pending = {}
+
+            def submit(tile, page):
+                future = executor.submit(self._fetch_page, tile, page, page_size, rate_limiter)
+                pending[future] = (tile, page)
+
+            submit(bounds, 0)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    tile, page = pending.pop(future)
+                    stats['requests'] += 1
+                    try:
+                        raw_listings, total = future.result()
+                    except Exception as e:
+                        stats['errors'] += 1
+                        print(f"Error fetching Centris page {page} of tile {tile}: {str(e)}")
+                        continue
+
+                    for raw in raw_listings:
+                        listings.setdefault(str(raw.get('Id', '')), raw)
+
+                    if page > 0:
+                        continue
+                    stats['tiles'] += 1
+                    # Without a count, a full first page means there may be more
+                    if total is None:
+                        total = result_cap if len(raw_listings) >= page_size else len(raw_listings)
+
+                    if total >= result_cap:
+                        if tile[1] - tile[0] > min_tile_size and tile[3] - tile[2] > min_tile_size:
+                            stats['split'] += 1
+                            for child in split_tile(tile):
+                                submit(child, 0)
+                            continue
+                        stats['truncated'] += 1
+                    for next_page in range(1, min(-(-total // page_size), max_pages)):
+                        submit(tile, next_page)
+
+                report(f"Crawled {stats['requests']} pages, {len(listings)} listings")
+
+        properties = self._parse_response({'Result': {'Listings': list(listings.values())}})
+        self.last_crawl_stats = stats
+        elapsed = time.perf_counter() - start_time
+        print(f"Crawled {len(properties)} properties in {elapsed:.2f}s: {stats['requests']} requests, "
+              f"{stats['tiles']} tiles ({stats['split']} split, {stats['truncated']} truncated at the cap), "
+              f"{stats['errors']} errors")
+        return properties
 
     def _parse_response(self, data):
         """Parse Centris API response into property listings."""
@@ -97,15 +273,15 @@ class CentrisAPI:
                     'centris_id': listing.get('Id', ''),
                     'address': self._format_address(listing.get('Property', {})),
                     'price': listing.get('Price', 0),
-                    'bedrooms': listing.get('Property', {}).get('BedroomTotal', 0),
-                    'bathrooms': listing.get('Property', {}).get('BathroomTotal', 0),
+                    'bedrooms': listing.get('Property', {}).get('BedroomTotal') or 0,
+                    'bathrooms': listing.get('Property', {}).get('BathroomTotal') or 0,
                     'sqft': listing.get('Property', {}).get('LivingArea', 0),
                     'property_type': listing.get('Property', {}).get('Type', 'Unknown'),
                     'url': f"{self.base_url}/en/property~{listing.get('Id', '')}"
                 }
 
-                # Only add if we have essential data
-                if property_data['price'] > 0 and property_data['address']:
+                # Only add what storage accepts (see PropertyStorage._prepare_property)
+                if property_data['price'] > 0 and property_data['address'] and property_data['centris_id']:
                     properties.append(property_data)
 
             except Exception as e:
@@ -194,6 +370,33 @@ if __name__ == '__main__':
     # Test the API
     api = CentrisAPI()
 
+    if len(sys.argv) > 1 and sys.argv[1] == 'crawl':
+        properties = api.crawl_properties()
+        print(f"\nCrawled {len(properties)} properties across Montreal")
+
+        if '--store' in sys.argv[2:]:
+            # Store only new and changed listings; a clean crawl covers the whole
+            # island, so stored listings it didn't return have been delisted
+            from property_storage import PropertyStorage
+            storage = PropertyStorage(os.getenv('STORAGE_PATH') or None,
+                                      backend=os.getenv('STORAGE_BACKEND', 'json'))
+            counts = {'created': 0, 'updated': 0, 'unchanged': 0, 'failed': 0}
+            for outcome in storage.add_properties(properties, skip_unchanged=True):
+                counts[outcome.get('status', 'failed')] += 1
+            stats = api.last_crawl_stats
+            removed = []
+            # Same rule as run_scrape_job: remove only after a clean crawl
+            # whose listings all stored
+            if not properties or stats['errors'] or stats['truncated']:
+                print("Incomplete crawl: not removing stored listings")
+            elif counts['failed']:
+                print(f"{counts['failed']} listing(s) failed to store: not removing stored listings")
+            else:
+                removed = storage.remove_missing(prop['centris_id'] for prop in properties)
+            print(f"Stored: {counts['created']} new, {counts['updated']} changed, "
+                  f"{counts['unchanged']} unchanged, {len(removed)} removed, {counts['failed']} failed")
+        sys.exit(0)
+
     print("Testing Centris API...")
     properties = api.search_properties(max_results=10)
 
@@ -5,39 +5,359 @@ Sign up at: https://apify.com/
 Get your token from: https://console.apify.com/account/integrations
 """
 
-import requests
-import time
 import os
+import random
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import requests
 from dotenv import load_dotenv
 
+from http_cache import CachingAdapter
+
 load_dotenv()
 
 
+# (connect, read) timeouts in seconds for every Apify call
+APIFY_TIMEOUT = (5, 30)
+
+# Longest waitForFinish Apify honors, in seconds
+APIFY_MAX_WAIT_FOR_FINISH = 60
+
+# Responses worth retrying: rate limiting and server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Terminal states of an actor run
+RUN_FINISHED_STATUSES = {'SUCCEEDED', 'FAILED', 'ABORTED', 'TIMED-OUT'}
+
+# Dataset items fetched per request, and pages downloaded at once
+DATASET_PAGE_SIZE = int(os.getenv('APIFY_PAGE_SIZE', '250'))
+DATASET_PAGE_WORKERS = int(os.getenv('APIFY_PAGE_WORKERS', '4'))
+
+# With HTTP_CACHE_MODE=cache only dataset items are cached (they don't change
+# once a run has finished), for this many seconds; see http_cache.py
+DATASET_ITEMS_URL = re.compile(r'/datasets/[^/]+/items')
+DATASET_CACHE_TTL = 24 * 3600
+
+
+class ApifyError(Exception):
+    """An Apify API call failed after any retries."""
+
+
+class ApifyClient:
+    """
+    Minimal Apify API client over one pooled requests.Session.
+
+    Connections are kept alive and reused across calls (and across the
+    jobs sharing a client), every call has a timeout, and rate-limited or
+    failed calls are retried with jittered exponential backoff. The token
+    is only sent in the Authorization header.
+    """
+
+    def __init__(self, token, base_url="https://api.apify.com/v2", timeout=APIFY_TIMEOUT,
+                 max_retries=4, backoff_base=0.5, backoff_max=30.0, pool_size=8):
+        """
+        Initialize the client.
+
+        Args:
+            token: Apify API token
+            base_url: API root, overridable for a local stand-in (see tests/fake_apify.py)
+            timeout: (connect, read) timeout in seconds
+            max_retries: Retries after the first attempt of a call
+            backoff_base: First backoff ceiling in seconds, doubled on each retry
+            backoff_max: Largest backoff in seconds
+            pool_size: Connections kept open to the API
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        self.session.headers['Authorization'] = f"Bearer {token}"
+        # waitForFinish depends on the time left, so it is kept out of recorded request keys
+        adapter = CachingAdapter(ttl=DATASET_CACHE_TTL, match=DATASET_ITEMS_URL,
+                                 ignore_params=('waitForFinish',),
+                                 pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _backoff(self, attempt, response=None):
+        """Seconds to sleep before a retry: Retry-After if given, else full jitter."""
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def request(self, method, path, expected=(200,), read_timeout=None, **kwargs):
+        """
+        Call the API, retrying 429s, 5xx responses and network errors.
+
+        Non-GET calls are only retried on 429s and connect timeouts: a POST
+        that reached the server may have started a run already.
+
+        Args:
+            method: HTTP method
+            path: Path under base_url, e.g. /actor-runs/<id>
+            expected: Status codes counted as success
+            read_timeout: Read timeout for this call (e.g. to cover waitForFinish)
+
+        Returns:
+            The requests.Response
+
+        Raises:
+            ApifyError: On an unexpected status or when retries run out
+        """
+        url = f"{self.base_url}{path}"
+        timeout = (self.timeout[0], read_timeout or self.timeout[1])
+        idempotent = method.upper() == 'GET'
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # A connect timeout means nothing reached the server
+                if attempt == self.max_retries or not (idempotent or isinstance(e, requests.ConnectTimeout)):
+                    raise ApifyError(f"{method} {path} failed: {str(e)}") from e
+                delay = self._backoff(attempt)
+                print(f"Apify {method} {path} failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            if response.status_code in expected:
+                return response
+            retryable = response.status_code == 429 or \
+                (idempotent and response.status_code in RETRY_STATUSES)
+            if not retryable or attempt == self.max_retries:
+                raise ApifyError(f"{method} {path} returned {response.status_code}: {response.text[:500]}")
+            delay = self._backoff(attempt, response)
+            print(f"Apify {method} {path} returned {response.status_code}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    def start_run(self, actor_id, actor_input, wait_for_finish=0):
+        """
+        Start an actor run.
+
+        Args:
+            actor_id: Actor id, e.g. username~actor-name
+            actor_input: JSON input of the run
+            wait_for_finish: Seconds Apify may hold the call open for the run to finish
+
+        Returns:
+            The run object (id, status, defaultDatasetId, ...)
+        """
+        wait_for_finish = min(int(wait_for_finish), APIFY_MAX_WAIT_FOR_FINISH)
+        response = self.request(
+            'POST', f"/acts/{actor_id}/runs",
+            expected=(201,),
+            json=actor_input,
+            params={'waitForFinish': wait_for_finish} if wait_for_finish else None,
+            read_timeout=self.timeout[1] + wait_for_finish
+        )
+        return response.json()['data']
+
+    def wait_for_run(self, run_id, max_wait=120, progress_callback=None,
+                     min_interval=1.0, max_interval=10.0):
+        """
+        Wait for a run to finish.
+
+        Each poll asks Apify to hold the request until the run finishes
+        (waitForFinish, up to 60 seconds), so a run usually takes one or two
+        round trips. If a poll comes back early anyway, the next one is
+        delayed by an interval growing from min_interval to max_interval.
+
+        Returns:
+            The run object; its status is still running if max_wait ran out
+        """
+        report = progress_callback or (lambda message: None)
+        start_time = time.monotonic()
+        interval = min_interval
+
+        while True:
+            remaining = max_wait - (time.monotonic() - start_time)
+            wait_for_finish = max(0, min(int(remaining), APIFY_MAX_WAIT_FOR_FINISH))
+            polled_at = time.monotonic()
+            run = self.request(
+                'GET', f"/actor-runs/{run_id}",
+                params={'waitForFinish': wait_for_finish},
+                read_timeout=self.timeout[1] + wait_for_finish
+            ).json()['data']
+
+            elapsed = time.monotonic() - start_time
+            if run['status'] in RUN_FINISHED_STATUSES or elapsed >= max_wait:
+                return run
+
+            print("⏳ Still scraping...")
+            report(f"Apify run {run['status'].lower()} ({int(elapsed)}s elapsed)")
+
+            # Only sleep if the server did not hold the request for us
+            pause = min(interval - (time.monotonic() - polled_at), max_wait - elapsed)
+            if pause > 0:
+                time.sleep(pause)
+            interval = min(interval * 1.5, max_interval)
+
+    def _get_dataset_page(self, dataset_id, offset, limit, params):
+        return self.request('GET', f"/datasets/{dataset_id}/items",
+                            params=dict(params, offset=offset, limit=limit))
+
+    def iter_dataset_pages(self, dataset_id, page_size=DATASET_PAGE_SIZE,
+                           workers=DATASET_PAGE_WORKERS, **params):
+        """
+        Yield the items of a dataset one page (a list) at a time, in order.
+
+        The first page is yielded as soon as it arrives. Its
+        X-Apify-Pagination-Total header gives the dataset size, and the
+        remaining pages are then downloaded on `workers` threads, at most
+        `workers` pages ahead of the consumer. Closing the generator early
+        cancels the pages not yet requested.
+
+        Args:
+            dataset_id: Apify dataset id
+            page_size: Items per request
+            workers: Pages in flight at once (1 downloads them one by one)
+            **params: Extra query parameters, e.g. fields or clean
+        """
+        response = self._get_dataset_page(dataset_id, 0, page_size, params)
+        page = response.json()
+        yield page
+
+        total = response.headers.get('X-Apify-Pagination-Total')
+        if total is None:
+            # No size known: keep reading until a short page
+            offset = len(page)
+            while len(page) == page_size:
+                page = self._get_dataset_page(dataset_id, offset, page_size, params).json()
+                offset += len(page)
+                if page:
+                    yield page
+            return
+
+        offsets = iter(range(page_size, int(total), page_size))
+        if workers <= 1:
+            for offset in offsets:
+                yield self._get_dataset_page(dataset_id, offset, page_size, params).json()
+            return
+
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='apify-pages')
+        try:
+            pending = deque()
+            for offset in offsets:
+                pending.append(executor.submit(self._get_dataset_page, dataset_id, offset, page_size, params))
+                if len(pending) >= workers:
+                    yield pending.popleft().result().json()
+            while pending:
+                yield pending.popleft().result().json()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_dataset_items(self, dataset_id, **params):
+        """Get all the items of a dataset as a list."""
+        return [item for page in self.iter_dataset_pages(dataset_id, **params) for item in page]
+
+
+@lru_cache(maxsize=None)
+def shared_client(token, base_url):
+    """Get the process-wide client for a token, so its connections are reused across scrapes."""
+    return ApifyClient(token, base_url)
+
+
 class CentrisApify:
-    def __init__(self):
-        """Initialize the Apify Centris scraper."""
+    def __init__(self, client=None):
+        """
+        Initialize the Apify Centris scraper.
+
+        Args:
+            client: Optional ApifyClient; defaults to the shared client for
+                APIFY_API_TOKEN
+        """
         self.apify_token = os.getenv('APIFY_API_TOKEN')
         self.actor_id = "aitorsm~centris-scraper"  # Apify uses ~ separator
-        self.base_url = "https://api.apify.com/v2"
+        # Overridable so a local Apify stand-in can be used during development
+        self.base_url = os.getenv('APIFY_BASE_URL', "https://api.apify.com/v2")
+        self.client = client
+        if self.client is None and self.apify_token:
+            self.client = shared_client(self.apify_token, self.base_url)
 
-    def search_properties(self, max_results=20):
+    def search_properties(self, max_results=20, progress_callback=None, max_wait=120):
         """
         Search for properties using Apify Centris scraper.
 
         Args:
             max_results: Maximum number of properties to return
+            progress_callback: Optional callable receiving progress messages
+            max_wait: Seconds to wait for the actor run to finish
 
         Returns:
             List of property dictionaries
         """
-        if not self.apify_token:
+        properties = [
+            prop for page in self.iter_property_pages(max_results, progress_callback, max_wait)
+            for prop in page
+        ]
+
+        if properties:
+            print(f"✅ Successfully scraped {len(properties)} properties from Centris")
+        else:
+            print("⚠️  No properties found")
+        return properties
+
+    def iter_property_pages(self, max_results=20, progress_callback=None, max_wait=120,
+                            page_size=DATASET_PAGE_SIZE, workers=DATASET_PAGE_WORKERS, strict=False):
+        """
+        Run the Apify Centris scraper and yield its listings page by page.
+
+        Each page of the run's dataset is parsed and yielded as soon as it
+        arrives, while the following pages keep downloading, so callers can
+        store or analyze early listings without waiting for the rest. On
+        any error the generator logs it and stops, unless strict is set.
+
+        Args:
+            max_results: Maximum number of properties to return
+            progress_callback: Optional callable receiving progress messages
+            max_wait: Seconds to wait for the actor run to finish
+            page_size: Dataset items per request
+            workers: Dataset pages downloaded at once
+            strict: Raise on any error (no token, failed or timed-out run,
+                failed page) instead of stopping early, so a partial scrape
+                can't pass for a finished one
+
+        Yields:
+            Lists of property dictionaries
+        """
+        for items in self.iter_item_pages(max_results, progress_callback, max_wait, page_size, workers,
+                                          strict=strict):
+            yield self.parse_items(items)
+
+    def iter_item_pages(self, max_results=20, progress_callback=None, max_wait=120,
+                        page_size=DATASET_PAGE_SIZE, workers=DATASET_PAGE_WORKERS, strict=False):
+        """
+        Run the Apify Centris scraper and yield its raw dataset items page by page.
+
+        Same as iter_property_pages without the parsing, for pipelines that
+        parse on another thread (see parse_items).
+
+        Yields:
+            Lists of Apify dataset items
+        """
+        report = progress_callback or (lambda message: None)
+
+        if self.client is None:
             print("⚠️  APIFY_API_TOKEN not found in .env file")
             print("To use real Centris scraping:")
             print("1. Sign up at https://apify.com/")
             print("2. Get your API token from https://console.apify.com/account/integrations")
             print("3. Add APIFY_API_TOKEN=your_token_here to backend/.env")
             print("\nUsing sample data for now...")
-            return []
+            if strict:
+                raise RuntimeError('APIFY_API_TOKEN is not set')
+            return
 
         # Apify actor input configuration for Centris scraper
         # Simplified input - let the actor use defaults
@@ -50,110 +370,61 @@ class CentrisApify:
             print(f"🔄 Starting Apify Centris scraper (max {max_results} properties)...")
 
             # Start the actor run
-            run_url = f"{self.base_url}/acts/{self.actor_id}/runs"
-            headers = {"Authorization": f"Bearer {self.apify_token}"}
-
-            response = requests.post(
-                run_url,
-                json=actor_input,
-                headers=headers,
-                params={"token": self.apify_token}
-            )
-
-            if response.status_code != 201:
-                print(f"❌ Failed to start scraper: {response.status_code}")
-                print(f"Response: {response.text}")
-                return []
-
-            run_data = response.json()
-            run_id = run_data['data']['id']
+            run = self.client.start_run(self.actor_id, actor_input)
+            run_id = run['id']
 
             print(f"✅ Scraper started (Run ID: {run_id})")
             print("⏳ Waiting for scraper to complete (this may take 30-60 seconds)...")
+            report(f"Apify run {run_id} started")
 
-            # Poll for completion
-            properties = self._wait_for_results(run_id)
+            # Wait for completion
+            dataset_id = self._wait_for_dataset(run_id, max_wait=max_wait, progress_callback=report)
+            if dataset_id is None:
+                if strict:
+                    raise RuntimeError(f"Apify run {run_id} did not succeed")
+                return
 
-            if properties:
-                print(f"✅ Successfully scraped {len(properties)} properties from Centris")
-                return properties
-            else:
-                print("⚠️  No properties found")
-                return []
+            fetched = 0
+            for items in self.client.iter_dataset_pages(dataset_id, page_size=page_size, workers=workers):
+                fetched += len(items)
+                report(f"Fetched {fetched} Apify items")
+                yield items
 
         except Exception as e:
             print(f"❌ Error using Apify scraper: {str(e)}")
-            return []
-
-    def _wait_for_results(self, run_id, max_wait=120):
-        """Wait for Apify run to complete and return results."""
-        headers = {"Authorization": f"Bearer {self.apify_token}"}
-        run_url = f"{self.base_url}/actor-runs/{run_id}"
-
-        start_time = time.time()
-
-        while time.time() - start_time < max_wait:
-            # Check run status
-            response = requests.get(
-                run_url,
-                headers=headers,
-                params={"token": self.apify_token}
-            )
-
-            if response.status_code != 200:
-                print(f"Error checking run status: {response.status_code}")
-                return []
-
-            run_info = response.json()
-            status = run_info['data']['status']
-
-            if status == 'SUCCEEDED':
-                print("✅ Scraper completed successfully!")
-                return self._get_dataset_items(run_info['data']['defaultDatasetId'])
-            elif status in ['FAILED', 'ABORTED', 'TIMED-OUT']:
-                print(f"❌ Scraper {status.lower()}")
-                # Print error details if available
-                if 'buildId' in run_info['data']:
-                    print(f"Build ID: {run_info['data']['buildId']}")
-                if 'statusMessage' in run_info['data']:
-                    print(f"Status Message: {run_info['data']['statusMessage']}")
-                # Try to get stats
-                if 'stats' in run_info['data']:
-                    print(f"Stats: {run_info['data']['stats']}")
-                return []
-
-            # Still running, wait a bit
-            time.sleep(3)
-            print("⏳ Still scraping...")
+            if strict:
+                raise
+
+    def _wait_for_dataset(self, run_id, max_wait=120, progress_callback=None):
+        """Wait for Apify run to complete and return its dataset id, or None."""
+        report = progress_callback or (lambda message: None)
+
+        run = self.client.wait_for_run(run_id, max_wait=max_wait, progress_callback=report)
+        status = run['status']
+
+        if status == 'SUCCEEDED':
+            print("✅ Scraper completed successfully!")
+            report("Apify run succeeded, fetching results")
+            return run['defaultDatasetId']
+        elif status in RUN_FINISHED_STATUSES:
+            print(f"❌ Scraper {status.lower()}")
+            report(f"Apify run {status.lower()}")
+            # Print error details if available
+            if 'buildId' in run:
+                print(f"Build ID: {run['buildId']}")
+            if 'statusMessage' in run:
+                print(f"Status Message: {run['statusMessage']}")
+            # Try to get stats
+            if 'stats' in run:
+                print(f"Stats: {run['stats']}")
+            return None
 
         print("⏱️  Timeout waiting for scraper")
-        return []
-
-    def _get_dataset_items(self, dataset_id):
-        """Retrieve items from Apify dataset."""
-        dataset_url = f"{self.base_url}/datasets/{dataset_id}/items"
-        headers = {"Authorization": f"Bearer {self.apify_token}"}
-
-        try:
-            response = requests.get(
-                dataset_url,
-                headers=headers,
-                params={"token": self.apify_token}
-            )
-
-            if response.status_code != 200:
-                print(f"Error fetching dataset: {response.status_code}")
-                return []
-
-            items = response.json()
-            return self._parse_apify_results(items)
-
-        except Exception as e:
-            print(f"Error getting dataset: {str(e)}")
-            return []
+        report(f"Timed out after {max_wait}s waiting for Apify run")
+        return None
 
-    def _parse_apify_results(self, items):
-        """Parse Apify results into our property format."""
+    def parse_items(self, items):
+        """Parse Apify dataset items into our property format."""
         properties = []
 
         for item in items:
@@ -169,8 +440,9 @@ class CentrisApify:
                     'url': item.get('url', '')
                 }
 
-                # Only add if we have essential data
-                if property_data['price'] > 0 and property_data['address']:
+                # Only add what storage accepts (see PropertyStorage._prepare_property)
+                if (property_data['price'] > 0 and property_data['address']
+                        and property_data['centris_id'] and property_data['url']):
                     properties.append(property_data)
 
             except Exception as e:
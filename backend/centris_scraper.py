@@ -3,46 +3,85 @@ Centris scraper to fetch Montreal property listings.
 Note: Centris uses dynamic content, so we'll use Selenium for scraping.
 """
 
-import time
 import json
-from selenium import webdriver
+from concurrent.futures import ThreadPoolExecutor
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
-import re
+
+from driver_pool import shared_pool
+from listing_parser import parse_card, parse_page
+
+
+# CSS selector of the listing cards on a search results page
+CARD_SELECTOR = 'div.property-thumbnail-item, div.property-card, article'
+
+# Seconds to wait for a page's content before parsing what has loaded
+PAGE_LOAD_TIMEOUT = 10
 
 
 class CentrisScraper:
-    def __init__(self, headless=True, lazy_init=False):
-        """Initialize the Centris scraper with Selenium."""
+    def __init__(self, headless=True, lazy_init=False, pool=None):
+        """
+        Initialize the Centris scraper with Selenium.
+
+        Drivers come from a pool shared by every scraper in the process, so
+        Chrome is launched once and reused across scrapes.
+
+        Args:
+            headless: Run Chrome without a window
+            lazy_init: Don't launch a driver until the first scrape
+            pool: Optional DriverPool (defaults to the shared pool)
+        """
         self.headless = headless
-        self.driver = None
+        self.pool = pool or shared_pool(headless)
         self.base_url = "https://www.centris.ca"
 
         if not lazy_init:
-            self._init_driver()
-
-    def _init_driver(self):
-        """Initialize the Selenium driver."""
-        if self.driver is not None:
-            return
-
-        chrome_options = Options()
-        if self.headless:
-            chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_argument('user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36')
-
-        self.driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()),
-            options=chrome_options
-        )
+            self.pool.warm()
+
+    def _load(self, driver, url, wait_selector=None, timeout=PAGE_LOAD_TIMEOUT):
+        """
+        Load a page and wait until it is ready, instead of sleeping a fixed time.
+
+        Waits for an element matching wait_selector, or for the document to
+        finish loading. On timeout the page is used as far as it loaded.
+        """
+        driver.get(url)
+        if wait_selector:
+            condition = EC.presence_of_element_located((By.CSS_SELECTOR, wait_selector))
+        else:
+            condition = lambda d: d.execute_script('return document.readyState') == 'complete'
+        try:
+            WebDriverWait(driver, timeout).until(condition)
+        except TimeoutException:
+            print(f"Timed out after {timeout}s waiting for {url}, parsing what loaded")
+        return driver.page_source
+
+    def fetch_pages(self, urls, wait_selector=None, workers=None):
+        """
+        Load several pages in parallel, one pool driver per page at a time.
+
+        Args:
+            urls: Page URLs
+            wait_selector: Optional CSS selector to wait for on each page
+            workers: Pages loaded at once (defaults to the pool size)
+
+        Returns:
+            Dict mapping each URL to its page source, or None if it failed
+        """
+        def fetch(url):
+            try:
+                with self.pool.driver() as (driver, _):
+                    return self._load(driver, url, wait_selector)
+            except Exception as e:
+                print(f"Error loading {url}: {str(e)}")
+                return None
+
+        urls = list(urls)
+        with ThreadPoolExecutor(max_workers=workers or self.pool.size) as executor:
+            return dict(zip(urls, executor.map(fetch, urls)))
 
     def scrape_listings(self, max_listings=20):
         """
@@ -54,118 +93,34 @@ class CentrisScraper:
         Returns:
             List of dictionaries containing listing data
         """
-        self._init_driver()  # Ensure driver is initialized
         listings = []
 
         try:
             # Navigate to Centris Montreal search page
             search_url = f"{self.base_url}/en/properties~for-sale~montreal-island"
             print(f"Navigating to: {search_url}")
-            self.driver.get(search_url)
 
             # Wait for listings to load
-            time.sleep(5)
-
-            # Try to get listings
-            wait = WebDriverWait(self.driver, 10)
-
-            # Parse the page source
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+            with self.pool.driver() as (driver, _):
+                page_source = self._load(driver, search_url, wait_selector=CARD_SELECTOR)
 
-            # Find property cards (structure may vary, this is a common pattern)
-            property_cards = soup.find_all('div', class_=re.compile('property-thumbnail-item|property-card'))
+            # Parse the property cards (structure may vary, so several patterns are tried)
+            found, parsed = parse_page(page_source, self.base_url, max_listings)
+            print(f"Found {found} property cards")
 
-            if not property_cards:
-                # Try alternative selectors
-                property_cards = soup.find_all('article')
-
-            print(f"Found {len(property_cards)} property cards")
-
-            for idx, card in enumerate(property_cards[:max_listings]):
-                try:
-                    listing = self._parse_listing_card(card)
-                    if listing:
-                        listings.append(listing)
-                        print(f"Scraped listing {idx + 1}: {listing.get('address', 'Unknown')}")
-                except Exception as e:
-                    print(f"Error parsing card {idx + 1}: {str(e)}")
-                    continue
+            for idx, listing in enumerate(parsed):
+                if listing:
+                    listings.append(listing)
+                    print(f"Scraped listing {idx + 1}: {listing.get('address', 'Unknown')}")
 
         except Exception as e:
             print(f"Error scraping Centris: {str(e)}")
-        finally:
-            self.driver.quit()
 
         return listings
 
     def _parse_listing_card(self, card):
         """Parse a single listing card to extract property details."""
-        listing = {}
-
-        try:
-            # Extract price
-            price_elem = card.find(class_=re.compile('price|Price'))
-            if price_elem:
-                price_text = price_elem.get_text(strip=True)
-                # Remove currency symbols and commas
-                price_clean = re.sub(r'[^\d]', '', price_text)
-                listing['price'] = int(price_clean) if price_clean else None
-
-            # Extract address
-            address_elem = card.find(class_=re.compile('address|Address'))
-            if address_elem:
-                listing['address'] = address_elem.get_text(strip=True)
-            else:
-                # Try to find it in a link
-                link_elem = card.find('a', class_=re.compile('property-link|item-link'))
-                if link_elem:
-                    listing['address'] = link_elem.get('title', 'Unknown Address')
-
-            # Extract listing URL
-            link_elem = card.find('a', href=True)
-            if link_elem:
-                href = link_elem['href']
-                listing['url'] = href if href.startswith('http') else f"{self.base_url}{href}"
-                # Extract listing ID from URL
-                id_match = re.search(r'/(\d+)/?$', href)
-                if id_match:
-                    listing['centris_id'] = id_match.group(1)
-
-            # Extract bedrooms
-            bed_elem = card.find(class_=re.compile('bed|bedroom'), text=re.compile(r'\d+'))
-            if bed_elem:
-                bed_match = re.search(r'(\d+)', bed_elem.get_text())
-                if bed_match:
-                    listing['bedrooms'] = int(bed_match.group(1))
-
-            # Extract bathrooms
-            bath_elem = card.find(class_=re.compile('bath'), text=re.compile(r'\d+'))
-            if bath_elem:
-                bath_match = re.search(r'(\d+)', bath_elem.get_text())
-                if bath_match:
-                    listing['bathrooms'] = int(bath_match.group(1))
-
-            # Extract square footage
-            sqft_elem = card.find(text=re.compile(r'sq\.?\s*ft|pi²|ft²', re.I))
-            if sqft_elem:
-                sqft_match = re.search(r'([\d,]+)', sqft_elem)
-                if sqft_match:
-                    sqft_clean = sqft_match.group(1).replace(',', '')
-                    listing['sqft'] = int(sqft_clean)
-
-            # Extract property type
-            type_elem = card.find(class_=re.compile('category|type|property-type'))
-            if type_elem:
-                listing['property_type'] = type_elem.get_text(strip=True)
-
-            # Only return if we have at least price and address
-            if listing.get('price') and listing.get('address'):
-                return listing
-
-        except Exception as e:
-            print(f"Error extracting listing details: {str(e)}")
-
-        return None
+        return parse_card(card, self.base_url)
 
     def get_sample_listings(self):
         """Return sample listings for testing without scraping."""
@@ -0,0 +1,207 @@
+"""
+Bounded pool of warm headless Chrome drivers.
+
+Launching Chrome (and resolving chromedriver) costs seconds, so drivers
+are kept alive and shared across scrapes: a caller checks one out, loads
+pages, and hands it back. A driver is health-checked before each checkout
+and replaced if it died, and recycled after max_pages page loads to keep
+memory in check. At most `size` drivers exist at once; extra callers wait
+for one to be returned.
+"""
+
+import atexit
+import queue
+import threading
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+
+USER_AGENT = 'user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+
+_chromedriver_path = None
+_chromedriver_lock = threading.Lock()
+
+
+def chrome_driver(headless=True):
+    """Launch a Chrome driver; chromedriver is resolved once per process."""
+    global _chromedriver_path
+    with _chromedriver_lock:
+        if _chromedriver_path is None:
+            _chromedriver_path = ChromeDriverManager().install()
+
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_argument(USER_AGENT)
+
+    return webdriver.Chrome(service=Service(_chromedriver_path), options=chrome_options)
+
+
+class DriverPool:
+    def __init__(self, size=2, headless=True, max_pages=50, driver_factory=None):
+        """
+        Initialize an empty pool; drivers are launched on first use.
+
+        Args:
+            size: Most drivers alive at once
+            headless: Run Chrome without a window
+            max_pages: Page loads after which a driver is quit and replaced
+            driver_factory: Callable returning a new driver (defaults to Chrome)
+        """
+        self.size = size
+        self.max_pages = max_pages
+        self.driver_factory = driver_factory or (lambda: chrome_driver(headless))
+        self.idle = queue.LifoQueue()  # Most recently returned first, so the warmest driver is reused
+        self.slots = threading.BoundedSemaphore(size)
+        self.pages = {}  # id(driver) -> page loads so far
+        self.lock = threading.Lock()
+        self.closed = False
+        self.stats = {'launched': 0, 'recycled': 0, 'unhealthy': 0}
+
+    def _launch(self):
+        driver = self.driver_factory()
+        with self.lock:
+            self.pages[id(driver)] = 0
+            self.stats['launched'] += 1
+        return driver
+
+    def _quit(self, driver):
+        with self.lock:
+            self.pages.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Error quitting driver: {str(e)}")
+
+    @staticmethod
+    def _healthy(driver):
+        """Check that the browser still answers."""
+        try:
+            driver.execute_script('return 1')
+            return True
+        except WebDriverException:
+            return False
+
+    def warm(self, count=1):
+        """Make sure at least `count` drivers (up to the pool size) are launched."""
+        launched = []
+        with self.lock:
+            missing = min(count, self.size) - len(self.pages)
+        for _ in range(missing):
+            if not self.slots.acquire(blocking=False):
+                break
+            try:
+                launched.append(self._launch())
+            except Exception:
+                self.slots.release()
+                raise
+        for driver in launched:
+            self.idle.put(driver)
+            self.slots.release()
+
+    def acquire(self, timeout=None):
+        """
+        Check out a healthy driver, launching one if the pool has room.
+
+        Raises:
+            TimeoutError: If no driver was free within timeout seconds
+        """
+        if self.closed:
+            raise RuntimeError('Driver pool is closed')
+        if not self.slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No driver free after {timeout}s")
+        try:
+            try:
+                driver = self.idle.get_nowait()
+            except queue.Empty:
+                return self._launch()
+            if self._healthy(driver):
+                return driver
+            with self.lock:
+                self.stats['unhealthy'] += 1
+            self._quit(driver)
+            return self._launch()
+        except Exception:
+            self.slots.release()
+            raise
+
+    def release(self, driver, pages=1, broken=False):
+        """
+        Return a driver after loading `pages` pages with it.
+
+        Drivers that are broken, closed or past max_pages are quit instead.
+        """
+        with self.lock:
+            count = self.pages.get(id(driver), 0) + pages
+            self.pages[id(driver)] = count
+        try:
+            if broken or self.closed:
+                self._quit(driver)
+            elif count >= self.max_pages:
+                with self.lock:
+                    self.stats['recycled'] += 1
+                self._quit(driver)
+            else:
+                self.idle.put(driver)
+        finally:
+            self.slots.release()
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """
+        Check out a driver for a block of page loads.
+
+        The block should count its loads in the yielded `usage` dict
+        ({'pages': 1} by default) so the driver is recycled on time. A
+        WebDriverException escaping the block discards the driver.
+        """
+        driver = self.acquire(timeout)
+        usage = {'pages': 1}
+        broken = False
+        try:
+            yield driver, usage
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            self.release(driver, usage['pages'], broken)
+
+    def close(self):
+        """Quit every idle driver; drivers still checked out are quit when returned."""
+        self.closed = True
+        while True:
+            try:
+                driver = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            self._quit(driver)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def shared_pool(headless=True, size=2, max_pages=50):
+    """Get the process-wide pool for a headless setting, so drivers stay warm across scrapes."""
+    with _pools_lock:
+        pool = _pools.get(headless)
+        if pool is None or pool.closed:
+            pool = _pools[headless] = DriverPool(size=size, headless=headless, max_pages=max_pages)
+        return pool
+
+
+@atexit.register
+def _close_pools():
+    """Quit the shared pools' idle drivers when the process exits."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,148 @@
+"""
+Offline geocoder for Montreal addresses.
+
+Resolves an address to approximate coordinates without any network call,
+using the centroid table in data/montreal_centroids.csv. In order:
+
+1. Postal code or FSA (forward sortation area, the first three characters
+   of a postal code, e.g. H2X), which narrows a listing to a few blocks
+2. Borough or neighborhood name (e.g. "Plateau", "Côte-des-Neiges"),
+   ignoring street names such as "Boulevard Saint-Laurent"
+3. Downtown Montreal
+
+Results are memoized per address, so re-geocoding the same listings (bulk
+imports, re-scrapes) costs a dictionary lookup.
+"""
+
+import csv
+import os
+import re
+import sys
+import time
+import unicodedata
+from functools import lru_cache
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+CENTROIDS_FILE = os.path.join(DATA_DIR, 'montreal_centroids.csv')
+
+# Downtown Montreal, used when nothing in the address is recognized
+DEFAULT_COORDS = (45.5017, -73.5673)
+
+# Postal code (H2X 1M2) or bare FSA (H2X); D, F, I, O, Q and U are never used
+POSTAL_CODE_PATTERN = re.compile(
+    r'\b([ABCEGHJ-NPRSTVXY]\d[ABCEGHJ-NPRSTV-Z])(?:[ -]?\d[ABCEGHJ-NPRSTV-Z]\d)?\b'
+)
+
+# An area name right after one of these is part of a street name
+STREET_PREFIX_PATTERN = re.compile(
+    r'\b(?:rue|av|ave|avenue|boul|boulevard|blvd|ch|chemin|place|pl|rang|montee|cote|'
+    r'terrasse|croissant|allee|square|street|st|road|rd)(?: (?:de|du|des|d|la|le|l))* $'
+)
+STREET_SUFFIX_PATTERN = re.compile(r' (?:street|st|avenue|ave|boulevard|blvd|road|rd)\b')
+
+NON_ALPHANUMERIC_PATTERN = re.compile(r'[^a-z0-9]+')
+
+
+def normalize(text):
+    """Lowercase, strip accents and collapse punctuation into single spaces."""
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return NON_ALPHANUMERIC_PATTERN.sub(' ', text.lower()).strip()
+
+
+class MontrealGeocoder:
+    def __init__(self, centroids_file=CENTROIDS_FILE, cache_size=100000):
+        """
+        Initialize the geocoder and compile its area matcher.
+
+        Args:
+            centroids_file: CSV with type (fsa or area), key, latitude, longitude
+            cache_size: Number of addresses whose result is memoized
+        """
+        self.fsa_centroids = {}
+        self.area_centroids = {}
+        self._load_centroids(centroids_file)
+
+        # Longest names first, so "plateau mont royal" wins over "plateau"
+        names = sorted(self.area_centroids, key=len, reverse=True)
+        self.area_pattern = re.compile(
+            r'\b(?:' + '|'.join(re.escape(name) for name in names) + r')\b'
+        ) if names else None
+
+        self._locate = lru_cache(maxsize=cache_size)(self._locate_uncached)
+
+    def _load_centroids(self, centroids_file):
+        """Load the centroid table into the FSA and area dictionaries."""
+        try:
+            with open(centroids_file, newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    coords = (float(row['latitude']), float(row['longitude']))
+                    if row['type'] == 'fsa':
+                        self.fsa_centroids[row['key'].upper()] = coords
+                    else:
+                        self.area_centroids[normalize(row['key'])] = coords
+        except FileNotFoundError:
+            print(f"Warning: {centroids_file} not found, all addresses will map to downtown Montreal")
+
+    def _locate_uncached(self, address):
+        for match in POSTAL_CODE_PATTERN.finditer(address.upper()):
+            coords = self.fsa_centroids.get(match.group(1))
+            if coords:
+                return coords + ('fsa',)
+
+        if self.area_pattern is not None:
+            text = normalize(address)
+            for match in self.area_pattern.finditer(text):
+                if STREET_PREFIX_PATTERN.search(text, 0, match.start()) or \
+                        STREET_SUFFIX_PATTERN.match(text, match.end()):
+                    continue
+                return self.area_centroids[match.group(0)] + ('area',)
+
+        return DEFAULT_COORDS + ('default',)
+
+    def locate(self, address):
+        """
+        Resolve an address.
+
+        Returns:
+            Tuple (latitude, longitude, source) where source is 'fsa',
+            'area' or 'default'
+        """
+        return self._locate(address or '')
+
+    def geocode(self, address):
+        """Get {'latitude': ..., 'longitude': ...} for an address."""
+        latitude, longitude, _ = self.locate(address)
+        return {'latitude': latitude, 'longitude': longitude}
+
+    def geocode_many(self, addresses):
+        """Geocode a batch of addresses; repeated addresses are resolved once."""
+        locate = self.locate
+        return [
+            {'latitude': latitude, 'longitude': longitude}
+            for latitude, longitude, _ in map(locate, addresses)
+        ]
+
+
+geocoder = MontrealGeocoder()
+
+
+if __name__ == '__main__':
+    # Geocode the addresses given on the command line, or the stored properties
+    addresses = sys.argv[1:]
+    if not addresses:
+        from property_storage import PropertyStorage
+        addresses = [prop['address'] for prop in PropertyStorage().get_all_properties()]
+
+    for address in addresses:
+        latitude, longitude, source = geocoder.locate(address)
+        print(f"{latitude:.4f}, {longitude:.4f}  [{source:>7}]  {address}")
+
+    if addresses:
+        batch = addresses * (100000 // len(addresses) + 1)
+        uncached = MontrealGeocoder(cache_size=0)
+        start = time.perf_counter()
+        uncached.geocode_many(batch)
+        elapsed = time.perf_counter() - start
+        print(f"\nGeocoded {len(batch)} addresses in {elapsed:.2f}s without memoization "
+              f"({len(batch) / elapsed:,.0f}/s)")
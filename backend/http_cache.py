@@ -0,0 +1,347 @@
+"""
+On-disk HTTP response cache with record/replay, shared by the scrapers.
+
+CachingAdapter is a requests transport adapter, mounted on the sessions
+of centris_api.py, centris_apify.py and the Inside Airbnb download. What
+it does depends on HTTP_CACHE_MODE:
+
+    off     (default) every request goes to the network
+    cache   fresh cached responses (within the session's TTL) are served
+            from disk; other requests go to the network and successful
+            responses are cached
+    record  every request goes to the network and every response,
+            errors included, is recorded
+    replay  no network at all: responses are served in the order they
+            were recorded; a request that wasn't recorded fails
+
+Responses are stored under HTTP_CACHE_DIR (default data/http_cache):
+bodies in objects/, named by the SHA-256 of their content (so identical
+bodies are stored once), and one small JSON entry per request in
+entries/, named by the hash of the method, URL and body. Headers such as
+Authorization are not part of the key and are never stored. Query
+parameters that vary from run to run (like Apify's waitForFinish) can be
+left out of the key with ignore_params.
+
+When the same request gets different responses (e.g. polling a run), an
+entry keeps them all in order, and replay hands them back in the same
+order, repeating the last one, so a recorded ingestion run replays
+deterministically and offline:
+
+    HTTP_CACHE_MODE=record python centris_api.py crawl
+    HTTP_CACHE_MODE=replay python centris_api.py crawl
+
+Run `python http_cache.py stats` or `clear` to inspect or empty the
+cache.
+"""
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+MODES = ('off', 'cache', 'record', 'replay')
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'http_cache')
+
+# Default time to live of cached responses, in seconds (cache mode only)
+DEFAULT_TTL = 3600
+
+# Headers that describe the stored bytes' transport rather than the response
+SKIPPED_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length', 'connection',
+                   'keep-alive', 'set-cookie'}
+
+
+class CacheMiss(requests.RequestException):
+    """Replay mode got a request that was not recorded."""
+
+
+def cache_mode():
+    """Get the mode set by HTTP_CACHE_MODE."""
+    mode = os.getenv('HTTP_CACHE_MODE', 'off').lower()
+    if mode not in MODES:
+        raise ValueError(f"HTTP_CACHE_MODE must be one of {', '.join(MODES)}, not {mode!r}")
+    return mode
+
+
+class ResponseCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR):
+        """
+        Open (or create) a response cache directory.
+
+        Args:
+            directory: Holds objects/ (response bodies) and entries/ (one per request)
+        """
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, 'objects')
+        self.entries_dir = os.path.join(directory, 'entries')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.entries_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.recorded = set()  # Keys recorded by this process (their old responses were dropped)
+        self.replayed = {}  # key -> responses replayed so far
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0}
+
+    @staticmethod
+    def request_key(request, ignore_params=()):
+        """Hash a prepared request's method, URL (sorted query, minus ignore_params) and body."""
+        url = urlsplit(request.url)
+        query = sorted((name, value) for name, value in parse_qsl(url.query, keep_blank_values=True)
+                       if name not in ignore_params)
+        normalized_url = urlunsplit((url.scheme, url.netloc.lower(), url.path, urlencode(query), ''))
+        body = request.body or b''
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        digest = hashlib.sha256()
+        digest.update(f"{request.method.upper()} {normalized_url}\n".encode('utf-8'))
+        digest.update(body)
+        return digest.hexdigest(), normalized_url
+
+    def _entry_path(self, key):
+        return os.path.join(self.entries_dir, f"{key}.json")
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    @staticmethod
+    def _write_atomic(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def _read_entry(self, key):
+        try:
+            with open(self._entry_path(key), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def read_body(self, digest):
+        with open(self._object_path(digest), 'rb') as f:
+            return f.read()
+
+    def store(self, key, method, url, response, append=False):
+        """
+        Store a response's status, headers and body under a request key.
+
+        Args:
+            append: Add it to the entry's responses instead of replacing them
+                (only for responses recorded by this process)
+        """
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            self._write_atomic(object_path, body)
+
+        stored = {
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {name: value for name, value in response.headers.items()
+                        if name.lower() not in SKIPPED_HEADERS},
+            'body': digest,
+            'stored_at': time.time()
+        }
+        with self.lock:
+            entry = self._read_entry(key) if append and key in self.recorded else None
+            if entry is None:
+                entry = {'method': method, 'url': url, 'responses': []}
+            entry['responses'].append(stored)
+            self.recorded.add(key)
+            self._write_atomic(self._entry_path(key), json.dumps(entry, indent=1).encode('utf-8'))
+            self.stats['stores'] += 1
+
+    def lookup(self, key, ttl=None):
+        """
+        Get the cached response for a request key if it is still fresh.
+
+        Returns:
+            The stored response dict, or None
+        """
+        entry = self._read_entry(key)
+        stored = entry['responses'][-1] if entry and entry['responses'] else None
+        fresh = stored is not None and (ttl is None or time.time() - stored['stored_at'] < ttl)
+        with self.lock:
+            self.stats['hits' if fresh else 'misses'] += 1
+        return stored if fresh else None
+
+    def next_recorded(self, key):
+        """
+        Get the next recorded response for a request key, in recording order.
+
+        Once all of them have been replayed, the last one is repeated.
+
+        Returns:
+            The stored response dict, or None if the request was not recorded
+        """
+        entry = self._read_entry(key)
+        if not entry or not entry['responses']:
+            with self.lock:
+                self.stats['misses'] += 1
+            return None
+        with self.lock:
+            index = self.replayed.get(key, 0)
+            self.replayed[key] = index + 1
+            self.stats['hits'] += 1
+        return entry['responses'][min(index, len(entry['responses']) - 1)]
+
+    def clear(self):
+        """Delete every cached response."""
+        with self.lock:
+            for path in (self.objects_dir, self.entries_dir):
+                shutil.rmtree(path, ignore_errors=True)
+                os.makedirs(path, exist_ok=True)
+            self.recorded.clear()
+            self.replayed.clear()
+
+    def summary(self):
+        """Count the entries, responses and stored bytes on disk."""
+        entries = responses = 0
+        for name in os.listdir(self.entries_dir):
+            if name.endswith('.json'):
+                entry = self._read_entry(name[:-5])
+                entries += 1
+                responses += len(entry['responses']) if entry else 0
+        objects = size = 0
+        for root, _, files in os.walk(self.objects_dir):
+            for name in files:
+                objects += 1
+                size += os.path.getsize(os.path.join(root, name))
+        return {'entries': entries, 'responses': responses, 'objects': objects, 'bytes': size}
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(directory=None):
+    """Get the process-wide ResponseCache for a directory (defaults to HTTP_CACHE_DIR)."""
+    directory = os.path.abspath(directory or os.getenv('HTTP_CACHE_DIR') or DEFAULT_CACHE_DIR)
+    with _caches_lock:
+        cache = _caches.get(directory)
+        if cache is None:
+            cache = _caches[directory] = ResponseCache(directory)
+        return cache
+
+
+class CachingAdapter(HTTPAdapter):
+    """HTTPAdapter that serves, caches or records responses according to the cache mode."""
+
+    def __init__(self, ttl=DEFAULT_TTL, methods=('GET',), match=None, ignore_params=(),
+                 mode=None, cache=None, **kwargs):
+        """
+        Initialize the adapter.
+
+        Args:
+            ttl: Seconds a cached response stays fresh in cache mode (None: forever)
+            methods: Methods whose responses are cached in cache mode (record
+                and replay cover every request)
+            match: Optional compiled regex; in cache mode only URLs it matches are cached
+            ignore_params: Query parameters left out of the request key
+            mode: 'off', 'cache', 'record' or 'replay' (defaults to HTTP_CACHE_MODE)
+            cache: ResponseCache (defaults to get_cache())
+            **kwargs: Passed to HTTPAdapter (pool_connections, pool_maxsize, ...)
+        """
+        super().__init__(**kwargs)
+        self.mode = mode or cache_mode()
+        self.cache = cache or (get_cache() if self.mode != 'off' else None)
+        self.ttl = ttl
+        self.methods = {method.upper() for method in methods}
+        self.match = match
+        self.ignore_params = frozenset(ignore_params)
+
+    def _cacheable(self, request):
+        return request.method.upper() in self.methods and (self.match is None or self.match.search(request.url))
+
+    def _build_cached_response(self, request, stored):
+        response = requests.Response()
+        body = self.cache.read_body(stored['body'])
+        response.status_code = stored['status']
+        response.reason = stored.get('reason')
+        response.headers = CaseInsensitiveDict(stored['headers'])
+        response.headers['Content-Length'] = str(len(body))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = io.BytesIO(body)
+        response._content = body
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.elapsed = timedelta(0)
+        return response
+
+    def send(self, request, **kwargs):
+        if self.mode == 'off':
+            return super().send(request, **kwargs)
+
+        key, url = self.cache.request_key(request, self.ignore_params)
+
+        if self.mode == 'replay':
+            stored = self.cache.next_recorded(key)
+            if stored is None:
+                raise CacheMiss(f"No recorded response for {request.method} {url}", request=request)
+            return self._build_cached_response(request, stored)
+
+        cacheable = self.mode == 'cache' and self._cacheable(request)
+        if cacheable:
+            stored = self.cache.lookup(key, self.ttl)
+            if stored is not None:
+                return self._build_cached_response(request, stored)
+
+        response = super().send(request, **kwargs)
+        if self.mode == 'record':
+            self.cache.store(key, request.method, url, response, append=True)
+        elif cacheable and 200 <= response.status_code < 300:
+            self.cache.store(key, request.method, url, response)
+        return response
+
+
+def mount_cache(session, **kwargs):
+    """
+    Mount a CachingAdapter on a session for http:// and https://.
+
+    Args:
+        session: requests.Session
+        **kwargs: Passed to CachingAdapter (ttl, methods, match, ignore_params, pool_maxsize, ...)
+
+    Returns:
+        The session
+    """
+    adapter = CachingAdapter(**kwargs)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def cached_session(**kwargs):
+    """Create a requests.Session going through a CachingAdapter (see mount_cache)."""
+    return mount_cache(requests.Session(), **kwargs)
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'stats'
+    cache = get_cache()
+    if command == 'clear':
+        cache.clear()
+        print(f"Cleared {cache.directory}")
+    else:
+        summary = cache.summary()
+        print(f"{cache.directory}: {summary['entries']} requests, {summary['responses']} responses, "
+              f"{summary['objects']} bodies, {summary['bytes'] / 1024 / 1024:.1f} MiB")
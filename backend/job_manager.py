@@ -0,0 +1,217 @@
+"""
+Background job manager for long-running tasks such as Centris scrapes.
+Jobs run on a small thread pool so API requests can return immediately
+and clients poll for progress and results.
+
+Job state is kept in a SQLite table (data/jobs.db) rather than in the
+process, so the poll after a 202 finds the job whichever gunicorn worker
+it lands on, and finished jobs survive a restart. A job still runs in the
+worker that accepted it; that worker refreshes a heartbeat on its
+unfinished jobs, and a job whose heartbeat stops (its worker died or was
+restarted) is reported as failed instead of running forever.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+# Job table shared by the processes of one deployment
+JOBS_PATH = os.getenv('JOBS_PATH') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'jobs.db'
+)
+
+# Seconds between heartbeats on unfinished jobs; a job is considered
+# interrupted after three missed heartbeats
+JOB_HEARTBEAT_INTERVAL = float(os.getenv('JOB_HEARTBEAT_INTERVAL', '10'))
+
+FINISHED = ('succeeded', 'failed')
+FIELDS = ('id', 'type', 'status', 'progress', 'created_at', 'started_at',
+          'finished_at', 'result', 'error')
+
+
+class JobManager:
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            seq INTEGER PRIMARY KEY,
+            id TEXT NOT NULL UNIQUE,
+            type TEXT NOT NULL,
+            status TEXT NOT NULL,
+            progress TEXT,
+            created_at TEXT NOT NULL,
+            started_at TEXT,
+            finished_at TEXT,
+            result TEXT,
+            error TEXT,
+            owner TEXT NOT NULL,
+            heartbeat_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, heartbeat_at);
+    """
+
+    def __init__(self, max_workers=2, max_jobs=100, db_file=None,
+                 heartbeat_interval=JOB_HEARTBEAT_INTERVAL):
+        """
+        Initialize the job manager.
+
+        Args:
+            max_workers: Number of jobs that may run at the same time
+            max_jobs: Number of jobs kept in the table; the oldest finished
+                jobs are dropped first
+            db_file: SQLite file shared by all workers (defaults to JOBS_PATH)
+            heartbeat_interval: Seconds between heartbeats on this
+                process's unfinished jobs
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self.max_jobs = max_jobs
+        self.db_file = db_file or JOBS_PATH
+        self.heartbeat_interval = heartbeat_interval
+        # Identifies this process's jobs for the heartbeat; set per process,
+        # since gunicorn may fork the workers after this is created
+        self.owner = None
+        self._owner_pid = None
+        self._local = threading.local()
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.db_file) or '.', exist_ok=True)
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self):
+        """Get this thread's connection (sqlite3 connections are per thread)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _write(self, func):
+        """Run func(conn) in an immediate write transaction."""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = func(conn)
+            conn.execute('COMMIT')
+            return result
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def submit(self, job_type, func, **kwargs):
+        """
+        Queue a job for background execution.
+
+        The function is called as func(report_progress, **kwargs), where
+        report_progress(message) updates the job's progress message. Its
+        return value becomes the job result; an exception marks it failed.
+
+        Returns:
+            dict: Snapshot of the newly created job
+        """
+        job_id = uuid.uuid4().hex
+        self._start_heartbeat()
+
+        def insert(conn):
+            conn.execute(
+                'INSERT INTO jobs (id, type, status, progress, created_at, owner, heartbeat_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, job_type, 'queued', 'Waiting for a free worker',
+                 datetime.now().isoformat(), self.owner, time.time())
+            )
+            self._prune(conn)
+
+        self._write(insert)
+        self.executor.submit(self._run, job_id, func, kwargs)
+        return self.get_job(job_id)
+
+    def _run(self, job_id, func, kwargs):
+        """Execute a job and record its outcome."""
+        self._update(job_id, status='running', progress='Started',
+                     started_at=datetime.now().isoformat())
+
+        def report_progress(message):
+            self._update(job_id, progress=message)
+
+        try:
+            result = func(report_progress, **kwargs)
+            self._update(job_id, status='succeeded', progress='Done',
+                         result=json.dumps(result, default=str),
+                         finished_at=datetime.now().isoformat())
+        except Exception as e:
+            print(f"Job {job_id} failed: {str(e)}")
+            self._update(job_id, status='failed', error=str(e),
+                         finished_at=datetime.now().isoformat())
+
+    def _update(self, job_id, **fields):
+        """Update fields of a job if it is still tracked."""
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        self._write(lambda conn: conn.execute(
+            f"UPDATE jobs SET {assignments}, heartbeat_at = ? WHERE id = ?",
+            (*fields.values(), time.time(), job_id)
+        ))
+
+    def _start_heartbeat(self):
+        """Start the thread refreshing this process's unfinished jobs, once per process."""
+        with self.lock:
+            if self._owner_pid != os.getpid():
+                self._owner_pid = os.getpid()
+                self.owner = f"{self._owner_pid}-{uuid.uuid4().hex[:8]}"
+                threading.Thread(target=self._beat, args=(self.owner,), name='job-heartbeat', daemon=True).start()
+
+    def _beat(self, owner):
+        """Mark this process's unfinished jobs as alive, forever."""
+        while True:
+            time.sleep(self.heartbeat_interval)
+            try:
+                self._write(lambda conn: conn.execute(
+                    'UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status NOT IN (?, ?)',
+                    (time.time(), owner, *FINISHED)
+                ))
+            except sqlite3.Error as e:
+                print(f"Job heartbeat failed: {str(e)}")
+
+    def _fail_interrupted(self):
+        """Mark unfinished jobs whose worker stopped sending heartbeats as failed."""
+        cutoff = time.time() - 3 * self.heartbeat_interval
+        self._write(lambda conn: conn.execute(
+            'UPDATE jobs SET status = ?, error = ?, finished_at = ? '
+            'WHERE status NOT IN (?, ?) AND heartbeat_at < ?',
+            ('failed', 'Interrupted: the worker running this job stopped',
+             datetime.now().isoformat(), *FINISHED, cutoff)
+        ))
+
+    def _prune(self, conn):
+        """Drop the oldest finished jobs once more than max_jobs are tracked."""
+        (count,) = conn.execute('SELECT COUNT(*) FROM jobs').fetchone()
+        if count > self.max_jobs:
+            conn.execute(
+                'DELETE FROM jobs WHERE seq IN ('
+                'SELECT seq FROM jobs WHERE status IN (?, ?) ORDER BY seq LIMIT ?)',
+                (*FINISHED, count - self.max_jobs)
+            )
+
+    def get_job(self, job_id):
+        """Get a snapshot of a job, or None if it is unknown."""
+        self._fail_interrupted()
+        row = self._connection().execute(
+            f"SELECT {', '.join(FIELDS)} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(FIELDS, row))
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        return job
+
+    def list_jobs(self):
+        """Get snapshots of all tracked jobs without their results, newest first."""
+        self._fail_interrupted()
+        fields = [name for name in FIELDS if name != 'result']
+        rows = self._connection().execute(
+            f"SELECT {', '.join(fields)} FROM jobs ORDER BY seq DESC"
+        ).fetchall()
+        return [dict(zip(fields, row)) for row in rows]
@@ -0,0 +1,233 @@
+"""
+Enrich listings with the details only their Centris detail pages have.
+
+Search results (Apify items, UpdateQuery listings) carry no real
+coordinates, municipal or school taxes, or condo fees, so the geocoder
+estimates the location and financing falls back to
+MONTHLY_PROPERTY_TAX_RATE and the flat MONTHLY_MAINTENANCE. The enricher
+fetches each listing's detail page and adds `latitude`, `longitude`,
+`municipal_taxes`, `school_taxes` and `condo_fees` (yearly amounts), which
+the analysis then uses in place of the estimates.
+
+Pages are fetched with asyncio: at most `concurrency` requests are in
+flight, and requests to one host are spaced to `rate` per second. The
+requests themselves go through a requests session with http_cache's
+adapter on a small thread pool, so detail pages can be cached, recorded
+and replayed like every other source. A page that can't be fetched or
+parsed leaves its listing as it was.
+
+    python listing_enricher.py <url>    # print the fields found on one detail page
+"""
+
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlparse
+
+import requests
+from bs4 import BeautifulSoup
+
+from http_cache import CachingAdapter
+
+
+# Detail pages in flight at once, and requests per second to any one host
+ENRICH_CONCURRENCY = int(os.getenv('ENRICH_CONCURRENCY', '8'))
+ENRICH_RATE = float(os.getenv('ENRICH_RATE', '5'))
+
+# Seconds to wait for a page, and retries of 429 and 5xx responses
+ENRICH_TIMEOUT = float(os.getenv('ENRICH_TIMEOUT', '15'))
+ENRICH_RETRIES = 2
+
+# Seconds detail pages stay fresh with HTTP_CACHE_MODE=cache (see http_cache.py)
+DETAIL_CACHE_TTL = 24 * 3600
+
+MUNICIPAL_TAX_LABEL = re.compile(r'^(municipal tax|taxes? municipales?)', re.I)
+SCHOOL_TAX_LABEL = re.compile(r'^(school tax|taxes? scolaires?)', re.I)
+CONDO_FEES_LABEL = re.compile(r'^(condominium fees|condo fees|frais de copropri)', re.I)
+MONTHLY_HEADER = re.compile(r'month|mensuel', re.I)
+AMOUNT = re.compile(r'\d[\d,.\s]*')
+NON_AMOUNT_CHARS = re.compile(r'[^\d.]')
+
+# Label patterns of the cost fields among the DETAIL_FIELDS added to a listing
+COST_LABELS = (
+    ('municipal_taxes', MUNICIPAL_TAX_LABEL),
+    ('school_taxes', SCHOOL_TAX_LABEL),
+    ('condo_fees', CONDO_FEES_LABEL),
+)
+
+
+def _parse_amount(text):
+    """Read a dollar amount like '$2,954' or '2 104 $' (whole dollars), or None."""
+    match = AMOUNT.search(text)
+    if match is None:
+        return None
+    try:
+        return float(NON_AMOUNT_CHARS.sub('', match.group(0).replace(',', '')))
+    except ValueError:
+        return None
+
+
+def parse_detail_page(page_source):
+    """
+    Extract coordinates and yearly costs from a Centris detail page.
+
+    Coordinates come from the schema.org geo block; taxes and condo fees
+    from the rows of the financial details tables, in English or French.
+    Amounts in a column headed "Monthly"/"Mensuelles" are made yearly.
+
+    Returns:
+        dict with the DETAIL_FIELDS that were found
+    """
+    soup = BeautifulSoup(page_source, 'html.parser')
+    details = {}
+
+    for field, low, high in (('latitude', -90, 90), ('longitude', -180, 180)):
+        tag = soup.find(attrs={'itemprop': field})
+        if tag is None:
+            continue
+        try:
+            value = float(tag.get('content') or tag.get_text(strip=True))
+        except ValueError:
+            continue
+        if low <= value <= high:
+            details[field] = value
+
+    for table in soup.find_all('table'):
+        header = []
+        for row in table.find_all('tr'):
+            cells = row.find_all(['td', 'th'])
+            if all(cell.name == 'th' for cell in cells):
+                header = [cell.get_text(' ', strip=True) for cell in cells]
+                continue
+            if len(cells) < 2:
+                continue
+            label = cells[0].get_text(' ', strip=True)
+            field = next((name for name, pattern in COST_LABELS if pattern.match(label)), None)
+            if field is None or field in details:
+                continue
+            for column, cell in enumerate(cells[1:], 1):
+                amount = _parse_amount(cell.get_text(' ', strip=True))
+                if amount is not None:
+                    monthly = column < len(header) and MONTHLY_HEADER.search(header[column])
+                    details[field] = amount * 12 if monthly else amount
+                    break
+
+    return details
+
+
+class ListingEnricher:
+    def __init__(self, concurrency=ENRICH_CONCURRENCY, rate=ENRICH_RATE, timeout=ENRICH_TIMEOUT,
+                 session=None):
+        """
+        Initialize the enricher.
+
+        Args:
+            concurrency: Detail pages in flight at once
+            rate: Requests per second to one host
+            timeout: Seconds to wait for a page
+            session: Optional requests session (defaults to one with the
+                http_cache adapter and browser headers)
+        """
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self.timeout = timeout
+        self.session = session
+        if self.session is None:
+            self.session = requests.Session()
+            adapter = CachingAdapter(ttl=DETAIL_CACHE_TTL, pool_connections=4, pool_maxsize=self.concurrency)
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+            self.session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                'Accept': 'text/html,application/xhtml+xml'
+            })
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='enrich')
+        self.next_slot = {}  # host -> monotonic time of its next free request slot
+        self.lock = threading.Lock()
+        self.stats = {'fetched': 0, 'enriched': 0, 'failed': 0, 'skipped': 0, 'retries': 0}
+
+    def _count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+    async def _throttle(self, host):
+        """Wait for this host's next request slot, spacing requests 1/rate apart."""
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, 0.0))
+            self.next_slot[host] = slot + 1.0 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _fetch(self, url, semaphore):
+        """Fetch a page's text, retrying 429 and 5xx responses with backoff."""
+        loop = asyncio.get_running_loop()
+        host = urlparse(url).netloc
+        for attempt in range(ENRICH_RETRIES + 1):
+            async with semaphore:
+                await self._throttle(host)
+                response = await loop.run_in_executor(
+                    self.executor, partial(self.session.get, url, timeout=self.timeout)
+                )
+            if response.status_code != 429 and response.status_code < 500 or attempt == ENRICH_RETRIES:
+                response.raise_for_status()
+                return response.text
+            self._count('retries')
+            try:
+                delay = float(response.headers.get('Retry-After', ''))
+            except ValueError:
+                delay = 0.5 * 2 ** attempt
+            await asyncio.sleep(min(delay, 30))
+
+    async def _enrich_one(self, listing, semaphore):
+        url = listing.get('url')
+        if not url or not urlparse(url).scheme.startswith('http'):
+            self._count('skipped')
+            return
+        try:
+            page = await self._fetch(url, semaphore)
+            details = parse_detail_page(page)
+        except Exception as e:
+            self._count('failed')
+            print(f"Error enriching {url}: {str(e)}")
+            return
+        self._count('fetched')
+        if details:
+            listing.update(details)
+            self._count('enriched')
+
+    async def enrich(self, listings):
+        """Fetch the detail pages of listings concurrently and add their details in place."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*(self._enrich_one(listing, semaphore) for listing in listings))
+        return listings
+
+    def enrich_listings(self, listings):
+        """
+        Enrich listings in place; for code outside an event loop (e.g. a pipeline stage).
+
+        Returns:
+            The same listings
+        """
+        return asyncio.run(self.enrich(listings))
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        enricher = ListingEnricher(concurrency=1)
+        listing = {'url': sys.argv[1]}
+        enricher.enrich_listings([listing])
+        print(listing)
+        enricher.close()
+    else:
+        print(__doc__)
@@ -0,0 +1,477 @@
+"""
+Listing-card parser for Centris search result pages.
+
+The original parser ran one BeautifulSoup find() per field with a freshly
+built regex, so every card was rescanned eight times. Here the patterns
+are compiled once and a card is walked a single time, picking up the
+first element that matches each field. The field rules are unchanged,
+so the output is identical to the original parser, which is kept as
+legacy_parse_card() as the reference.
+
+With LISTING_PARSER=lxml (and lxml installed), whole pages are parsed
+with lxml instead of html.parser and the cards are walked on the lxml
+tree, which is several times faster again. It's opt-in: lxml repairs
+badly nested markup (unclosed divs, a div inside a p) differently from
+html.parser, so on such pages a card can come out differently. On
+well-formed pages, like the corpus, the listings are the same.
+
+    python listing_parser.py bench [fixtures_dir] [repeat]
+
+parses the saved result pages in fixtures/centris_pages with every
+parser, checks that the listings are identical and reports cards/s.
+"""
+
+import contextlib
+import glob
+import io
+import json
+import os
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup, Tag
+
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:  # Optional: html.parser is used instead
+    lxml = None
+
+
+BASE_URL = 'https://www.centris.ca'
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'centris_pages')
+
+FAST_PATH = lxml is not None and os.getenv('LISTING_PARSER', 'bs4') == 'lxml'
+
+CARD_CLASS = re.compile('property-thumbnail-item|property-card')
+PRICE_CLASS = re.compile('price|Price')
+ADDRESS_CLASS = re.compile('address|Address')
+LINK_CLASS = re.compile('property-link|item-link')
+BED_CLASS = re.compile('bed|bedroom')
+BATH_CLASS = re.compile('bath')
+TYPE_CLASS = re.compile('category|type|property-type')
+SQFT_TEXT = re.compile(r'sq\.?\s*ft|pi²|ft²', re.I)
+NUMBER = re.compile(r'(\d+)')
+NON_DIGITS = re.compile(r'[^\d]')
+NUMBER_WITH_COMMAS = re.compile(r'([\d,]+)')
+LISTING_ID = re.compile(r'/(\d+)/?$')
+
+# Strings inside these tags are not part of get_text() (bs4 gives them their own string classes)
+NON_TEXT_TAGS = ('script', 'style', 'template')
+
+
+def _build_listing(price_text, address, link_title, href, bed_text, bath_text, sqft_text, property_type,
+                   base_url):
+    """
+    Turn the raw field values found in a card into a listing dict.
+
+    Returns:
+        The listing, or None if it has no price or no address
+    """
+    listing = {}
+
+    if price_text is not None:
+        price_clean = NON_DIGITS.sub('', price_text)
+        listing['price'] = int(price_clean) if price_clean else None
+
+    if address is not None:
+        listing['address'] = address
+    elif link_title is not None:
+        listing['address'] = link_title
+
+    if href is not None:
+        listing['url'] = href if href.startswith('http') else f"{base_url}{href}"
+        id_match = LISTING_ID.search(href)
+        if id_match:
+            listing['centris_id'] = id_match.group(1)
+
+    for key, text in (('bedrooms', bed_text), ('bathrooms', bath_text)):
+        if text is not None:
+            match = NUMBER.search(text)
+            if match:
+                listing[key] = int(match.group(1))
+
+    if sqft_text is not None:
+        sqft_match = NUMBER_WITH_COMMAS.search(sqft_text)
+        if sqft_match:
+            listing['sqft'] = int(sqft_match.group(1).replace(',', ''))
+
+    if property_type is not None:
+        listing['property_type'] = property_type
+
+    # Only return if we have at least price and address
+    if listing.get('price') and listing.get('address'):
+        return listing
+    return None
+
+
+def parse_card(card, base_url=BASE_URL):
+    """
+    Parse a listing card (a BeautifulSoup tag) in one pass over its descendants.
+
+    Args:
+        card: Tag of one property card
+        base_url: Prepended to relative listing links
+
+    Returns:
+        Listing dict, or None if the card has no price or address
+    """
+    price = address = link = anchor = bed = bath = sqft = type_elem = None
+
+    try:
+        for node in card.descendants:
+            if isinstance(node, Tag):
+                classes = node.get('class')
+                if classes is not None:
+                    if not isinstance(classes, str):
+                        classes = ' '.join(classes)
+                    if price is None and PRICE_CLASS.search(classes):
+                        price = node
+                    if address is None and ADDRESS_CLASS.search(classes):
+                        address = node
+                    if type_elem is None and TYPE_CLASS.search(classes):
+                        type_elem = node
+                    if bed is None and BED_CLASS.search(classes):
+                        string = node.string
+                        if string is not None and NUMBER.search(string):
+                            bed = node
+                    if bath is None and BATH_CLASS.search(classes):
+                        string = node.string
+                        if string is not None and NUMBER.search(string):
+                            bath = node
+                    if link is None and node.name == 'a' and LINK_CLASS.search(classes):
+                        link = node
+                if anchor is None and node.name == 'a' and node.get('href') is not None:
+                    anchor = node
+            elif sqft is None and SQFT_TEXT.search(node):
+                sqft = node
+
+        return _build_listing(
+            price.get_text(strip=True) if price is not None else None,
+            address.get_text(strip=True) if address is not None else None,
+            link.get('title', 'Unknown Address') if link is not None else None,
+            anchor['href'] if anchor is not None else None,
+            bed.get_text() if bed is not None else None,
+            bath.get_text() if bath is not None else None,
+            sqft,
+            type_elem.get_text(strip=True) if type_elem is not None else None,
+            base_url
+        )
+    except Exception as e:
+        print(f"Error extracting listing details: {str(e)}")
+        return None
+
+
+def _lxml_string(element):
+    """Equivalent of bs4's Tag.string: the text of an element whose only content is one string."""
+    while True:
+        children = list(element)
+        nodes = (1 if element.text else 0) + len(children) + sum(1 for child in children if child.tail)
+        if nodes != 1:
+            return None
+        if element.text:
+            return element.text
+        element = children[0]
+        if not isinstance(element.tag, str):  # A comment is its own string
+            return element.text or None
+
+
+def _lxml_walk(element):
+    """
+    Walk an lxml element's descendants and strings in document order.
+
+    Yields (descendant, None, None) on entering each descendant (comments
+    included) and (None, string, is_text) for each string, where is_text
+    tells whether bs4's get_text() would include it (not in a comment,
+    or in or under a script, style or template).
+    """
+    hidden = any(node.tag in NON_TEXT_TAGS for node in element.iterancestors()) or element.tag in NON_TEXT_TAGS
+    if element.text:
+        yield None, element.text, not hidden
+    stack = [(element, iter(element), hidden)]
+    while stack:
+        parent, children, hidden = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            if stack and parent.tail:
+                yield None, parent.tail, not stack[-1][2]
+            continue
+        yield child, None, None
+        if not isinstance(child.tag, str):  # Comment or processing instruction
+            if child.text:
+                yield None, child.text, False
+            if child.tail:
+                yield None, child.tail, not hidden
+            continue
+        child_hidden = hidden or child.tag in NON_TEXT_TAGS
+        if child.text:
+            yield None, child.text, not child_hidden
+        stack.append((child, iter(child), child_hidden))
+
+
+def _lxml_text(element, strip=False):
+    """Equivalent of bs4's get_text(): the element's strings in order, without comments, scripts or styles."""
+    parts = [text for _, text, is_text in _lxml_walk(element) if is_text]
+    if strip:
+        return ''.join(text for text in (part.strip() for part in parts) if text)
+    return ''.join(parts)
+
+
+def parse_card_lxml(card, base_url=BASE_URL):
+    """
+    Parse a listing card (an lxml element) in one pass; same rules as parse_card().
+
+    Args:
+        card: lxml.html element of one property card
+        base_url: Prepended to relative listing links
+
+    Returns:
+        Listing dict, or None if the card has no price or address
+    """
+    price = address = link = anchor = bed = bath = sqft = type_elem = None
+
+    try:
+        for node, text, _ in _lxml_walk(card):
+            if text is not None:
+                # Any string counts for the square footage, comments included
+                if sqft is None and SQFT_TEXT.search(text):
+                    sqft = text
+            elif isinstance(node.tag, str):
+                classes = node.get('class')
+                if classes is not None:
+                    if price is None and PRICE_CLASS.search(classes):
+                        price = node
+                    if address is None and ADDRESS_CLASS.search(classes):
+                        address = node
+                    if type_elem is None and TYPE_CLASS.search(classes):
+                        type_elem = node
+                    if bed is None and BED_CLASS.search(classes):
+                        string = _lxml_string(node)
+                        if string is not None and NUMBER.search(string):
+                            bed = node
+                    if bath is None and BATH_CLASS.search(classes):
+                        string = _lxml_string(node)
+                        if string is not None and NUMBER.search(string):
+                            bath = node
+                    if link is None and node.tag == 'a' and LINK_CLASS.search(classes):
+                        link = node
+                if anchor is None and node.tag == 'a' and node.get('href') is not None:
+                    anchor = node
+
+        return _build_listing(
+            _lxml_text(price, strip=True) if price is not None else None,
+            _lxml_text(address, strip=True) if address is not None else None,
+            link.get('title', 'Unknown Address') if link is not None else None,
+            anchor.get('href') if anchor is not None else None,
+            _lxml_text(bed) if bed is not None else None,
+            _lxml_text(bath) if bath is not None else None,
+            sqft,
+            _lxml_text(type_elem, strip=True) if type_elem is not None else None,
+            base_url
+        )
+    except Exception as e:
+        print(f"Error extracting listing details: {str(e)}")
+        return None
+
+
+def legacy_parse_card(card, base_url=BASE_URL):
+    """The original per-field parser, kept as the reference for parse_card()."""
+    listing = {}
+
+    try:
+        # Extract price
+        price_elem = card.find(class_=re.compile('price|Price'))
+        if price_elem:
+            price_text = price_elem.get_text(strip=True)
+            # Remove currency symbols and commas
+            price_clean = re.sub(r'[^\d]', '', price_text)
+            listing['price'] = int(price_clean) if price_clean else None
+
+        # Extract address
+        address_elem = card.find(class_=re.compile('address|Address'))
+        if address_elem:
+            listing['address'] = address_elem.get_text(strip=True)
+        else:
+            # Try to find it in a link
+            link_elem = card.find('a', class_=re.compile('property-link|item-link'))
+            if link_elem:
+                listing['address'] = link_elem.get('title', 'Unknown Address')
+
+        # Extract listing URL
+        link_elem = card.find('a', href=True)
+        if link_elem:
+            href = link_elem['href']
+            listing['url'] = href if href.startswith('http') else f"{base_url}{href}"
+            # Extract listing ID from URL
+            id_match = re.search(r'/(\d+)/?$', href)
+            if id_match:
+                listing['centris_id'] = id_match.group(1)
+
+        # Extract bedrooms
+        bed_elem = card.find(class_=re.compile('bed|bedroom'), string=re.compile(r'\d+'))
+        if bed_elem:
+            bed_match = re.search(r'(\d+)', bed_elem.get_text())
+            if bed_match:
+                listing['bedrooms'] = int(bed_match.group(1))
+
+        # Extract bathrooms
+        bath_elem = card.find(class_=re.compile('bath'), string=re.compile(r'\d+'))
+        if bath_elem:
+            bath_match = re.search(r'(\d+)', bath_elem.get_text())
+            if bath_match:
+                listing['bathrooms'] = int(bath_match.group(1))
+
+        # Extract square footage
+        sqft_elem = card.find(string=re.compile(r'sq\.?\s*ft|pi²|ft²', re.I))
+        if sqft_elem:
+            sqft_match = re.search(r'([\d,]+)', sqft_elem)
+            if sqft_match:
+                sqft_clean = sqft_match.group(1).replace(',', '')
+                listing['sqft'] = int(sqft_clean)
+
+        # Extract property type
+        type_elem = card.find(class_=re.compile('category|type|property-type'))
+        if type_elem:
+            listing['property_type'] = type_elem.get_text(strip=True)
+
+        # Only return if we have at least price and address
+        if listing.get('price') and listing.get('address'):
+            return listing
+
+    except Exception as e:
+        print(f"Error extracting listing details: {str(e)}")
+
+    return None
+
+
+def find_cards(soup):
+    """Find the property cards of a parsed result page (falling back to <article> elements)."""
+    cards = soup.find_all('div', class_=CARD_CLASS)
+    return cards or soup.find_all('article')
+
+
+def _find_cards_lxml(root):
+    cards = [div for div in root.iter('div') if CARD_CLASS.search(div.get('class') or '')]
+    return cards or list(root.iter('article'))
+
+
+def parse_page(page_source, base_url=BASE_URL, max_listings=None, fast=None):
+    """
+    Parse the listing cards of a search result page.
+
+    Args:
+        page_source: HTML of the page
+        base_url: Prepended to relative listing links
+        max_listings: Only parse the first max_listings cards
+        fast: Use lxml (defaults to FAST_PATH, set by LISTING_PARSER=lxml)
+
+    Returns:
+        (number of cards found, list with a listing dict or None per parsed card)
+    """
+    if fast is None:
+        fast = FAST_PATH
+    if fast:
+        try:
+            root = lxml.html.document_fromstring(page_source)
+        except (ValueError, lxml.etree.ParserError) as e:
+            print(f"lxml could not parse the page, using html.parser: {str(e)}")
+        else:
+            cards = _find_cards_lxml(root)
+            return len(cards), [parse_card_lxml(card, base_url) for card in cards[:max_listings]]
+
+    cards = find_cards(BeautifulSoup(page_source, 'html.parser'))
+    return len(cards), [parse_card(card, base_url) for card in cards[:max_listings]]
+
+
+def _legacy_parse_page(page_source, base_url=BASE_URL):
+    soup = BeautifulSoup(page_source, 'html.parser')
+    cards = soup.find_all('div', class_=re.compile('property-thumbnail-item|property-card'))
+    if not cards:
+        cards = soup.find_all('article')
+    return len(cards), [legacy_parse_card(card, base_url) for card in cards]
+
+
+def bench(fixtures_dir=FIXTURES_DIR, repeat=20):
+    """
+    Parse every saved page with each parser, check the outputs match and report throughput.
+
+    Card parsing alone is timed on pre-parsed soups (legacy vs one-pass);
+    whole pages, tree building included, are timed for every parser.
+
+    Returns:
+        True if every parser produced the same listings as the legacy one
+    """
+    paths = sorted(glob.glob(os.path.join(fixtures_dir, '*.html')))
+    pages = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append(f.read())
+    if not pages:
+        print(f"No .html pages in {fixtures_dir}")
+        return False
+
+    quiet = contextlib.redirect_stdout(io.StringIO())  # Cards that fail to parse print an error every time
+    with quiet:
+        expected = [_legacy_parse_page(page) for page in pages]
+    total_cards = sum(found for found, _ in expected)
+    print(f"{len(pages)} pages, {total_cards} cards, "
+          f"{sum(listing is not None for _, parsed in expected for listing in parsed)} listings")
+
+    page_parsers = {'legacy': _legacy_parse_page, 'one-pass': lambda page: parse_page(page, fast=False)}
+    if lxml is not None:
+        page_parsers['lxml'] = lambda page: parse_page(page, fast=True)
+    else:
+        print("lxml is not installed; skipping the fast path")
+
+    identical = True
+    for name, parse in page_parsers.items():
+        for path, page, want in zip(paths, pages, expected):
+            with quiet:
+                got = parse(page)
+            if got != want:
+                identical = False
+                print(f"MISMATCH: {name} on {os.path.basename(path)}")
+                for index, (a, b) in enumerate(zip(want[1], got[1])):
+                    if a != b:
+                        print(f"  card {index}: expected {json.dumps(a)}\n  {' ' * len(str(index))}       got {json.dumps(b)}")
+
+    soups = [BeautifulSoup(page, 'html.parser') for page in pages]
+    cards = [card for soup in soups for card in find_cards(soup)]
+    print(f"\nCard parsing ({len(cards)} cards x {repeat}):")
+    for name, parse in (('legacy', legacy_parse_card), ('one-pass', parse_card)):
+        start = time.perf_counter()
+        with quiet:
+            for _ in range(repeat):
+                for card in cards:
+                    parse(card)
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<9} {len(cards) * repeat / elapsed:>10,.0f} cards/s")
+
+    print(f"\nWhole pages, tree building included ({len(pages)} pages x {repeat}):")
+    for name, parse in page_parsers.items():
+        start = time.perf_counter()
+        with quiet:
+            for _ in range(repeat):
+                for page in pages:
+                    parse(page)
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<9} {total_cards * repeat / elapsed:>10,.0f} cards/s")
+
+    print(f"\nOutputs {'identical' if identical else 'DIFFER'}")
+    return identical
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        fixtures_dir = sys.argv[2] if len(sys.argv) > 2 else FIXTURES_DIR
+        repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+        sys.exit(0 if bench(fixtures_dir, repeat) else 1)
+
+    # Parse a saved page given on the command line
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        found, parsed = parse_page(f.read())
+    print(f"Found {found} property cards")
+    for listing in parsed:
+        print(json.dumps(listing, ensure_ascii=False))
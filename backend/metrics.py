@@ -0,0 +1,236 @@
+"""
+Lightweight Prometheus-style metrics for the API.
+
+Counters and latency histograms live in process memory behind a lock, so
+recording a value costs a dict update. When METRICS_DIR is set (e.g. under
+gunicorn with several workers), each process also writes its values to
+<METRICS_DIR>/metrics_<pid>.json every few seconds, and the /metrics
+endpoint adds up the files of every worker. Point METRICS_DIR at a fresh
+directory on each deploy (a tmpfs works well).
+"""
+
+import atexit
+import glob
+import json
+import os
+import time
+from contextlib import contextmanager
+from threading import Lock, get_ident
+
+
+# Latency buckets in seconds, shared by every histogram
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels):
+    """Turn a labels dict into a hashable, ordered key."""
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(label_key):
+    """Render a label key in Prometheus exposition format."""
+    if not label_key:
+        return ''
+    parts = []
+    for name, value in label_key:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _format_value(value):
+    """Render a sample value, keeping integers free of a trailing .0."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    def __init__(self, directory=None, flush_interval=5.0):
+        """
+        Initialize the registry.
+
+        Args:
+            directory: Shared directory for multi-process aggregation, or None
+                to only report this process
+            flush_interval: Minimum seconds between writes to the directory
+        """
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.lock = Lock()
+        self.descriptions = {}  # name -> (type, help)
+        self.counters = {}  # (name, label_key) -> value
+        self.histograms = {}  # (name, label_key) -> [bucket counts..., +Inf count, sum]
+        self._last_flush = 0.0
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            atexit.register(self.flush)
+
+    def describe(self, name, metric_type, help_text):
+        """Register the TYPE and HELP lines for a metric."""
+        self.descriptions[name] = (metric_type, help_text)
+
+    def inc(self, name, labels=None, amount=1):
+        """Increment a counter."""
+        key = (name, _label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+        self._maybe_flush()
+
+    def observe(self, name, value, labels=None):
+        """Record one observation in a histogram."""
+        key = (name, _label_key(labels))
+        with self.lock:
+            state = self.histograms.get(key)
+            if state is None:
+                state = self.histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            else:
+                state[len(LATENCY_BUCKETS)] += 1
+            state[-1] += value
+        self._maybe_flush()
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time a block of code into a histogram."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, labels)
+
+    def _snapshot(self):
+        """Copy this process's values as JSON-friendly lists."""
+        with self.lock:
+            return {
+                'counters': [[name, list(map(list, key)), value]
+                             for (name, key), value in self.counters.items()],
+                'histograms': [[name, list(map(list, key)), list(state)]
+                               for (name, key), state in self.histograms.items()]
+            }
+
+    def _file_path(self):
+        return os.path.join(self.directory, f"metrics_{os.getpid()}.json")
+
+    def _maybe_flush(self):
+        if self.directory and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write this process's values to the shared directory."""
+        if not self.directory:
+            return
+        self._last_flush = time.monotonic()
+        path = self._file_path()
+        temp_file = f"{path}.{get_ident()}.tmp"
+        try:
+            with open(temp_file, 'w') as f:
+                json.dump(self._snapshot(), f)
+            os.replace(temp_file, path)
+        except OSError as e:
+            print(f"Error writing metrics: {str(e)}")
+
+    def _collect(self):
+        """Sum the values of every process sharing the directory."""
+        snapshots = [self._snapshot()]
+        if self.directory:
+            own_path = self._file_path()
+            for path in glob.glob(os.path.join(self.directory, 'metrics_*.json')):
+                if path == own_path:
+                    continue
+                try:
+                    with open(path, 'r') as f:
+                        snapshots.append(json.load(f))
+                except (OSError, json.JSONDecodeError):
+                    continue
+
+        counters = {}
+        histograms = {}
+        for snapshot in snapshots:
+            for name, key, value in snapshot['counters']:
+                key = (name, tuple(map(tuple, key)))
+                counters[key] = counters.get(key, 0) + value
+            for name, key, state in snapshot['histograms']:
+                key = (name, tuple(map(tuple, key)))
+                if key in histograms:
+                    histograms[key] = [a + b for a, b in zip(histograms[key], state)]
+                else:
+                    histograms[key] = list(state)
+        return counters, histograms
+
+    def counter_totals(self, name):
+        """Get aggregated counter values for one metric, keyed by label tuple."""
+        counters, _ = self._collect()
+        return {key: value for (metric, key), value in counters.items() if metric == name}
+
+    def render(self, gauges=None):
+        """
+        Render all metrics in Prometheus text exposition format.
+
+        Args:
+            gauges: Optional list of (name, labels, value) computed by the
+                caller at scrape time for this process
+        """
+        counters, histograms = self._collect()
+        lines = []
+        emitted = set()
+
+        def header(name, default_type):
+            if name in emitted:
+                return
+            emitted.add(name)
+            metric_type, help_text = self.descriptions.get(name, (default_type, name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+        for (name, key), value in sorted(counters.items()):
+            header(name, 'counter')
+            lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+        for (name, key), state in sorted(histograms.items()):
+            header(name, 'histogram')
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, state):
+                cumulative += count
+                bucket_key = key + (('le', _format_value(float(bound))),)
+                lines.append(f"{name}_bucket{_format_labels(bucket_key)} {cumulative}")
+            cumulative += state[len(LATENCY_BUCKETS)]
+            lines.append(f"{name}_bucket{_format_labels(key + (('le', '+Inf'),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(key)} {_format_value(float(state[-1]))}")
+            lines.append(f"{name}_count{_format_labels(key)} {cumulative}")
+
+        for name, labels, value in gauges or []:
+            header(name, 'gauge')
+            lines.append(f"{name}{_format_labels(_label_key(labels))} {_format_value(value)}")
+
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry(directory=os.getenv('METRICS_DIR') or None)
+
+metrics.describe('cashflow_http_requests_total', 'counter',
+                 'HTTP requests by method, route and status code')
+metrics.describe('cashflow_http_request_duration_seconds', 'histogram',
+                 'HTTP request latency by method and route')
+metrics.describe('cashflow_stage_duration_seconds', 'histogram',
+                 'Latency of internal stages (storage_read, geocode, prediction, financing, serialization)')
+metrics.describe('cashflow_pipeline_batch_duration_seconds', 'histogram',
+                 'Time a pipeline stage spent on one batch, by pipeline and stage')
+metrics.describe('cashflow_pipeline_items_total', 'counter',
+                 'Items taken in by pipeline stages, by pipeline and stage')
+metrics.describe('cashflow_scheduler_job_duration_seconds', 'histogram',
+                 'Duration of scheduled job runs, by job')
+metrics.describe('cashflow_scheduler_runs_total', 'counter',
+                 'Scheduled job runs by job and outcome (succeeded, failed, skipped)')
+metrics.describe('cashflow_cache_requests_total', 'counter',
+                 'Cache lookups by cache and result (hit or miss)')
+metrics.describe('cashflow_cache_hit_ratio', 'gauge',
+                 'Share of cache lookups that were hits')
+metrics.describe('cashflow_model_info', 'gauge',
+                 'Revenue model currently serving forecasts')
+metrics.describe('cashflow_portfolio_size', 'gauge',
+                 'Number of properties in storage')
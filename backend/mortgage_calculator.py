@@ -3,11 +3,22 @@ Mortgage and investment calculations module.
 """
 
 import os
+import numpy as np
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
+def round_each(values, ndigits=2):
+    """
+    Round an array element by element with the built-in round().
+
+    numpy's rounding can differ from round() in the last cent, so batch
+    results use this wherever the scalar methods round plain Python floats.
+    """
+    return np.array([round(value, ndigits) for value in np.asarray(values, dtype=float).tolist()])
+
+
 class MortgageCalculator:
     def __init__(self):
         """Initialize calculator with default values from environment."""
@@ -49,20 +60,65 @@ class MortgageCalculator:
 
         return monthly_payment
 
-    def calculate_total_monthly_costs(self, price):
-        """Calculate all monthly costs including mortgage, taxes, insurance, maintenance."""
+    def calculate_total_monthly_costs(self, price, annual_taxes=None, annual_condo_fees=None):
+        """
+        Calculate all monthly costs including mortgage, taxes, insurance, maintenance.
+
+        Args:
+            price: Property price
+            annual_taxes: Known municipal and school taxes per year, used
+                instead of the MONTHLY_PROPERTY_TAX_RATE estimate
+            annual_condo_fees: Known condo fees per year, used instead of
+                the flat MONTHLY_MAINTENANCE
+        """
         mortgage_payment = self.calculate_monthly_mortgage_payment(price)
-        property_tax = price * self.monthly_property_tax_rate / 12
-        total = mortgage_payment + property_tax + self.monthly_insurance + self.monthly_maintenance
+        if annual_taxes is not None:
+            property_tax = annual_taxes / 12
+        else:
+            property_tax = price * self.monthly_property_tax_rate / 12
+        maintenance = annual_condo_fees / 12 if annual_condo_fees is not None else self.monthly_maintenance
+        total = mortgage_payment + property_tax + self.monthly_insurance + maintenance
 
         return {
             'mortgage_payment': round(mortgage_payment, 2),
             'property_tax': round(property_tax, 2),
             'insurance': round(self.monthly_insurance, 2),
-            'maintenance': round(self.monthly_maintenance, 2),
+            'maintenance': round(maintenance, 2),
             'total_monthly_cost': round(total, 2)
         }
 
+    def calculate_total_monthly_costs_batch(self, prices, annual_taxes=None, annual_condo_fees=None):
+        """
+        Vectorized version of calculate_total_monthly_costs.
+
+        Args:
+            prices: Sequence of property prices
+            annual_taxes: Optional array of known yearly taxes, NaN where unknown
+            annual_condo_fees: Optional array of known yearly condo fees, NaN where unknown
+
+        Returns:
+            Dictionary with the same keys, each holding an array aligned with prices
+        """
+        prices = np.asarray(prices, dtype=float)
+        mortgage_payments = self.calculate_monthly_mortgage_payment(prices)
+        property_taxes = prices * self.monthly_property_tax_rate / 12
+        if annual_taxes is not None:
+            annual_taxes = np.asarray(annual_taxes, dtype=float)
+            property_taxes = np.where(np.isnan(annual_taxes), property_taxes, annual_taxes / 12)
+        maintenance = np.full(len(prices), self.monthly_maintenance)
+        if annual_condo_fees is not None:
+            annual_condo_fees = np.asarray(annual_condo_fees, dtype=float)
+            maintenance = np.where(np.isnan(annual_condo_fees), maintenance, annual_condo_fees / 12)
+        totals = mortgage_payments + property_taxes + self.monthly_insurance + maintenance
+
+        return {
+            'mortgage_payment': round_each(mortgage_payments),
+            'property_tax': round_each(property_taxes),
+            'insurance': np.full(len(prices), round(self.monthly_insurance, 2)),
+            'maintenance': round_each(maintenance),
+            'total_monthly_cost': round_each(totals)
+        }
+
 
 class InvestmentAnalyzer:
     """Analyze real estate investment metrics."""
@@ -160,6 +216,61 @@ class InvestmentAnalyzer:
             'cap_rate': round(cap_rate, 2)
         }
 
+    def analyze_investments(self, prices, monthly_revenues, monthly_costs_breakdown):
+        """
+        Vectorized version of analyze_investment.
+
+        Args:
+            prices: Sequence of property prices
+            monthly_revenues: Array of expected monthly revenues
+            monthly_costs_breakdown: Dict of cost arrays from
+                MortgageCalculator.calculate_total_monthly_costs_batch
+
+        Returns:
+            Dictionary with the same keys as analyze_investment, each holding
+            an array aligned with prices
+        """
+        prices = np.asarray(prices, dtype=float)
+        monthly_revenues = np.asarray(monthly_revenues, dtype=float)
+        down_payments = prices * 0.20  # Assuming 20% down
+        total_monthly_costs = monthly_costs_breakdown['total_monthly_cost']
+
+        monthly_operating_expenses = (
+            monthly_costs_breakdown['property_tax'] +
+            monthly_costs_breakdown['insurance'] +
+            monthly_costs_breakdown['maintenance']
+        )
+
+        monthly_cashflows = monthly_revenues - total_monthly_costs
+        annual_cashflows = monthly_cashflows * 12
+
+        annual_revenues = monthly_revenues * 12
+        annual_operating_expenses = monthly_operating_expenses * 12
+        annual_nois = annual_revenues - annual_operating_expenses
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            coc_returns = np.where(down_payments == 0, 0.0, (annual_cashflows / down_payments) * 100)
+            cap_rates = np.where(prices == 0, 0.0, (annual_nois / prices) * 100)
+
+        # Revenue-derived figures are numpy floats in the scalar path too,
+        # so they round the numpy way; price-derived ones use round_each.
+        return {
+            'down_payment': round_each(down_payments),
+            'monthly_costs': {
+                'mortgage': monthly_costs_breakdown['mortgage_payment'],
+                'property_tax': monthly_costs_breakdown['property_tax'],
+                'insurance': monthly_costs_breakdown['insurance'],
+                'maintenance': monthly_costs_breakdown['maintenance'],
+                'total': total_monthly_costs
+            },
+            'monthly_revenue': np.round(monthly_revenues, 2),
+            'monthly_cashflow': np.round(monthly_cashflows, 2),
+            'annual_cashflow': np.round(annual_cashflows, 2),
+            'annual_noi': np.round(annual_nois, 2),
+            'cash_on_cash_return': np.round(coc_returns, 2),
+            'cap_rate': np.round(cap_rates, 2)
+        }
+
 
 if __name__ == '__main__':
     # Test the calculator
@@ -0,0 +1,241 @@
+"""
+Staged pipelines of worker threads joined by bounded queues.
+
+A Pipeline pulls batches (lists) from a source iterator and passes them
+through a chain of stages, each running on its own thread, so fetching,
+parsing, storing and analyzing overlap instead of taking turns. The queue
+between two stages holds at most `buffer_size` batches: when a stage falls
+behind, the stages before it block (backpressure) rather than piling
+batches up in memory, so a long run holds a few batches per stage at most.
+
+Every stage counts its batches and items and the time it spent working,
+waiting for input and waiting for room downstream, which makes the
+bottleneck obvious: it is the stage that is busy while the others wait.
+An exception in any stage cancels the whole pipeline and is re-raised to
+the consumer.
+"""
+
+import os
+import queue
+import threading
+import time
+
+from metrics import metrics
+
+# Batches buffered between two stages
+PIPELINE_BUFFER = int(os.getenv('PIPELINE_BUFFER', '4'))
+
+_END = object()  # Marks the end of a stage's output
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.batches = 0
+        self.items_in = 0
+        self.items_out = 0
+        self.busy = 0.0  # Seconds spent in the stage function
+        self.waiting = 0.0  # Seconds spent waiting for input
+        self.blocked = 0.0  # Seconds spent waiting for room downstream
+        self.started = None
+        self.finished = None
+
+    def as_dict(self):
+        """Summarize the stage, with throughput per second of work and of wall time."""
+        wall = ((self.finished or time.perf_counter()) - self.started) if self.started else 0.0
+        return {
+            'stage': self.name,
+            'batches': self.batches,
+            'items_in': self.items_in,
+            'items_out': self.items_out,
+            'busy_seconds': round(self.busy, 3),
+            'waiting_seconds': round(self.waiting, 3),
+            'blocked_seconds': round(self.blocked, 3),
+            'items_per_second': round(self.items_in / self.busy, 1) if self.busy else None,
+            'wall_items_per_second': round(self.items_in / wall, 1) if wall else None
+        }
+
+
+class Pipeline:
+    def __init__(self, source, stages, buffer_size=PIPELINE_BUFFER, name='pipeline', source_name='fetch'):
+        """
+        Set up a pipeline; nothing runs until it is iterated or run.
+
+        Args:
+            source: Iterable of batches (lists); iterated on its own thread
+            stages: List of (name, func) pairs. func(batch) returns the batch
+                for the next stage; None or an empty list drops it
+            buffer_size: Batches held between two stages
+            name: Label for log lines and metrics
+            source_name: Stage name reported for the source
+        """
+        self.source = source
+        self.stages = list(stages)
+        self.buffer_size = max(1, buffer_size)
+        self.name = name
+        self.stats = [StageStats(source_name)] + [StageStats(stage_name) for stage_name, _ in self.stages]
+        self.cancelled = threading.Event()
+        self.error = None
+        self.threads = []
+        self.started = None
+
+    def _fail(self, error):
+        if self.error is None:
+            self.error = error
+        self.cancelled.set()
+
+    def _put(self, output, item, stats):
+        """Hand an item downstream, waiting for room unless the pipeline is cancelled."""
+        start = time.perf_counter()
+        try:
+            while not self.cancelled.is_set():
+                try:
+                    output.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            stats.blocked += time.perf_counter() - start
+
+    def _get(self, source, stats):
+        """Take the next item from upstream, or _END once the pipeline is cancelled."""
+        start = time.perf_counter()
+        try:
+            while True:
+                try:
+                    return source.get(timeout=0.1)
+                except queue.Empty:
+                    if self.cancelled.is_set():
+                        return _END
+        finally:
+            stats.waiting += time.perf_counter() - start
+
+    def _record(self, stats, batch_in, batch_out, elapsed):
+        stats.batches += 1
+        stats.items_in += len(batch_in)
+        stats.items_out += len(batch_out or ())
+        stats.busy += elapsed
+        metrics.observe('cashflow_pipeline_batch_duration_seconds', elapsed,
+                        {'pipeline': self.name, 'stage': stats.name})
+        metrics.inc('cashflow_pipeline_items_total', {'pipeline': self.name, 'stage': stats.name},
+                    len(batch_in))
+
+    def _run_source(self, output, stats):
+        stats.started = time.perf_counter()
+        iterator = iter(self.source)
+        try:
+            while not self.cancelled.is_set():
+                start = time.perf_counter()
+                try:
+                    batch = next(iterator)
+                except StopIteration:
+                    break
+                self._record(stats, batch, batch, time.perf_counter() - start)
+                if batch and not self._put(output, batch, stats):
+                    break
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            if hasattr(iterator, 'close'):
+                iterator.close()  # Lets a generator cancel downloads it started
+            stats.finished = time.perf_counter()
+            self._put(output, _END, stats)
+
+    def _run_stage(self, func, source, output, stats):
+        stats.started = time.perf_counter()
+        try:
+            while True:
+                batch = self._get(source, stats)
+                if batch is _END:
+                    break
+                start = time.perf_counter()
+                result = func(batch)
+                self._record(stats, batch, result, time.perf_counter() - start)
+                if result and not self._put(output, result, stats):
+                    break
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            stats.finished = time.perf_counter()
+            self._put(output, _END, stats)
+
+    def _start(self):
+        queues = [queue.Queue(maxsize=self.buffer_size) for _ in range(len(self.stages) + 1)]
+        self.threads = [threading.Thread(target=self._run_source, args=(queues[0], self.stats[0]),
+                                         name=f"{self.name}-{self.stats[0].name}", daemon=True)]
+        for index, (stage_name, func) in enumerate(self.stages):
+            self.threads.append(threading.Thread(
+                target=self._run_stage, args=(func, queues[index], queues[index + 1], self.stats[index + 1]),
+                name=f"{self.name}-{stage_name}", daemon=True
+            ))
+        self.started = time.perf_counter()
+        for thread in self.threads:
+            thread.start()
+        return queues[-1]
+
+    def __iter__(self):
+        """
+        Run the pipeline, yielding the last stage's batches in the caller's thread.
+
+        Closing the iterator early cancels the stages still running.
+        """
+        if self.started is not None:
+            raise RuntimeError('A pipeline can only be run once')
+        output = self._start()
+        consumer = StageStats('consumer')
+        try:
+            while True:
+                batch = self._get(output, consumer)
+                if batch is _END:
+                    break
+                yield batch
+        finally:
+            if self.error is None:
+                self.cancelled.set()  # Stops the stages if the consumer quit early
+            for thread in self.threads:
+                thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def run(self, sink=None, sink_name='sink'):
+        """
+        Run the pipeline to the end, passing each output batch to sink(batch).
+
+        The sink runs in the caller's thread and is reported as one more stage.
+
+        Returns:
+            List of per-stage stats dicts (see stats_report)
+        """
+        stats = StageStats(sink_name)
+        stats.started = time.perf_counter()
+        for batch in self:
+            start = time.perf_counter()
+            if sink is not None:
+                sink(batch)
+            self._record(stats, batch, (), time.perf_counter() - start)
+        stats.finished = time.perf_counter()
+        self.stats.append(stats)
+        return self.stats_report()
+
+    def stats_report(self):
+        """Per-stage stats dicts, in stage order."""
+        return [stats.as_dict() for stats in self.stats]
+
+    def elapsed(self):
+        """Seconds since the pipeline started."""
+        return time.perf_counter() - self.started if self.started else 0.0
+
+
+def format_stats(report):
+    """Render per-stage stats as a table for the logs."""
+    lines = [f"  {'stage':<10} {'batches':>7} {'in':>8} {'out':>8} {'busy s':>8} "
+             f"{'wait s':>8} {'block s':>8} {'items/s':>10}"]
+    for stage in report:
+        rate = stage['items_per_second']
+        lines.append(
+            f"  {stage['stage']:<10} {stage['batches']:>7} {stage['items_in']:>8} {stage['items_out']:>8} "
+            f"{stage['busy_seconds']:>8.2f} {stage['waiting_seconds']:>8.2f} {stage['blocked_seconds']:>8.2f} "
+            f"{rate if rate is not None else '-':>10}"
+        )
+    return '\n'.join(lines)
@@ -0,0 +1,218 @@
+"""
+Price and status history of stored listings.
+
+PropertyStorage overwrites a listing in place, so the history is kept on
+the side in an append-only SQLite table (data/price_history.db): a row is
+written only when a listing's price or status differs from its last row,
+e.g. a price drop, a sale, a removal or a relist. Rows are indexed by
+(centris_id, id) for a listing's timeline and by time for recent changes,
+so neither query scans the whole table.
+
+Run `python price_history.py <centris_id>` to print a listing's history,
+or `python price_history.py drops [days]` for the biggest recent drops.
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
+
+from metrics import metrics
+
+
+DEFAULT_HISTORY_FILE = 'data/price_history.db'
+
+# Status recorded for listings that don't carry one, and for deleted ones
+ACTIVE = 'active'
+REMOVED = 'removed'
+
+
+class PriceHistory:
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS price_history (
+            id INTEGER PRIMARY KEY,
+            centris_id TEXT NOT NULL,
+            recorded_at TEXT NOT NULL,
+            price INTEGER,
+            previous_price INTEGER,
+            status TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_price_history_listing ON price_history (centris_id, id);
+        CREATE INDEX IF NOT EXISTS idx_price_history_time ON price_history (recorded_at, centris_id);
+    """
+
+    def __init__(self, db_file=DEFAULT_HISTORY_FILE):
+        """
+        Open the history database, creating it if needed.
+
+        `created` tells whether the file was new, so the caller can seed it
+        with the listings already stored.
+        """
+        self.db_file = db_file
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.db_file) or '.', exist_ok=True)
+        self.created = not os.path.exists(self.db_file)
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self):
+        """Get this thread's connection (sqlite3 connections are per thread)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _write(self, func):
+        """Run func(conn) in an immediate write transaction, so each compare-and-append is atomic."""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = func(conn)
+            conn.execute('COMMIT')
+            return result
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    @staticmethod
+    def _latest(conn, centris_id):
+        """Get the (price, status) of a listing's last row, or None."""
+        return conn.execute(
+            'SELECT price, status FROM price_history WHERE centris_id = ? ORDER BY id DESC LIMIT 1',
+            (centris_id,)
+        ).fetchone()
+
+    @staticmethod
+    def _insert(conn, centris_id, timestamp, price, previous_price, status):
+        conn.execute(
+            'INSERT INTO price_history (centris_id, recorded_at, price, previous_price, status) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (centris_id, timestamp, price, previous_price, status)
+        )
+
+    def record(self, properties, timestamp):
+        """
+        Record the current price and status of listings that were written.
+
+        Args:
+            properties: Listing dicts; status defaults to 'active'
+            timestamp: ISO timestamp of the write
+
+        Returns:
+            Number of rows appended (listings whose price or status changed)
+        """
+        def write(conn):
+            appended = 0
+            for prop in properties:
+                centris_id = str(prop['centris_id'])
+                price = prop.get('price')
+                status = prop.get('status') or ACTIVE
+                latest = self._latest(conn, centris_id)
+                if latest is not None and latest == (price, status):
+                    continue
+                self._insert(conn, centris_id, timestamp, price,
+                             latest[0] if latest is not None else None, status)
+                appended += 1
+            return appended
+
+        return self._write(write)
+
+    def record_removed(self, centris_ids, timestamp):
+        """
+        Record listings as removed, keeping their last price.
+
+        Args:
+            centris_ids: Ids of the deleted listings, or None for every
+                listing not already removed (storage was cleared)
+            timestamp: ISO timestamp of the removal
+        """
+        def write(conn):
+            if centris_ids is None:
+                conn.execute(
+                    'INSERT INTO price_history (centris_id, recorded_at, price, previous_price, status) '
+                    'SELECT h.centris_id, ?, h.price, h.price, ? FROM price_history AS h '
+                    'JOIN (SELECT MAX(id) AS id FROM price_history GROUP BY centris_id) AS latest '
+                    'ON h.id = latest.id WHERE h.status != ?',
+                    (timestamp, REMOVED, REMOVED)
+                )
+                return
+            for centris_id in centris_ids:
+                latest = self._latest(conn, str(centris_id))
+                if latest is not None and latest[1] != REMOVED:
+                    self._insert(conn, str(centris_id), timestamp, latest[0], latest[0], REMOVED)
+
+        self._write(write)
+
+    def get_history(self, centris_id):
+        """
+        Get a listing's price and status changes, oldest first.
+
+        Returns:
+            List of dicts with recorded_at, price, previous_price and status
+        """
+        with metrics.timer('cashflow_stage_duration_seconds', stage='storage_read'):
+            rows = self._connection().execute(
+                'SELECT recorded_at, price, previous_price, status FROM price_history '
+                'WHERE centris_id = ? ORDER BY id',
+                (str(centris_id),)
+            ).fetchall()
+        return [
+            {'recorded_at': recorded_at, 'price': price, 'previous_price': previous_price, 'status': status}
+            for recorded_at, price, previous_price, status in rows
+        ]
+
+    def biggest_price_drops(self, days=7, limit=20):
+        """
+        Find the listings whose price fell the most over the last `days` days.
+
+        Only rows in the window are read, through the time index (pinned,
+        as the planner would otherwise scan the listing index to group).
+        A listing's drop runs from its price before its first change in
+        the window to its latest price; removed listings are left out.
+
+        Returns:
+            List of dicts with centris_id, previous_price, price, drop,
+            drop_percent, since (first change in the window) and
+            recorded_at (latest change), biggest drop first
+        """
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+        with metrics.timer('cashflow_stage_duration_seconds', stage='storage_read'):
+            rows = self._connection().execute(
+                'SELECT latest.centris_id, COALESCE(opening.previous_price, opening.price) AS start_price, '
+                'latest.price, opening.recorded_at, latest.recorded_at '
+                'FROM (SELECT centris_id, MIN(id) AS opening_id, MAX(id) AS latest_id '
+                '      FROM price_history INDEXED BY idx_price_history_time '
+                '      WHERE recorded_at >= ? GROUP BY centris_id) AS changed '
+                'JOIN price_history AS opening ON opening.id = changed.opening_id '
+                'JOIN price_history AS latest ON latest.id = changed.latest_id '
+                'WHERE latest.status != ? AND start_price > latest.price '
+                'ORDER BY start_price - latest.price DESC, latest.id LIMIT ?',
+                (cutoff, REMOVED, limit)
+            ).fetchall()
+        return [
+            {
+                'centris_id': centris_id,
+                'previous_price': start_price,
+                'price': price,
+                'drop': start_price - price,
+                'drop_percent': round((start_price - price) / start_price * 100, 2),
+                'since': since,
+                'recorded_at': recorded_at
+            }
+            for centris_id, start_price, price, since, recorded_at in rows
+        ]
+
+
+if __name__ == '__main__':
+    history = PriceHistory()
+    if len(sys.argv) > 1 and sys.argv[1] != 'drops':
+        for row in history.get_history(sys.argv[1]):
+            print(f"{row['recorded_at']}  {row['status']:>8}  {row['price']}")
+    else:
+        days = float(sys.argv[2]) if len(sys.argv) > 2 else 7
+        for drop in history.biggest_price_drops(days):
+            print(f"{drop['centris_id']}: {drop['previous_price']} -> {drop['price']} "
+                  f"(-{drop['drop']}, -{drop['drop_percent']}%) since {drop['since']}")
@@ -1,83 +1,362 @@
 """
-Property storage manager using JSON file for persistence.
-Allows real Centris property data to be stored and retrieved.
+Property storage manager.
+Allows real Centris property data to be stored and retrieved, persisted
+through a pluggable backend (JSON file by default, or SQLite).
 """
 
-import json
-import os
+from collections import namedtuple
 from datetime import datetime
 from threading import Lock
+import hashlib
+import json
+import os
 import re
 
+import numpy as np
+
+from geocoder import geocoder
+from metrics import metrics
+from price_history import PriceHistory
+from storage_backends import BACKENDS, create_backend
+
+
+class FrozenProperty(dict):
+    """
+    Read-only property record handed out from the storage snapshot.
+
+    It is still a dict, so it serializes and reads like one; copy it with
+    dict(prop) before modifying.
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('Stored properties are read-only; copy with dict(prop) to modify')
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (FrozenProperty, (dict(self),))
+
+
+# Parsed view of the store; `token` is the backend change token it was read at
+# and `positions` maps each centris_id to its row in properties and columns
+Snapshot = namedtuple('Snapshot', ['token', 'properties', 'positions', 'columns',
+                                   'last_updated', 'version'])
+
+# Numeric fields mirrored as float64 columns (NaN where missing or invalid).
+# Taxes and condo fees are yearly amounts from listing detail pages.
+COLUMN_FIELDS = ('price', 'bedrooms', 'bathrooms', 'sqft', 'latitude', 'longitude',
+                 'municipal_taxes', 'school_taxes', 'condo_fees')
+
+# Fields found on listing detail pages (see listing_enricher.py) rather than in
+# search results. They are left out of the content hash, and an ingested row
+# without them keeps the stored property's values.
+DETAIL_FIELDS = ('latitude', 'longitude', 'municipal_taxes', 'school_taxes', 'condo_fees')
+
+# Read-only numpy arrays aligned with Snapshot.properties, plus the centris_ids
+PortfolioColumns = namedtuple('PortfolioColumns', ('ids',) + COLUMN_FIELDS)
+
+
+def _float_or_nan(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def build_columns(properties):
+    """Build the columnar mirror of a sequence of property dicts."""
+    columns = [np.array([str(prop.get('centris_id')) for prop in properties], dtype=object)]
+    for field in COLUMN_FIELDS:
+        columns.append(np.array([_float_or_nan(prop.get(field)) for prop in properties], dtype=float))
+    return _freeze_columns(columns)
+
+
+def _freeze_columns(columns):
+    for column in columns:
+        column.flags.writeable = False
+    return PortfolioColumns(*columns)
+
+
+def _normalize_value(value):
+    if isinstance(value, str):
+        return ' '.join(value.split()) or None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return round(float(value), 6)
+    return value
+
+
+def content_hash(property_data):
+    """
+    Hash a property's content, ignoring formatting that doesn't change it.
+
+    Every field except content_hash and the DETAIL_FIELDS is included, so
+    enriching a listing or estimating its coordinates doesn't change it;
+    strings are compared with whitespace collapsed, numbers by value
+    (349000 == 349000.0), and empty fields count as missing.
+    """
+    normalized = {}
+    for key, value in property_data.items():
+        if key == 'content_hash' or key in DETAIL_FIELDS:
+            continue
+        value = _normalize_value(value)
+        if value is not None:
+            normalized[key] = value
+    encoded = json.dumps(normalized, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
 
 class PropertyStorage:
-    def __init__(self, storage_file='data/properties.json'):
-        """Initialize property storage with JSON file."""
-        self.storage_file = storage_file
-        self.lock = Lock()  # Thread-safe file operations
-        self._ensure_file_exists()
-
-    def _ensure_file_exists(self):
-        """Ensure the storage file exists with proper structure."""
-        if not os.path.exists(self.storage_file):
-            os.makedirs(os.path.dirname(self.storage_file), exist_ok=True)
-            self._write_data({
-                'properties': [],
-                'last_updated': None
-            })
-
-    def _read_data(self):
-        """Read data from JSON file."""
-        try:
-            with open(self.storage_file, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return {'properties': [], 'last_updated': None}
-
-    def _write_data(self, data):
-        """Write data to JSON file atomically."""
-        # Write to temporary file first, then rename (atomic operation)
-        temp_file = f"{self.storage_file}.tmp"
-        with open(temp_file, 'w') as f:
-            json.dump(data, f, indent=2)
-        os.replace(temp_file, self.storage_file)
+    def __init__(self, storage_file=None, backend='json', history_file=None):
+        """
+        Initialize property storage.
 
-    def get_all_properties(self):
-        """Get all stored properties."""
+        Reads are served from an in-memory snapshot of the store, revalidated
+        with the backend's cheap change token (file stat or version stamp),
+        so they only take the lock and re-parse after the data has changed,
+        whether by this process or another one.
+
+        Price and status changes are also recorded in a PriceHistory.
+
+        Args:
+            storage_file: Path of the JSON file or SQLite database; defaults
+                to data/properties.json or data/properties.db
+            backend: 'json' or 'sqlite'
+            history_file: Path of the price history database; defaults to
+                price_history.db next to the store
+        """
+        self.backend = create_backend(backend, storage_file)
+        # Serializes this process's writes and reloads; the backend itself
+        # coordinates writers in other processes (e.g. gunicorn workers)
+        self.lock = Lock()
+        self._snapshot = None
+
+        self.history = PriceHistory(history_file or os.path.join(
+            os.path.dirname(storage_file or BACKENDS[backend][1]), 'price_history.db'
+        ))
+        if self.history.created:
+            # Start every stored listing's history at its current price
+            properties, last_updated, _ = self.backend.load()
+            self.history.record(properties, last_updated or datetime.now().isoformat())
+
+    def _current_snapshot(self):
+        """Get an up-to-date snapshot, reloading it only if the store changed."""
+        token = self.backend.change_token()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.token == token:
+            metrics.inc('cashflow_cache_requests_total', {'cache': 'storage_snapshot', 'result': 'hit'})
+            return snapshot
+
+        metrics.inc('cashflow_cache_requests_total', {'cache': 'storage_snapshot', 'result': 'miss'})
         with self.lock:
-            data = self._read_data()
-            return data.get('properties', [])
-
-    def _geocode_address(self, address):
-        """
-        Extract or estimate coordinates from Montreal address.
-        Uses a simple mapping of Montreal neighborhoods to approximate coordinates.
-        """
-        # Default Montreal coordinates
-        default_coords = {'latitude': 45.5017, 'longitude': -73.5673}
-
-        # Neighborhood coordinate mappings (approximate centers)
-        neighborhoods = {
-            'downtown': {'latitude': 45.5017, 'longitude': -73.5673},
-            'ville-marie': {'latitude': 45.5017, 'longitude': -73.5673},
-            'plateau': {'latitude': 45.5200, 'longitude': -73.5800},
-            'mile-end': {'latitude': 45.5233, 'longitude': -73.6000},
-            'rosemont': {'latitude': 45.5400, 'longitude': -73.5800},
-            'verdun': {'latitude': 45.4583, 'longitude': -73.5700},
-            'griffintown': {'latitude': 45.4933, 'longitude': -73.5583},
-            'old montreal': {'latitude': 45.5050, 'longitude': -73.5540},
-            'westmount': {'latitude': 45.4833, 'longitude': -73.5967},
-            'outremont': {'latitude': 45.5200, 'longitude': -73.6083},
-        }
+            # Another thread may have reloaded while we waited
+            token = self.backend.change_token()
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.token == token:
+                return snapshot
+
+            # The token is read before the data, so a concurrent write can
+            # only make this snapshot look stale, never falsely fresh
+            if snapshot is not None:
+                *changes, pruned_version = self.backend.changes_since(snapshot.version)
+                if pruned_version <= snapshot.version <= changes[-1]:
+                    self._snapshot = self._patch_snapshot(snapshot, token, *changes)
+                    return self._snapshot
+
+            properties, last_updated, version = self.backend.load()
+            properties = tuple(FrozenProperty(prop) for prop in properties)
+            positions = {str(prop.get('centris_id')): row for row, prop in enumerate(properties)}
+            self._snapshot = Snapshot(token, properties, positions, build_columns(properties),
+                                      last_updated, version)
+            return self._snapshot
+
+    def _patch_snapshot(self, snapshot, token, upserts, deletes, last_updated, version):
+        """
+        Apply changes to a snapshot without reloading the store.
+
+        Only changed properties are parsed. Deleted rows are dropped first
+        (an id deleted and added again is in both lists), then updated rows
+        are overwritten in place and new ones appended, matching the
+        backends' insertion order.
+        """
+        if not upserts and not deletes:
+            return snapshot._replace(token=token, last_updated=last_updated, version=version)
+
+        properties = snapshot.properties
+        positions = snapshot.positions
+        columns = snapshot.columns
+
+        deleted_rows = [positions[centris_id] for centris_id in deletes if centris_id in positions]
+        if deleted_rows:
+            keep = np.ones(len(properties), dtype=bool)
+            keep[deleted_rows] = False
+            properties = tuple(prop for prop, kept in zip(properties, keep) if kept)
+            columns = [column[keep] for column in columns]
+            positions = {centris_id: row for row, centris_id in enumerate(columns[0])}
+
+        properties = list(properties)
+        positions = dict(positions)
+        updated_rows, updated, added = [], [], []
+        for prop in upserts:
+            prop = FrozenProperty(prop)
+            centris_id = str(prop.get('centris_id'))
+            row = positions.get(centris_id)
+            if row is None:
+                positions[centris_id] = len(properties)
+                properties.append(prop)
+                added.append(prop)
+            else:
+                properties[row] = prop
+                updated_rows.append(row)
+                updated.append(prop)
+
+        columns = [np.array(column) for column in columns]
+        if updated:
+            for column, values in zip(columns, build_columns(updated)):
+                column[updated_rows] = values
+        if added:
+            columns = [np.concatenate([column, values])
+                       for column, values in zip(columns, build_columns(added))]
+
+        return Snapshot(token, tuple(properties), positions, _freeze_columns(columns), last_updated, version)
+
+    def get_all_properties(self):
+        """Get all stored properties (an immutable tuple of read-only dicts)."""
+        return self._current_snapshot().properties
+
+    def get_property(self, centris_id):
+        """Get one stored property by centris_id, or None."""
+        snapshot = self._current_snapshot()
+        row = snapshot.positions.get(str(centris_id))
+        return snapshot.properties[row] if row is not None else None
+
+    def get_portfolio(self):
+        """
+        Get the stored properties with their columnar mirror.
+
+        Returns:
+            Tuple (properties, columns): the read-only property dicts and a
+            PortfolioColumns of read-only numpy arrays aligned with them
+        """
+        snapshot = self._current_snapshot()
+        return snapshot.properties, snapshot.columns
+
+    def select_rows(self, columns, min_price=None, max_price=None, bedrooms=None, bounds=None):
+        """
+        Get the rows of a PortfolioColumns matching all of the given filters.
+
+        Args:
+            columns: Columns from get_portfolio()
+            min_price, max_price: Inclusive price range
+            bedrooms: Exact number of bedrooms
+            bounds: (lat_min, lon_min, lat_max, lon_max) bounding box
+
+        Returns:
+            numpy array of matching row numbers, in storage order
+        """
+        mask = np.ones(len(columns.ids), dtype=bool)
+        price = np.nan_to_num(columns.price)  # A missing price counts as 0
+        if min_price is not None:
+            mask &= price >= min_price
+        if max_price is not None:
+            mask &= price <= max_price
+        if bedrooms is not None:
+            mask &= columns.bedrooms == bedrooms
+        if bounds is not None:
+            lat_min, lon_min, lat_max, lon_max = bounds
+            mask &= (columns.latitude >= lat_min) & (columns.latitude <= lat_max)
+            mask &= (columns.longitude >= lon_min) & (columns.longitude <= lon_max)
+        return np.flatnonzero(mask)
+
+    def find_properties(self, min_price=None, max_price=None, bedrooms=None, bounds=None):
+        """
+        Get stored properties matching all of the given filters.
+
+        Args:
+            min_price, max_price: Inclusive price range
+            bedrooms: Exact number of bedrooms
+            bounds: (lat_min, lon_min, lat_max, lon_max) bounding box
+        """
+        properties, columns = self.get_portfolio()
+        rows = self.select_rows(columns, min_price, max_price, bedrooms, bounds)
+        return [properties[row] for row in rows.tolist()]
+
+    def geocode_missing(self, properties):
+        """
+        Fill in coordinates for properties without them, in one batch.
+
+        Coordinates are estimated from the Montreal address (postal code,
+        FSA or neighborhood), offline and memoized. See geocoder.py.
+        """
+        missing = [prop for prop in properties if 'latitude' not in prop or 'longitude' not in prop]
+        if not missing:
+            return
+        with metrics.timer('cashflow_stage_duration_seconds', stage='geocode'):
+            coordinates = geocoder.geocode_many([prop['address'] for prop in missing])
+        for prop, coords in zip(missing, coordinates):
+            prop.update(coords)
+
+    @staticmethod
+    def _carry_over_details(property_data, stored):
+        """
+        Keep the stored property's detail fields that an incoming row lacks.
+
+        Coordinates are only kept while the address is the same.
+        """
+        if stored is None:
+            return
+        same_address = ' '.join(str(stored.get('address', '')).split()) == \
+            ' '.join(str(property_data.get('address', '')).split())
+        for field in DETAIL_FIELDS:
+            if field in ('latitude', 'longitude') and not same_address:
+                continue
+            if property_data.get(field) is None and stored.get(field) is not None:
+                property_data[field] = stored[field]
+
+    def _prepare_property(self, property_data):
+        """
+        Validate a property and fill in its defaults and content hash in place.
+
+        Coordinates that are not provided are left out for the caller to
+        fill in with geocode_missing.
 
-        # Try to match neighborhood from address
-        address_lower = address.lower()
-        for neighborhood, coords in neighborhoods.items():
-            if neighborhood in address_lower:
-                return coords
+        Returns:
+            str: Error message, or None if the property is valid
+        """
+        if not isinstance(property_data, dict):
+            return "Property must be a JSON object"
+
+        # Validate required fields; a studio has 0 bedrooms, so room counts
+        # only have to be present
+        required_fields = ['centris_id', 'address', 'price', 'bedrooms', 'bathrooms', 'url']
+        for field in required_fields:
+            value = property_data.get(field)
+            if value is None or value == '' or (not value and field not in ('bedrooms', 'bathrooms')):
+                return f"Missing required field: {field}"
+
+        # Set default image if not provided
+        if 'image_url' not in property_data or not property_data['image_url']:
+            property_data['image_url'] = None
+
+        # Validate data types
+        try:
+            property_data['price'] = int(property_data['price'])
+            property_data['bedrooms'] = int(property_data['bedrooms'])
+            property_data['bathrooms'] = int(property_data['bathrooms'])
+            if 'sqft' in property_data and property_data['sqft']:
+                property_data['sqft'] = int(property_data['sqft'])
 
-        # If no match, return default Montreal coordinates
-        return default_coords
+            if 'latitude' in property_data and 'longitude' in property_data:
+                property_data['latitude'] = float(property_data['latitude'])
+                property_data['longitude'] = float(property_data['longitude'])
+
+            # Hash the listing as it came in, before coordinates are estimated
+            property_data['content_hash'] = content_hash(property_data)
+
+        except (ValueError, TypeError) as e:
+            return f"Invalid data type: {str(e)}"
+
+        return None
 
     def add_property(self, property_data):
         """
@@ -86,75 +365,33 @@ class PropertyStorage:
         Args:
             property_data: Dictionary with property information
                 Required fields: centris_id, address, price, bedrooms, bathrooms, url
-                Optional fields: sqft, property_type, latitude, longitude, image_url
+                Optional fields: sqft, property_type, latitude, longitude, image_url,
+                municipal_taxes, school_taxes, condo_fees (detail fields the
+                stored property keeps if they are left out)
 
         Returns:
             dict: Success status and message
         """
-        with self.lock:
-            # Validate required fields
-            required_fields = ['centris_id', 'address', 'price', 'bedrooms', 'bathrooms', 'url']
-            for field in required_fields:
-                if field not in property_data or not property_data[field]:
-                    return {
-                        'success': False,
-                        'error': f"Missing required field: {field}"
-                    }
-
-            # Set default image if not provided
-            if 'image_url' not in property_data or not property_data['image_url']:
-                property_data['image_url'] = None
-
-            # Validate data types
-            try:
-                property_data['price'] = int(property_data['price'])
-                property_data['bedrooms'] = int(property_data['bedrooms'])
-                property_data['bathrooms'] = int(property_data['bathrooms'])
-                if 'sqft' in property_data and property_data['sqft']:
-                    property_data['sqft'] = int(property_data['sqft'])
-
-                # Add coordinates if not provided
-                if 'latitude' not in property_data or 'longitude' not in property_data:
-                    coords = self._geocode_address(property_data['address'])
-                    property_data['latitude'] = coords['latitude']
-                    property_data['longitude'] = coords['longitude']
-                else:
-                    property_data['latitude'] = float(property_data['latitude'])
-                    property_data['longitude'] = float(property_data['longitude'])
-
-            except (ValueError, TypeError) as e:
-                return {
-                    'success': False,
-                    'error': f"Invalid data type: {str(e)}"
-                }
+        error = self._prepare_property(property_data)
+        if error:
+            return {
+                'success': False,
+                'error': error
+            }
 
-            # Read current data
-            data = self._read_data()
-            properties = data.get('properties', [])
-
-            # Check if property already exists
-            centris_id = str(property_data['centris_id'])
-            existing_index = None
-            for i, prop in enumerate(properties):
-                if str(prop.get('centris_id')) == centris_id:
-                    existing_index = i
-                    break
-
-            if existing_index is not None:
-                # Update existing property
-                properties[existing_index] = property_data
-                message = f"Updated property {centris_id}"
-            else:
-                # Add new property
-                properties.append(property_data)
-                message = f"Added property {centris_id}"
+        centris_id = str(property_data['centris_id'])
+        self._carry_over_details(property_data, self.get_property(centris_id))
+        self.geocode_missing([property_data])
 
-            # Update timestamp
-            data['properties'] = properties
-            data['last_updated'] = datetime.now().isoformat()
+        with self.lock:
+            timestamp = datetime.now().isoformat()
+            created = self.backend.upsert_many([property_data], timestamp)[0]
+            self.history.record([property_data], timestamp)
 
-            # Write back to file
-            self._write_data(data)
+            if created:
+                message = f"Added property {centris_id}"
+            else:
+                message = f"Updated property {centris_id}"
 
             return {
                 'success': True,
@@ -162,39 +399,169 @@ class PropertyStorage:
                 'property': property_data
             }
 
+    def add_properties(self, rows, batch_size=1000, skip_unchanged=False):
+        """
+        Validate and store many properties, one backend transaction per batch.
+
+        Rows are consumed lazily, so only one batch is held in memory at a
+        time. Missing coordinates are geocoded per batch. A row may be an
+        exception raised while parsing the upload; it is reported as a
+        failed row.
+
+        With skip_unchanged, a row whose content hash matches the stored
+        property's is not written again (nor geocoded or added to the
+        price history), so re-ingesting a scrape only costs the listings
+        that are new or changed.
+
+        Args:
+            rows: Iterable of property dicts (same fields as add_property)
+            batch_size: Number of rows handled per transaction
+            skip_unchanged: Skip rows identical to the stored property
+
+        Yields:
+            dict: One result per row, in input order:
+                {'row': i, 'success': True, 'centris_id': ..., 'status': 'created'|'updated'|'unchanged'}
+                or {'row': i, 'success': False, 'error': ...}
+        """
+        hashes = {}  # centris_id -> latest known content hash (stored or written by this call)
+        batch = []
+        start = 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield from self._ingest_batch(batch, start, skip_unchanged, hashes)
+                start += len(batch)
+                batch = []
+        if batch:
+            yield from self._ingest_batch(batch, start, skip_unchanged, hashes)
+
+    def _ingest_batch(self, rows, start, skip_unchanged, hashes):
+        """Prepare, geocode and write one batch of add_properties."""
+        results = self.prepare_batch(rows, start, skip_unchanged, hashes)
+        pending = [result for result in results if 'property' in result]
+        if pending:
+            properties = [result.pop('property') for result in pending]
+            self.geocode_missing(properties)
+            created = self.write_properties(properties)
+            for result, was_created in zip(pending, created):
+                result['status'] = 'created' if was_created else 'updated'
+        return results
+
+    def prepare_batch(self, rows, start=0, skip_unchanged=False, hashes=None):
+        """
+        Validate a batch of rows in place and pick out the ones to write.
+
+        Rows to write keep the stored property's DETAIL_FIELDS they lack,
+        so a plain re-ingest doesn't wipe what enrichment added.
+
+        This is the first step of add_properties, exposed for pipelines that
+        geocode and write batches on other threads (geocode_missing, then
+        write_properties).
+
+        Args:
+            rows: Property dicts, or exceptions for rows that failed to parse
+            start: Row number of the first row, for the results
+            skip_unchanged: Mark rows identical to the stored property 'unchanged'
+            hashes: Dict of centris_id -> latest known content hash, shared
+                by the batches of one ingest so repeated listings are caught
+
+        Returns:
+            List of results as yielded by add_properties, except that rows
+            to be written have the prepared dict under 'property' and no
+            'status' yet
+        """
+        hashes = {} if hashes is None else hashes
+        stored = self._current_snapshot()  # One lookup snapshot per batch
+        results = []
+        for index, row in enumerate(rows, start):
+            if isinstance(row, Exception):
+                error = str(row)
+            else:
+                error = self._prepare_property(row)
+
+            if error:
+                results.append({'row': index, 'success': False, 'error': error})
+                continue
+
+            centris_id = str(row['centris_id'])
+            result = {'row': index, 'success': True, 'centris_id': centris_id}
+            results.append(result)
+            position = stored.positions.get(centris_id)
+            existing = stored.properties[position] if position is not None else None
+            unchanged = False
+            if skip_unchanged:
+                if centris_id not in hashes and existing is not None:
+                    hashes[centris_id] = existing.get('content_hash')
+                unchanged = hashes.get(centris_id) == row['content_hash']
+                hashes[centris_id] = row['content_hash']
+            if unchanged:
+                result['status'] = 'unchanged'
+            else:
+                self._carry_over_details(row, existing)
+                result['property'] = row
+        return results
+
+    def write_properties(self, properties):
+        """
+        Upsert prepared properties in one backend transaction and record their prices.
+
+        Returns:
+            List of booleans, True where the property was created
+        """
+        timestamp = datetime.now().isoformat()
+        with self.lock:
+            created = self.backend.upsert_many(properties, timestamp)
+            self.history.record(properties, timestamp)
+        return created
+
     def delete_property(self, centris_id):
         """Delete a property by centris_id."""
         with self.lock:
-            data = self._read_data()
-            properties = data.get('properties', [])
-
-            # Find and remove property
             centris_id = str(centris_id)
-            new_properties = [p for p in properties if str(p.get('centris_id')) != centris_id]
-
-            if len(new_properties) == len(properties):
+            timestamp = datetime.now().isoformat()
+            if not self.backend.delete(centris_id, timestamp):
                 return {
                     'success': False,
                     'error': f"Property {centris_id} not found"
                 }
-
-            data['properties'] = new_properties
-            data['last_updated'] = datetime.now().isoformat()
-            self._write_data(data)
+            self.history.record_removed([centris_id], timestamp)
 
             return {
                 'success': True,
                 'message': f"Deleted property {centris_id}"
             }
 
+    def remove_missing(self, seen_ids, limit=None):
+        """
+        Delete the stored properties that a scrape of the whole market didn't return.
+
+        Args:
+            seen_ids: centris_ids of every listing the scrape returned
+            limit: Optional maximum number of properties to remove; if more
+                are missing, the scrape is suspect and nothing is removed
+
+        Returns:
+            List of the centris_ids removed, or None if over the limit
+        """
+        seen_ids = {str(centris_id) for centris_id in seen_ids}
+        missing = [centris_id for centris_id in self._current_snapshot().positions
+                   if centris_id not in seen_ids]
+        if not missing:
+            return []
+        if limit is not None and len(missing) > limit:
+            return None
+        with self.lock:
+            timestamp = datetime.now().isoformat()
+            removed = self.backend.delete_many(missing, timestamp)
+            self.history.record_removed(removed, timestamp)
+            return removed
+
     def clear_all_properties(self):
         """Clear all properties from storage."""
         with self.lock:
-            data = {
-                'properties': [],
-                'last_updated': datetime.now().isoformat()
-            }
-            self._write_data(data)
+            timestamp = datetime.now().isoformat()
+            self.backend.clear(timestamp)
+            self.history.record_removed(None, timestamp)
             return {
                 'success': True,
                 'message': 'All properties cleared'
@@ -202,11 +569,43 @@ class PropertyStorage:
 
     def get_property_count(self):
         """Get the number of stored properties."""
-        properties = self.get_all_properties()
-        return len(properties)
+        return len(self._current_snapshot().properties)
 
     def get_last_updated(self):
         """Get the last update timestamp."""
-        with self.lock:
-            data = self._read_data()
-            return data.get('last_updated')
+        return self._current_snapshot().last_updated
+
+    def get_version(self):
+        """Get the store version; every change (add, update, delete, clear) increases it."""
+        return self._current_snapshot().version
+
+    def get_changes(self, since):
+        """
+        Get the changes made after a version.
+
+        Args:
+            since: Version the caller last saw (e.g. from get_version())
+
+        Returns:
+            dict: 'version' (current version), 'upserts' (added or updated
+                properties, in storage order), 'deletes' (centris_ids
+                deleted, including by clear_all_properties; an id deleted
+                and added again is in both, so apply deletes first) and
+                'pruned_version' (deletes up to it were forgotten, so they
+                are incomplete when `since` is older)
+        """
+        upserts, deletes, _, version, pruned_version = self.backend.changes_since(since)
+        return {
+            'version': version,
+            'upserts': [FrozenProperty(prop) for prop in upserts],
+            'deletes': deletes,
+            'pruned_version': pruned_version
+        }
+
+    def get_history(self, centris_id):
+        """Get a property's price and status changes, oldest first (see PriceHistory)."""
+        return self.history.get_history(centris_id)
+
+    def get_price_drops(self, days=7, limit=20):
+        """Get the properties whose price fell the most in the last `days` days."""
+        return self.history.biggest_price_drops(days, limit)
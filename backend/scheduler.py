@@ -0,0 +1,282 @@
+"""
+Lightweight in-process scheduler for periodic jobs.
+
+Each job runs every `interval` seconds, give or take a random jitter (10%
+by default) so jobs and processes don't fire in lockstep. Runs happen on
+their own thread; a job never overlaps with itself in a process.
+
+Under several gunicorn workers every worker runs a scheduler. A shared
+job is run by one of them at a time: before running it, a worker takes a
+non-blocking fcntl lock on <state_dir>/<job>.lock (the leader lock for
+that run) and reads the job's last run from <state_dir>/<job>.json. If
+another worker holds the lock or ran the job less than an interval ago,
+it skips the run and reschedules after that one. The state file also
+makes durations and outcomes visible from every worker. Local jobs (e.g.
+warming per-process caches) run in every process without the lock.
+"""
+
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process considers itself the leader
+    fcntl = None
+
+from metrics import metrics
+
+# Lock and state files shared by the processes of one deployment
+SCHEDULER_DIR = os.getenv('SCHEDULER_DIR') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'scheduler'
+)
+
+# Fraction of the interval by which each run is moved earlier or later at random
+SCHEDULER_JITTER = float(os.getenv('SCHEDULER_JITTER', '0.1'))
+
+
+class JobSkipped(Exception):
+    """Raised by a job that had nothing to do; the run is recorded as skipped."""
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+
+class ScheduledJob:
+    def __init__(self, name, func, interval, jitter, shared, next_run):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.shared = shared
+        self.next_run = next_run
+        self.running = False
+        # This process's record; shared jobs are reported from the state file instead
+        self.state = {'runs': 0, 'failures': 0, 'last_run': None, 'last_success_at': None}
+
+
+class Scheduler:
+    def __init__(self, state_dir=None, jitter=SCHEDULER_JITTER):
+        """
+        Initialize a scheduler; jobs only run once start() is called (or run_now).
+
+        Args:
+            state_dir: Directory for the leader locks and state files of
+                shared jobs, common to every process
+            jitter: Default jitter, as a fraction of the interval
+        """
+        self.state_dir = state_dir or SCHEDULER_DIR
+        self.jitter = jitter
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def add(self, name, func, interval, shared=True, delay=None, jitter=None):
+        """
+        Register a periodic job.
+
+        Args:
+            name: Job name, used for its lock and state files
+            func: Callable run with no arguments. Its return value is kept
+                as the run's result; raising JobSkipped records a skipped run
+            interval: Seconds between runs; 0 or less disables the job
+            shared: Run in one process at a time, under the leader lock
+            delay: Seconds before the first run (defaults to the interval)
+            jitter: Jitter fraction for this job (defaults to the scheduler's)
+        """
+        jitter = self.jitter if jitter is None else jitter
+        first = interval if delay is None else delay
+        job = ScheduledJob(name, func, interval, jitter, shared,
+                           time.time() + self._jittered(first, jitter))
+        with self.lock:
+            self.jobs[name] = job
+        self.wakeup.set()
+        return job
+
+    @staticmethod
+    def _jittered(seconds, jitter):
+        return max(0.0, seconds * (1 + random.uniform(-jitter, jitter)))
+
+    def start(self):
+        """Start the scheduling thread (once)."""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._loop, name='scheduler', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """Stop scheduling new runs; runs in progress finish on their own."""
+        self.stopped.set()
+        self.wakeup.set()
+
+    def _loop(self):
+        while not self.stopped.is_set():
+            now = time.time()
+            with self.lock:
+                jobs = [job for job in self.jobs.values() if job.interval > 0]
+                for job in jobs:
+                    if job.next_run <= now and not job.running:
+                        self._launch(job, 'schedule')
+                upcoming = [job.next_run for job in jobs if not job.running]
+            timeout = min([max(0.0, run - now) for run in upcoming] + [60.0])
+            self.wakeup.wait(timeout)
+            self.wakeup.clear()
+
+    def _launch(self, job, trigger):
+        """Start a run on its own thread; call with self.lock held."""
+        job.running = True
+        threading.Thread(target=self._execute, args=(job, trigger),
+                         name=f"scheduler-{job.name}", daemon=True).start()
+
+    def run_now(self, name):
+        """
+        Run a job right away, outside its schedule.
+
+        Returns:
+            'started', 'running' if it is already running in this process,
+            or None if there is no such job
+        """
+        with self.lock:
+            job = self.jobs.get(name)
+            if job is None:
+                return None
+            if job.running:
+                return 'running'
+            self._launch(job, 'manual')
+            return 'started'
+
+    def _state_path(self, job, suffix):
+        return os.path.join(self.state_dir, f"{job.name}.{suffix}")
+
+    def _read_state(self, job):
+        if not job.shared:
+            return job.state
+        try:
+            with open(self._state_path(job, 'json'), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {'runs': 0, 'failures': 0, 'last_run': None, 'last_success_at': None}
+
+    def _write_state(self, job, state):
+        if not job.shared:
+            job.state = state
+            return
+        os.makedirs(self.state_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.state_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(state, f, default=str)
+            os.replace(tmp_path, self._state_path(job, 'json'))
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    @contextmanager
+    def _leader_lock(self, job):
+        """Yield True if this process may run the job now, False if another one is running it."""
+        if not job.shared or fcntl is None:
+            yield True
+            return
+        os.makedirs(self.state_dir, exist_ok=True)
+        with open(self._state_path(job, 'lock'), 'a') as handle:
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    def _execute(self, job, trigger):
+        next_start = time.time()
+        try:
+            with self._leader_lock(job) as leader:
+                if not leader:
+                    print(f"Scheduler: {job.name} is running in another process, skipping")
+                    return
+                state = self._read_state(job)
+                last = state.get('last_run') or {}
+                if trigger == 'schedule' and last.get('started_ts') \
+                        and time.time() - last['started_ts'] < job.interval * (1 - job.jitter):
+                    # Another process ran it recently: follow its schedule
+                    next_start = last['started_ts']
+                    return
+                self._run(job, trigger, state)
+        except Exception as e:
+            print(f"Scheduler: error running {job.name}: {str(e)}")
+        finally:
+            with self.lock:
+                job.running = False
+                job.next_run = next_start + self._jittered(job.interval, job.jitter)
+            self.wakeup.set()
+
+    def _run(self, job, trigger, state):
+        """Run the job once and record its outcome; call under the leader lock."""
+        started = time.time()
+        record = {'started_at': _iso(started), 'started_ts': started, 'trigger': trigger,
+                  'pid': os.getpid(), 'outcome': 'running'}
+        state = dict(state, last_run=record)
+        self._write_state(job, state)
+
+        print(f"Scheduler: running {job.name} ({trigger})")
+        try:
+            record['result'] = job.func()
+            record['outcome'] = 'succeeded'
+        except JobSkipped as e:
+            record['outcome'] = 'skipped'
+            record['reason'] = str(e)
+        except Exception as e:
+            record['outcome'] = 'failed'
+            record['error'] = str(e)
+            traceback.print_exc()
+
+        finished = time.time()
+        record['finished_at'] = _iso(finished)
+        record['duration_seconds'] = round(finished - started, 3)
+        state['runs'] = state.get('runs', 0) + 1
+        if record['outcome'] == 'failed':
+            state['failures'] = state.get('failures', 0) + 1
+        elif record['outcome'] == 'succeeded':
+            state['last_success_at'] = record['finished_at']
+        self._write_state(job, state)
+
+        metrics.observe('cashflow_scheduler_job_duration_seconds', finished - started, {'job': job.name})
+        metrics.inc('cashflow_scheduler_runs_total', {'job': job.name, 'outcome': record['outcome']})
+        print(f"Scheduler: {job.name} {record['outcome']} in {record['duration_seconds']:.2f}s")
+
+    def status(self):
+        """
+        Describe every job: its schedule in this process and its last run.
+
+        Shared jobs report the last run of any process, from the state file.
+        """
+        with self.lock:
+            jobs = list(self.jobs.values())
+        report = []
+        for job in jobs:
+            state = self._read_state(job)
+            last = dict(state.get('last_run') or {})
+            last.pop('started_ts', None)
+            report.append({
+                'name': job.name,
+                'shared': job.shared,
+                'enabled': job.interval > 0,
+                'interval_seconds': job.interval,
+                'next_run': _iso(job.next_run) if job.interval > 0 else None,
+                'running_here': job.running,
+                'runs': state.get('runs', 0),
+                'failures': state.get('failures', 0),
+                'last_success_at': state.get('last_success_at'),
+                'last_run': last or None
+            })
+        return report
@@ -0,0 +1,797 @@
+"""
+Persistence backends for PropertyStorage.
+
+PropertyStorage validates and geocodes listings; a backend only stores
+them. Two backends are available:
+
+- JSONStorageBackend: data/properties.json plus an append-only change log
+- SQLiteStorageBackend: an SQLite database in WAL mode, indexed on
+  centris_id, price, bedrooms and coordinates
+
+Run `python storage_backends.py migrate` to copy the JSON file into SQLite,
+or `python storage_backends.py benchmark` to compare ingest speed.
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of a single process are coordinated
+    fcntl = None
+
+from metrics import metrics
+
+
+DEFAULT_JSON_FILE = 'data/properties.json'
+DEFAULT_SQLITE_FILE = 'data/properties.db'
+
+
+class JSONStorageBackend:
+    """
+    Stores listings as a JSON snapshot plus an append-only change log.
+
+    Every upsert, delete or clear is appended to <storage_file>.log as one
+    JSON line carrying a monotonically increasing version, so a write costs
+    O(1) in portfolio size. The version of each property's last upsert and
+    a tombstone (the version it was removed at) for each deleted property
+    are kept, also in snapshots, so changes_since() works across
+    compactions. Tombstones older than tombstone_retention versions are
+    dropped when compacting; callers further behind than that must reload.
+    Loading replays the log over the snapshot, skipping records the
+    snapshot already contains. Once the log grows past compact_threshold
+    bytes, a background compactor writes a new snapshot and keeps only the
+    log records that arrived after it.
+
+    Crash safety: snapshots are replaced atomically and the log is only
+    rewritten after the new snapshot is in place; replay is idempotent, and
+    a torn last line from an interrupted append is dropped on open. Appends
+    reach the OS immediately but are fsynced in batches every fsync_interval
+    seconds, so a power loss (not a process crash) can lose that window.
+
+    Several processes (e.g. gunicorn workers) may share the files. Writers
+    hold an exclusive fcntl lock on <storage_file>.lock while they catch up
+    with the log and append to it, so versions are never handed out twice;
+    readers hold it shared so they never see half of a batch or a log that
+    is being rewritten.
+    """
+
+    def __init__(self, storage_file=DEFAULT_JSON_FILE, fsync_interval=None, compact_threshold=None,
+                 tombstone_retention=None):
+        """Initialize the backend with a JSON snapshot file and its log."""
+        self.storage_file = storage_file
+        self.log_file = f"{storage_file}.log"
+        self.fsync_interval = float(
+            os.getenv('STORAGE_FSYNC_INTERVAL', '0.05') if fsync_interval is None else fsync_interval
+        )
+        self.compact_threshold = int(
+            os.getenv('STORAGE_COMPACT_BYTES', str(1024 * 1024)) if compact_threshold is None
+            else compact_threshold
+        )
+        self.tombstone_retention = int(
+            os.getenv('STORAGE_TOMBSTONE_RETENTION', '100000') if tombstone_retention is None
+            else tombstone_retention
+        )
+        self.lock_file = f"{storage_file}.lock"
+        self.lock = threading.RLock()
+        self._lock_handle = None
+        self._lock_depth = 0
+
+        # In-memory state, kept in step with the files by _refresh()
+        self._properties = {}
+        self._versions = {}  # centris_id -> version of last upsert, oldest first
+        self._tombstones = {}  # centris_id -> version it was deleted at, oldest first
+        self._pruned_version = 0  # newest version whose tombstones were dropped
+        self._last_updated = None
+        self._version = 0
+        self._snapshot_token = None
+        self._log_offset = 0
+
+        self._log_handle = None
+        self._sync_timer = None
+        self._compacting = False
+
+        os.makedirs(os.path.dirname(self.storage_file) or '.', exist_ok=True)
+        with self._locked():
+            self._ensure_file_exists()
+            self._recover_log()
+
+    @contextmanager
+    def _locked(self, exclusive=True):
+        """
+        Hold the thread lock and the inter-process file lock.
+
+        Only the outermost call takes the file lock; nested calls run under
+        whatever mode it was taken in.
+        """
+        with self.lock:
+            if fcntl is None or self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+
+            if self._lock_handle is None:
+                self._lock_handle = open(self.lock_file, 'a')
+            fcntl.flock(self._lock_handle.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                fcntl.flock(self._lock_handle.fileno(), fcntl.LOCK_UN)
+
+    def _ensure_file_exists(self):
+        """Ensure the storage file exists with proper structure."""
+        if not os.path.exists(self.storage_file):
+            self._write_data({
+                'properties': [],
+                'last_updated': None,
+                'version': 0
+            })
+
+    def _read_data(self):
+        """Read data from JSON file."""
+        with metrics.timer('cashflow_stage_duration_seconds', stage='storage_read'):
+            try:
+                with open(self.storage_file, 'r') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                return {'properties': [], 'last_updated': None}
+
+    def _write_data(self, data):
+        """Write data to JSON file atomically."""
+        # Write to temporary file first, then rename (atomic operation)
+        temp_file = f"{self.storage_file}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.storage_file)
+
+    @staticmethod
+    def _stat_token(path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def _recover_log(self):
+        """Drop a torn last line left behind by an interrupted append."""
+        try:
+            with open(self.log_file, 'rb+') as f:
+                data = f.read()
+                if data and not data.endswith(b'\n'):
+                    f.truncate(data.rfind(b'\n') + 1)
+                    print(f"Recovered {self.log_file}: dropped an incomplete record")
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _touch(versions, centris_id, version):
+        """Record a version for an id, moving it to the end to keep versions ordered."""
+        versions.pop(centris_id, None)
+        versions[centris_id] = version
+
+    def _apply(self, record):
+        """Apply one log record to the in-memory state."""
+        op = record['op']
+        version = record['version']
+        if op == 'upsert':
+            prop = record['property']
+            centris_id = str(prop['centris_id'])
+            self._properties[centris_id] = prop
+            self._touch(self._versions, centris_id, version)
+        elif op == 'delete':
+            centris_id = str(record['centris_id'])
+            self._properties.pop(centris_id, None)
+            self._versions.pop(centris_id, None)
+            self._touch(self._tombstones, centris_id, version)
+        elif op == 'clear':
+            for centris_id in self._properties:
+                self._touch(self._tombstones, centris_id, version)
+            self._properties = {}
+            self._versions = {}
+        self._version = version
+        self._last_updated = record.get('timestamp', self._last_updated)
+
+    def _refresh(self):
+        """Bring the in-memory state up to date with the snapshot and log."""
+        snapshot_token = self._stat_token(self.storage_file)
+        if snapshot_token != self._snapshot_token:
+            data = self._read_data()
+            self._properties = {str(p.get('centris_id')): p for p in data.get('properties', [])}
+            self._last_updated = data.get('last_updated')
+            self._version = data.get('version', 0)
+            # Snapshots written before versions were tracked count as changed at their version
+            versions = data.get('versions', {})
+            self._versions = dict(sorted(
+                ((centris_id, versions.get(centris_id, self._version)) for centris_id in self._properties),
+                key=lambda item: item[1]
+            ))
+            self._tombstones = dict(sorted(data.get('tombstones', {}).items(), key=lambda item: item[1]))
+            self._pruned_version = data.get('tombstones_pruned', 0)
+            self._snapshot_token = snapshot_token
+            self._log_offset = 0
+
+        try:
+            with open(self.log_file, 'rb') as f:
+                if os.fstat(f.fileno()).st_size < self._log_offset:
+                    # The log was rewritten under us; replay it from the start
+                    self._log_offset = 0
+                f.seek(self._log_offset)
+                tail = f.read()
+        except FileNotFoundError:
+            self._log_offset = 0
+            return
+
+        complete = tail[:tail.rfind(b'\n') + 1]
+        for line in complete.splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Skipping unreadable record in {self.log_file}")
+                continue
+            if record['version'] > self._version:
+                self._apply(record)
+        self._log_offset += len(complete)
+
+    def _append(self, records):
+        """Append records to the log in a single write and schedule an fsync."""
+        # Compaction replaces the log file, so reopen if ours is stale
+        log_token = self._stat_token(self.log_file)
+        if self._log_handle is None or log_token is None or \
+                os.fstat(self._log_handle.fileno()).st_ino != log_token[0]:
+            if self._log_handle is not None:
+                self._log_handle.close()
+            self._log_handle = open(self.log_file, 'ab')
+
+        payload = b''.join(
+            json.dumps(record, separators=(',', ':')).encode('utf-8') + b'\n' for record in records
+        )
+        self._log_handle.write(payload)
+        self._log_handle.flush()
+        self._log_offset += len(payload)
+
+        if self.fsync_interval <= 0:
+            os.fsync(self._log_handle.fileno())
+        elif self._sync_timer is None:
+            self._sync_timer = threading.Timer(self.fsync_interval, self._sync)
+            self._sync_timer.daemon = True
+            self._sync_timer.start()
+
+        if self._log_offset > self.compact_threshold and not self._compacting:
+            self._compacting = True
+            threading.Thread(target=self.compact, name='storage-compactor', daemon=True).start()
+
+    def _sync(self):
+        """Flush batched log appends to disk."""
+        with self.lock:
+            self._sync_timer = None
+            if self._log_handle is not None:
+                os.fsync(self._log_handle.fileno())
+
+    def _write_records(self, make_records):
+        """Refresh state, build records with fresh versions, apply and append them."""
+        with self._locked():
+            self._refresh()
+            records = []
+            for record in make_records():
+                record['version'] = self._version + 1
+                self._apply(record)
+                records.append(record)
+            if records:
+                self._append(records)
+            return records
+
+    def _prune_tombstones(self):
+        """Drop the tombstones more than tombstone_retention versions old."""
+        cutoff = self._version - self.tombstone_retention
+        while self._tombstones:
+            centris_id, version = next(iter(self._tombstones.items()))
+            if version > cutoff:
+                break
+            del self._tombstones[centris_id]
+            self._pruned_version = max(self._pruned_version, version)
+
+    def compact(self):
+        """Fold the log into a new snapshot, keeping records written meanwhile."""
+        temp_file = f"{self.storage_file}.{os.getpid()}.tmp"
+        try:
+            with self._locked(exclusive=False):
+                self._refresh()
+                self._prune_tombstones()
+                data = {
+                    'properties': list(self._properties.values()),
+                    'last_updated': self._last_updated,
+                    'version': self._version,
+                    'versions': dict(self._versions),
+                    'tombstones': dict(self._tombstones),
+                    'tombstones_pruned': self._pruned_version
+                }
+                folded_offset = self._log_offset
+                base_tokens = (self._snapshot_token, self._stat_token(self.log_file))
+
+            # Serializing the portfolio is the slow part; writers keep appending meanwhile
+            with open(temp_file, 'w') as f:
+                json.dump(data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+
+            with self._locked():
+                snapshot_token, log_token = (self._stat_token(self.storage_file),
+                                             self._stat_token(self.log_file))
+                if snapshot_token != base_tokens[0] or log_token is None or \
+                        base_tokens[1] is None or log_token[0] != base_tokens[1][0]:
+                    # Another process compacted first; its snapshot is at least as new
+                    os.remove(temp_file)
+                    return
+
+                os.replace(temp_file, self.storage_file)
+                self._snapshot_token = self._stat_token(self.storage_file)
+
+                # Keep only the records appended after the snapshot was taken
+                with open(self.log_file, 'rb') as f:
+                    f.seek(folded_offset)
+                    tail = f.read()
+                temp_log = f"{self.log_file}.tmp"
+                with open(temp_log, 'wb') as f:
+                    f.write(tail)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_log, self.log_file)
+                # Records from other processes in the tail are replayed on the next refresh
+                self._log_offset -= folded_offset
+            print(f"Compacted {self.storage_file} at version {data['version']}")
+        except OSError as e:
+            print(f"Error compacting {self.storage_file}: {str(e)}")
+        finally:
+            self._compacting = False
+
+    def change_token(self):
+        """
+        Get a cheap value that changes whenever the store changes.
+
+        A new snapshot gets a new inode, and every change appends to the
+        log, so two stat calls detect changes without any parsing.
+        """
+        return (self._stat_token(self.storage_file), self._stat_token(self.log_file))
+
+    def load(self):
+        """
+        Read the whole store.
+
+        Returns:
+            Tuple (properties in insertion order, last_updated timestamp, version)
+        """
+        with self._locked(exclusive=False):
+            self._refresh()
+            return list(self._properties.values()), self._last_updated, self._version
+
+    def changes_since(self, since):
+        """
+        Get what changed after a version.
+
+        Versions are kept in ascending order, so this walks back only over
+        the changes themselves. An id deleted and then added again is in
+        both lists; apply the deletes first.
+
+        Returns:
+            Tuple (properties upserted after `since` in insertion order,
+            centris_ids deleted after `since`, last_updated timestamp,
+            current version, pruned version: the deletes are incomplete
+            if `since` is older than it)
+        """
+        with self._locked(exclusive=False):
+            self._refresh()
+            changed = set()
+            for centris_id, version in reversed(self._versions.items()):
+                if version <= since:
+                    break
+                changed.add(centris_id)
+            upserts = [prop for centris_id, prop in self._properties.items()
+                       if centris_id in changed] if changed else []
+            deletes = []
+            for centris_id, version in reversed(self._tombstones.items()):
+                if version <= since:
+                    break
+                deletes.append(centris_id)
+            return upserts, deletes[::-1], self._last_updated, self._version, self._pruned_version
+
+    def upsert_many(self, properties, timestamp):
+        """
+        Insert or replace properties with one log append.
+
+        Returns:
+            List of booleans, True where the property was newly added
+        """
+        created = []
+
+        def make_records():
+            for prop in properties:
+                created.append(str(prop['centris_id']) not in self._properties)
+                yield {'op': 'upsert', 'property': prop, 'timestamp': timestamp}
+
+        self._write_records(make_records)
+        return created
+
+    def delete(self, centris_id, timestamp):
+        """Delete a property; returns False if it was not stored."""
+        return bool(self.delete_many([centris_id], timestamp))
+
+    def delete_many(self, centris_ids, timestamp):
+        """
+        Delete properties with one log append.
+
+        Returns:
+            List of the centris_ids that were stored and are now deleted
+        """
+        def make_records():
+            for centris_id in centris_ids:
+                centris_id = str(centris_id)
+                if centris_id in self._properties:
+                    yield {'op': 'delete', 'centris_id': centris_id, 'timestamp': timestamp}
+
+        return [record['centris_id'] for record in self._write_records(make_records)]
+
+    def clear(self, timestamp):
+        """Remove every property."""
+        self._write_records(lambda: [{'op': 'clear', 'timestamp': timestamp}])
+
+
+class SQLiteStorageBackend:
+    """
+    Stores listings in SQLite (WAL mode), one row per centris_id.
+
+    The full listing is kept as JSON in the data column; price, bedrooms,
+    bathrooms and coordinates are copied into indexed columns for queries.
+    Rows keep their rowid on update, so listings stay in insertion order.
+    Each row records the version of the transaction that last wrote it, and
+    deleted ids leave a row in the tombstones table, for changes_since().
+    Tombstones older than tombstone_retention versions are dropped by the
+    next write; callers further behind than that must reload.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS properties (
+            centris_id TEXT PRIMARY KEY,
+            price INTEGER,
+            bedrooms INTEGER,
+            bathrooms INTEGER,
+            latitude REAL,
+            longitude REAL,
+            data TEXT NOT NULL,
+            version INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_properties_price ON properties (price);
+        CREATE INDEX IF NOT EXISTS idx_properties_bedrooms ON properties (bedrooms);
+        CREATE INDEX IF NOT EXISTS idx_properties_coords ON properties (latitude, longitude);
+        CREATE TABLE IF NOT EXISTS tombstones (
+            centris_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_tombstones_version ON tombstones (version);
+        CREATE TABLE IF NOT EXISTS metadata (
+            key TEXT PRIMARY KEY,
+            value
+        );
+        INSERT OR IGNORE INTO metadata (key, value) VALUES ('version', 0);
+        INSERT OR IGNORE INTO metadata (key, value) VALUES ('tombstones_pruned', 0);
+    """
+
+    def __init__(self, db_file=DEFAULT_SQLITE_FILE, tombstone_retention=None):
+        """Initialize the backend and create the schema if needed."""
+        self.db_file = db_file
+        self.tombstone_retention = int(
+            os.getenv('STORAGE_TOMBSTONE_RETENTION', '100000') if tombstone_retention is None
+            else tombstone_retention
+        )
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.db_file) or '.', exist_ok=True)
+        self._connection().executescript(self.SCHEMA)
+        self._upgrade_schema()
+
+    def _upgrade_schema(self):
+        """Add the version column to databases created before it existed."""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(properties)')]
+            if 'version' not in columns:
+                conn.execute('ALTER TABLE properties ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_properties_version ON properties (version)')
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _connection(self):
+        """Get this thread's connection (sqlite3 connections are per thread)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _write(self, func):
+        """Run func(conn, version) inside an immediate write transaction that bumps the version."""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = conn.execute("SELECT value FROM metadata WHERE key = 'version'").fetchone()[0] + 1
+            result = func(conn, version)
+            self._prune_tombstones(conn, version - self.tombstone_retention)
+            conn.execute("UPDATE metadata SET value = ? WHERE key = 'version'", (version,))
+            conn.execute('COMMIT')
+            return result
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    @staticmethod
+    def _record_tombstones(conn, select, params):
+        """Insert or refresh tombstones for the (centris_id, version) rows of a SELECT."""
+        conn.execute(
+            f'INSERT INTO tombstones (centris_id, version) {select} WHERE true '
+            'ON CONFLICT(centris_id) DO UPDATE SET version = excluded.version',
+            params
+        )
+
+    @staticmethod
+    def _prune_tombstones(conn, cutoff):
+        """Drop the tombstones at or before a version, remembering the newest one dropped."""
+        (pruned,) = conn.execute(
+            'SELECT MAX(version) FROM tombstones WHERE version <= ?', (cutoff,)
+        ).fetchone()
+        if pruned is not None:
+            conn.execute('DELETE FROM tombstones WHERE version <= ?', (cutoff,))
+            conn.execute(
+                "UPDATE metadata SET value = MAX(value, ?) WHERE key = 'tombstones_pruned'", (pruned,)
+            )
+
+    @staticmethod
+    def _set_last_updated(conn, timestamp):
+        conn.execute(
+            "INSERT INTO metadata (key, value) VALUES ('last_updated', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (timestamp,)
+        )
+
+    def change_token(self):
+        """Get the version stamp, bumped by every write transaction."""
+        row = self._connection().execute(
+            "SELECT value FROM metadata WHERE key = 'version'"
+        ).fetchone()
+        return row[0] if row else None
+
+    def load(self):
+        """
+        Read the whole store in one consistent read transaction.
+
+        Returns:
+            Tuple (properties in insertion order, last_updated timestamp, version)
+        """
+        with metrics.timer('cashflow_stage_duration_seconds', stage='storage_read'):
+            conn = self._connection()
+            conn.execute('BEGIN')
+            try:
+                rows = conn.execute('SELECT data FROM properties ORDER BY rowid').fetchall()
+                last_updated = conn.execute(
+                    "SELECT value FROM metadata WHERE key = 'last_updated'"
+                ).fetchone()
+                version = self.change_token()
+            finally:
+                conn.execute('COMMIT')
+            return ([json.loads(data) for (data,) in rows],
+                    last_updated[0] if last_updated else None,
+                    version)
+
+    def changes_since(self, since):
+        """
+        Get what changed after a version, using the version indexes.
+
+        An id deleted and then added again is in both lists; apply the
+        deletes first.
+
+        Returns:
+            Tuple (properties upserted after `since` in insertion order,
+            centris_ids deleted after `since`, last_updated timestamp,
+            current version, pruned version: the deletes are incomplete
+            if `since` is older than it)
+        """
+        with metrics.timer('cashflow_stage_duration_seconds', stage='storage_read'):
+            conn = self._connection()
+            conn.execute('BEGIN')
+            try:
+                rows = conn.execute(
+                    'SELECT data FROM properties WHERE version > ? ORDER BY rowid', (since,)
+                ).fetchall()
+                deletes = [centris_id for (centris_id,) in conn.execute(
+                    'SELECT centris_id FROM tombstones WHERE version > ? ORDER BY version', (since,)
+                )]
+                last_updated = conn.execute(
+                    "SELECT value FROM metadata WHERE key = 'last_updated'"
+                ).fetchone()
+                version = self.change_token()
+                (pruned_version,) = conn.execute(
+                    "SELECT value FROM metadata WHERE key = 'tombstones_pruned'"
+                ).fetchone()
+            finally:
+                conn.execute('COMMIT')
+            return ([json.loads(data) for (data,) in rows], deletes,
+                    last_updated[0] if last_updated else None, version, pruned_version)
+
+    def upsert_many(self, properties, timestamp):
+        """
+        Insert or replace properties in one transaction.
+
+        Returns:
+            List of booleans, True where the property was newly added
+        """
+        def write(conn, version):
+            created = []
+            for prop in properties:
+                centris_id = str(prop['centris_id'])
+                exists = conn.execute(
+                    'SELECT 1 FROM properties WHERE centris_id = ?', (centris_id,)
+                ).fetchone()
+                conn.execute(
+                    'INSERT INTO properties '
+                    '(centris_id, price, bedrooms, bathrooms, latitude, longitude, data, version) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT(centris_id) DO UPDATE SET '
+                    'price = excluded.price, bedrooms = excluded.bedrooms, '
+                    'bathrooms = excluded.bathrooms, latitude = excluded.latitude, '
+                    'longitude = excluded.longitude, data = excluded.data, '
+                    'version = excluded.version',
+                    (
+                        centris_id,
+                        prop.get('price'),
+                        prop.get('bedrooms'),
+                        prop.get('bathrooms'),
+                        prop.get('latitude'),
+                        prop.get('longitude'),
+                        json.dumps(prop),
+                        version
+                    )
+                )
+                created.append(exists is None)
+            self._set_last_updated(conn, timestamp)
+            return created
+
+        return self._write(write)
+
+    def delete(self, centris_id, timestamp):
+        """Delete a property; returns False if it was not stored."""
+        return bool(self.delete_many([centris_id], timestamp))
+
+    def delete_many(self, centris_ids, timestamp):
+        """
+        Delete properties in one transaction.
+
+        Returns:
+            List of the centris_ids that were stored and are now deleted
+        """
+        def write(conn, version):
+            deleted = []
+            for centris_id in centris_ids:
+                centris_id = str(centris_id)
+                if conn.execute('DELETE FROM properties WHERE centris_id = ?', (centris_id,)).rowcount:
+                    self._record_tombstones(conn, 'SELECT ?, ?', (centris_id, version))
+                    deleted.append(centris_id)
+            if deleted:
+                self._set_last_updated(conn, timestamp)
+            return deleted
+
+        return self._write(write)
+
+    def clear(self, timestamp):
+        """Remove every property."""
+        def write(conn, version):
+            self._record_tombstones(conn, 'SELECT centris_id, ? FROM properties', (version,))
+            conn.execute('DELETE FROM properties')
+            self._set_last_updated(conn, timestamp)
+
+        self._write(write)
+
+
+BACKENDS = {
+    'json': (JSONStorageBackend, DEFAULT_JSON_FILE),
+    'sqlite': (SQLiteStorageBackend, DEFAULT_SQLITE_FILE),
+}
+
+
+def create_backend(kind='json', path=None):
+    """Create a storage backend by name ('json' or 'sqlite')."""
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {kind} (expected one of {', '.join(BACKENDS)})")
+    backend_class, default_path = BACKENDS[kind]
+    return backend_class(path or default_path)
+
+
+def migrate_json_to_sqlite(json_file=DEFAULT_JSON_FILE, db_file=DEFAULT_SQLITE_FILE):
+    """
+    Copy every listing from the JSON file into an SQLite database.
+
+    Existing rows with the same centris_id are replaced, so the migration
+    can safely be re-run.
+
+    Returns:
+        Number of listings copied
+    """
+    properties, last_updated, _ = JSONStorageBackend(json_file).load()
+    target = SQLiteStorageBackend(db_file)
+    target.upsert_many(properties, last_updated or datetime.now().isoformat())
+    return len(properties)
+
+
+def _synthetic_listing(i):
+    """Build a plausible listing for benchmarks."""
+    return {
+        'centris_id': str(10000000 + i),
+        'address': f"{100 + i % 9000} Rue Saint-Denis, Montreal, QC H2X 1K{i % 10}",
+        'price': 250000 + (i * 7919) % 750000,
+        'bedrooms': 1 + i % 4,
+        'bathrooms': 1 + i % 2,
+        'sqft': 500 + (i * 31) % 1500,
+        'property_type': 'Condo',
+        'url': f"https://www.centris.ca/en/condos~for-sale~montreal/{10000000 + i}",
+        'image_url': None,
+        'latitude': 45.45 + (i % 100) * 0.002,
+        'longitude': -73.65 + (i % 97) * 0.002
+    }
+
+
+def benchmark_ingest(count=10000, kinds=('sqlite', 'json')):
+    """
+    Time ingesting `count` listings one add_property call at a time.
+
+    Returns:
+        Dict mapping backend name to elapsed seconds
+    """
+    from property_storage import PropertyStorage
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for kind in kinds:
+            path = os.path.join(tmp_dir, f"properties.{kind}")
+            storage = PropertyStorage(path, backend=kind)
+            start = time.perf_counter()
+            for i in range(count):
+                storage.add_property(_synthetic_listing(i))
+            results[kind] = time.perf_counter() - start
+            print(f"{kind:>6}: {count} listings in {results[kind]:.2f}s "
+                  f"({count / results[kind]:,.0f} listings/s)")
+    return results
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'help'
+
+    if command == 'migrate':
+        json_file = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_JSON_FILE
+        db_file = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_SQLITE_FILE
+        copied = migrate_json_to_sqlite(json_file, db_file)
+        print(f"Migrated {copied} properties from {json_file} to {db_file}")
+    elif command == 'benchmark':
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+        print(f"Ingesting {count} listings with add_property...")
+        results = benchmark_ingest(count)
+        if 'json' in results and 'sqlite' in results:
+            print(f"JSON/SQLite time ratio: {results['json'] / results['sqlite']:.2f}")
+    else:
+        print("Usage:")
+        print("  python storage_backends.py migrate [json_file] [db_file]")
+        print("  python storage_backends.py benchmark [count]")
@@ -0,0 +1,149 @@
+"""
+Shared fixtures for the backend tests.
+
+Run `python -m pytest` from backend/. The stores the app opens on import
+(listings, price history, jobs, scheduler state, HTTP cache) are pointed
+at a temporary directory first, so tests never touch backend/data/.
+"""
+
+import glob
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+TEST_DATA_DIR = tempfile.mkdtemp(prefix='backend-tests-')
+for name, filename in (('STORAGE_PATH', 'properties.json'), ('PRICE_HISTORY_PATH', 'price_history.db'),
+                       ('JOBS_PATH', 'jobs.db'), ('SCHEDULER_DIR', 'scheduler'),
+                       ('HTTP_CACHE_DIR', 'http_cache')):
+    os.environ[name] = os.path.join(TEST_DATA_DIR, filename)
+os.environ['SCHEDULER_ENABLED'] = 'false'
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(TEST_DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """An empty PropertyStorage (JSON backend) with its own price history."""
+    from property_storage import PropertyStorage
+
+    return PropertyStorage(str(tmp_path / 'properties.json'), history_file=str(tmp_path / 'price_history.db'))
+
+
+@pytest.fixture
+def fake_apify(monkeypatch):
+    """
+    Start fake Apify servers: fake_apify(**kwargs) takes FakeApifyServer's
+    arguments and points the app's scrapes at the new server.
+    """
+    from tests import fake_apify as module
+
+    servers = []
+
+    def start(**kwargs):
+        server = module.start_server(**kwargs)
+        servers.append(server)
+        monkeypatch.setenv('APIFY_API_TOKEN', 'fake-token')
+        monkeypatch.setenv('APIFY_BASE_URL', server.base_url)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def fake_centris():
+    """
+    Start fake Centris UpdateQuery servers: fake_centris(**kwargs) takes
+    FakeCentrisServer's arguments.
+    """
+    from tests import fake_centris as module
+
+    servers = []
+
+    def start(**kwargs):
+        server = module.start_server(**kwargs)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def app_module(storage, monkeypatch):
+    """The app, once its model is warm, storing listings in the `storage` fixture."""
+    import app
+
+    app.warmup_thread.join()
+    monkeypatch.setattr(app, 'property_storage', storage)
+    return app
+
+
+@pytest.fixture
+def detail_page_server():
+    """
+    Serve the Centris detail page fixtures at /en/<anything>/<id>.
+
+    Counts requests, requests in flight and their start times; set
+    `failures` to answer that many requests with a 503 first.
+    """
+    pages = {}
+    for path in glob.glob(os.path.join(FIXTURES_DIR, 'centris_details', '*.html')):
+        with open(path, 'rb') as f:
+            pages[os.path.splitext(os.path.basename(path))[0]] = f.read()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            server = self.server
+            with server.lock:
+                server.stats['requests'] += 1
+                server.stats['in_flight'] += 1
+                server.stats['max_in_flight'] = max(server.stats['max_in_flight'], server.stats['in_flight'])
+                server.started.append(time.monotonic())
+                fail = server.failures > 0
+                server.failures -= 1 if fail else 0
+            try:
+                time.sleep(server.latency)
+                body = pages.get(self.path.rstrip('/').rsplit('/', 1)[-1])
+                status = 503 if fail else 200 if body is not None else 404
+                body = body if status == 200 else b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                if status == 503:
+                    self.send_header('Retry-After', '0.05')
+                self.end_headers()
+                self.wfile.write(body)
+            finally:
+                with server.lock:
+                    server.stats['in_flight'] -= 1
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.latency = 0.05
+    server.failures = 0
+    server.started = []
+    server.stats = {'requests': 0, 'in_flight': 0, 'max_in_flight': 0}
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}/en/condos~for-sale~montreal"
+    threading.Thread(target=server.serve_forever, name='detail-fixtures', daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,207 @@
+"""
+Local stand-in for the parts of the Apify API used by centris_apify.py.
+
+Serves actor runs that finish after a few seconds, honors waitForFinish,
+pages dataset items with offset/limit, and can answer the first requests
+with 429/5xx errors to exercise retries. It also counts TCP connections,
+so connection reuse can be checked.
+
+    python -m tests.fake_apify [port]   # from backend/: serve, then run the scraper with
+                                        # APIFY_BASE_URL=http://localhost:<port>
+                                        # APIFY_API_TOKEN=anything
+
+The tests start it through the `fake_apify` fixture (see conftest.py).
+"""
+
+import json
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def fake_centris_item(i):
+    """Build a dataset item shaped like the Centris actor's output; every fourth one is a studio."""
+    return {
+        'id': str(30000000 + i),
+        'address': f"{100 + i} Rue Saint-Denis, Montreal, QC H2X 1K{i % 10}",
+        'price': f"${300000 + i * 1000:,}",
+        'bedrooms': i % 4,
+        'bathrooms': 1 + i % 2,
+        'livingArea': f"{600 + i * 5:,} sq ft",
+        'propertyType': 'Condo',
+        'url': f"https://www.centris.ca/en/condos~for-sale~montreal/{30000000 + i}"
+    }
+
+
+class FakeApifyServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, run_seconds=3.0, failures=None, latency=0.0, failed_offsets=(), items=None):
+        """
+        Initialize the server.
+
+        Args:
+            port: Port to listen on (0 picks a free one)
+            run_seconds: How long each actor run takes to succeed
+            failures: Dict mapping an HTTP method to the status codes returned,
+                in turn, by its first requests, e.g. {'GET': [503]}
+            latency: Seconds added to every response
+            failed_offsets: Dataset page offsets always answered with a 500,
+                to simulate a page that can't be fetched
+            items: Items in each run's dataset, i.e. listings on the market;
+                defaults to the run's maxItems
+        """
+        super().__init__(('127.0.0.1', port), FakeApifyHandler)
+        self.run_seconds = run_seconds
+        self.failures = {method: list(statuses) for method, statuses in (failures or {}).items()}
+        self.latency = latency
+        self.failed_offsets = set(failed_offsets)
+        self.items = items
+        self.lock = threading.Lock()
+        self.runs = {}  # run id -> {'started': ..., 'dataset': ..., 'items': ...}
+        self.datasets = {}  # dataset id -> list of items
+        self.stats = {'connections': 0, 'requests': 0, 'polls': 0, 'failures': 0}
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def handle_error(self, request, client_address):
+        """Ignore clients that went away mid-request, e.g. a killed app process."""
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def next_failure(self, method):
+        with self.lock:
+            statuses = self.failures.get(method)
+            return statuses.pop(0) if statuses else None
+
+    def run_object(self, run_id):
+        run = self.runs[run_id]
+        finished = time.monotonic() - run['started'] >= self.run_seconds
+        if finished and run['dataset'] not in self.datasets:
+            self.datasets[run['dataset']] = [fake_centris_item(i) for i in range(run['items'])]
+        return {
+            'id': run_id,
+            'status': 'SUCCEEDED' if finished else 'RUNNING',
+            'defaultDatasetId': run['dataset']
+        }
+
+
+class FakeApifyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so clients can reuse connections
+
+    def setup(self):
+        super().setup()
+        self.server.count('connections')
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload=None, headers=None):
+        body = json.dumps(payload if payload is not None else {'error': {'type': 'fake-error'}}).encode()
+        time.sleep(self.server.latency)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _begin(self):
+        """Count the request and return (path parts, query), or None if it was answered with an error."""
+        self.server.count('requests')
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if 'token' in query:
+            self._send(400, {'error': {'message': 'token must not be sent in the query string'}})
+            return None
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            self._send(401)
+            return None
+        failure = self.server.next_failure(self.command)
+        if failure:
+            self.server.count('failures')
+            self._send(failure, headers={'Retry-After': '0.1'} if failure == 429 else None)
+            return None
+        return url.path.strip('/').split('/'), query
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def do_POST(self):
+        actor_input = self._read_json()
+        request = self._begin()
+        if request is None:
+            return
+        parts, query = request
+        # /v2/acts/<actor>/runs
+        if len(parts) >= 3 and parts[-3] == 'acts' and parts[-1] == 'runs':
+            run_id = uuid.uuid4().hex[:12]
+            with self.server.lock:
+                self.server.runs[run_id] = {
+                    'started': time.monotonic(),
+                    'dataset': uuid.uuid4().hex[:12],
+                    'items': self.server.items if self.server.items is not None
+                             else int(actor_input.get('maxItems', 10))
+                }
+            self._wait_for_finish(run_id, query)
+            self._send(201, {'data': self.server.run_object(run_id)})
+        else:
+            self._send(404)
+
+    def do_GET(self):
+        request = self._begin()
+        if request is None:
+            return
+        parts, query = request
+        if len(parts) >= 2 and parts[-2] == 'actor-runs' and parts[-1] in self.server.runs:
+            self.server.count('polls')
+            self._wait_for_finish(parts[-1], query)
+            self._send(200, {'data': self.server.run_object(parts[-1])})
+        elif len(parts) >= 3 and parts[-3] == 'datasets' and parts[-1] == 'items' \
+                and parts[-2] in self.server.datasets:
+            items = self.server.datasets[parts[-2]]
+            offset = int(query.get('offset', 0))
+            limit = int(query.get('limit', len(items)))
+            if offset in self.server.failed_offsets:
+                self.server.count('failures')
+                self._send(500)
+                return
+            page = items[offset:offset + limit]
+            self._send(200, page, headers={
+                'X-Apify-Pagination-Offset': str(offset),
+                'X-Apify-Pagination-Limit': str(limit),
+                'X-Apify-Pagination-Count': str(len(page)),
+                'X-Apify-Pagination-Total': str(len(items))
+            })
+        else:
+            self._send(404)
+
+    def _wait_for_finish(self, run_id, query):
+        """Hold the request until the run finishes or waitForFinish seconds pass."""
+        deadline = time.monotonic() + min(float(query.get('waitForFinish', 0)), 60)
+        while self.server.run_object(run_id)['status'] == 'RUNNING' and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+
+def start_server(**kwargs):
+    """Start a FakeApifyServer on a background thread."""
+    server = FakeApifyServer(**kwargs)
+    threading.Thread(target=server.serve_forever, name='fake-apify', daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    server = FakeApifyServer(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8765)
+    print(f"Fake Apify API on {server.base_url} (runs take {server.run_seconds}s)")
+    server.serve_forever()
@@ -0,0 +1,140 @@
+"""
+Local stand-in for the Centris UpdateQuery API used by centris_api.py.
+
+Replays a fixed set of listings: a JSON file of raw Centris listings (as
+found in Result.Listings, with Property.Latitude/Longitude), or by default
+a seeded synthetic set clustered around downtown like the real market.
+Like Centris, it filters by bounding box, pages results and returns at
+most RESULT_CAP of them per query, and it can add latency per request.
+
+    python -m tests.fake_centris [port] [listings.json]   # from backend/: serve, then set
+                                                          # CENTRIS_API_URL=http://localhost:<port>/property/UpdateQuery
+
+The tests start it through the `fake_centris` fixture (see conftest.py).
+"""
+
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from centris_api import MONTREAL_BOUNDS, RESULT_CAP
+
+STREETS = ['Rue Saint-Denis', 'Boulevard Saint-Laurent', 'Rue Sherbrooke O', 'Avenue du Parc',
+           'Rue Ontario E', 'Rue Notre-Dame O', 'Avenue Papineau', 'Rue Wellington']
+
+
+def synthetic_listings(count=4000, seed=42):
+    """Build raw Centris listings, denser downtown so the crawl has to split tiles deeply."""
+    rnd = random.Random(seed)
+    lat_min, lat_max, lon_min, lon_max = MONTREAL_BOUNDS
+    listings = []
+    for i in range(count):
+        if rnd.random() < 0.6:
+            latitude = min(max(rnd.gauss(45.505, 0.02), lat_min), lat_max)
+            longitude = min(max(rnd.gauss(-73.57, 0.03), lon_min), lon_max)
+        else:
+            latitude = rnd.uniform(lat_min, lat_max)
+            longitude = rnd.uniform(lon_min, lon_max)
+        listings.append({
+            'Id': str(20000000 + i),
+            'Price': rnd.randrange(200000, 1000000, 1000),
+            'Property': {
+                'StreetNumber': 100 + i % 9000,
+                'Street': rnd.choice(STREETS),
+                'City': 'Montreal',
+                'Province': 'QC',
+                'PostalCode': f"H2X 1K{i % 10}",
+                'BedroomTotal': rnd.randint(0, 4),
+                'BathroomTotal': rnd.randint(1, 2),
+                'LivingArea': rnd.randrange(450, 2000),
+                'Type': 'Condo',
+                'Latitude': latitude,
+                'Longitude': longitude
+            }
+        })
+    return listings
+
+
+class FakeCentrisServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, listings=None, port=0, latency=0.05, result_cap=RESULT_CAP):
+        """
+        Initialize the server.
+
+        Args:
+            listings: Raw Centris listings to serve (defaults to synthetic_listings())
+            port: Port to listen on (0 picks a free one)
+            latency: Seconds added to every response
+            result_cap: Most results returned for one query
+        """
+        super().__init__(('127.0.0.1', port), FakeCentrisHandler)
+        self.listings = sorted(listings if listings is not None else synthetic_listings(),
+                               key=lambda listing: listing['Id'])
+        self.latency = latency
+        self.result_cap = result_cap
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'in_flight': 0, 'max_in_flight': 0}
+
+    @property
+    def api_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/property/UpdateQuery"
+
+    def search(self, query):
+        """Answer one UpdateQuery: the requested page of the listings in the box."""
+        matches = [
+            listing for listing in self.listings
+            if query['LatitudeMin'] <= listing['Property']['Latitude'] < query['LatitudeMax']
+            and query['LongitudeMin'] <= listing['Property']['Longitude'] < query['LongitudeMax']
+        ]
+        page_size = query['ResultsPerPage']
+        start = query['CurrentPage'] * page_size
+        page = matches[:self.result_cap][start:start + page_size]
+        return {'Result': {'Listings': page, 'Count': len(matches)}}
+
+
+class FakeCentrisHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        with server.lock:
+            server.stats['requests'] += 1
+            server.stats['in_flight'] += 1
+            server.stats['max_in_flight'] = max(server.stats['max_in_flight'], server.stats['in_flight'])
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            query = json.loads(self.rfile.read(length))['query']
+            time.sleep(server.latency)
+            body = json.dumps(server.search(query)).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.stats['in_flight'] -= 1
+
+
+def start_server(**kwargs):
+    """Start a FakeCentrisServer on a background thread."""
+    server = FakeCentrisServer(**kwargs)
+    threading.Thread(target=server.serve_forever, name='fake-centris', daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    listings = None
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], 'r') as f:
+            listings = json.load(f)
+    server = FakeCentrisServer(listings, port=int(sys.argv[1]) if len(sys.argv) > 1 else 8766)
+    print(f"Fake Centris API on {server.api_url} ({len(server.listings)} listings)")
+    server.serve_forever()
@@ -0,0 +1,76 @@
+import pytest
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.mark.parametrize('field', ['offset', 'limit'])
+@pytest.mark.parametrize('value', ['10', -1, 1.5, True, [1]])
+def test_analyze_rejects_bad_page_bounds(client, field, value):
+    response = client.post('/api/analyze', json={field: value})
+    assert response.status_code == 400
+    assert field in response.get_json()['error']
+
+
+def test_analyze_pages_stored_listings(client, storage):
+    listings = [{'centris_id': str(1000 + i), 'address': f"{100 + i} Rue Saint-Denis, Montreal, QC H2X 1K{i}",
+                 'price': 400000 + i * 10000, 'bedrooms': i % 3, 'bathrooms': 1,
+                 'url': f"https://www.centris.ca/en/condos~for-sale~montreal/{1000 + i}"}
+                for i in range(5)]
+    assert all(result['success'] for result in storage.add_properties(listings))
+
+    everything = client.post('/api/analyze', json={}).get_json()
+    page = client.post('/api/analyze', json={'offset': 1, 'limit': 2}).get_json()
+    assert everything['total'] == page['total'] == 5
+    assert page['properties'] == everything['properties'][1:3]
+
+
+def test_properties_rejects_negative_page_bounds(client):
+    assert client.get('/api/properties?offset=-1').status_code == 400
+    assert client.get('/api/properties?limit=-5').status_code == 400
+
+
+@pytest.mark.parametrize('value', ['fifty', 0, -5, 2.5, True, None, [50]])
+def test_scrape_rejects_bad_max_listings(client, app_module, value, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(app_module.job_manager, 'submit', lambda *args, **kwargs: submitted.append(kwargs))
+    response = client.post('/api/scrape', json={'max_listings': value})
+    assert response.status_code == 400
+    assert 'max_listings' in response.get_json()['error']
+    assert not submitted
+
+
+@pytest.mark.parametrize('value, expected', [('50', 50), (50, 50), (50.0, 50)])
+def test_scrape_coerces_max_listings(client, app_module, value, expected, monkeypatch):
+    submitted = []
+
+    def submit(job_type, func, **kwargs):
+        submitted.append(kwargs)
+        return {'id': 'job', 'status': 'queued'}
+
+    monkeypatch.setattr(app_module.job_manager, 'submit', submit)
+    response = client.post('/api/scrape', json={'max_listings': value})
+    assert response.status_code == 202
+    assert submitted[0]['max_listings'] == expected
+
+
+def test_changes_asks_clients_behind_pruned_deletes_to_resync(client, storage):
+    listings = [{'centris_id': str(1000 + i), 'address': f"{100 + i} Rue Saint-Denis, Montreal, QC H2X 1K{i}",
+                 'price': 400000, 'bedrooms': 2, 'bathrooms': 1,
+                 'url': f"https://www.centris.ca/en/condos~for-sale~montreal/{1000 + i}"}
+                for i in range(5)]
+    storage.backend.tombstone_retention = 2
+    assert all(result['success'] for result in storage.add_properties(listings))
+    since = client.get('/api/changes?since=0').get_json()['version']
+    assert storage.delete_property('1000')['success']
+    recent = client.get(f"/api/changes?since={since}").get_json()
+    assert not recent['full_resync'] and recent['deletes'] == ['1000']
+
+    for listing in listings[1:]:
+        storage.add_property(dict(listing, price=390000))
+    storage.backend.compact()
+    stale = client.get(f"/api/changes?since={since}").get_json()
+    assert stale['full_resync'] and stale['deletes'] == []
+    assert not client.get(f"/api/changes?since={recent['version']}").get_json()['full_resync']
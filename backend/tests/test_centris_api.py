@@ -0,0 +1,22 @@
+import time
+
+from centris_api import CentrisAPI
+from tests.fake_centris import synthetic_listings
+
+
+def test_concurrent_crawl_finds_every_listing_once_and_faster(fake_centris):
+    server = fake_centris(listings=synthetic_listings(2000), latency=0.02)
+    api = CentrisAPI()
+    api.api_url = server.api_url
+    expected = {listing['Id'] for listing in server.listings}
+
+    elapsed = {}
+    for workers, rate in ((1, None), (8, 100.0)):
+        start = time.perf_counter()
+        properties = api.crawl_properties(workers=workers, rate=rate)
+        elapsed[workers] = time.perf_counter() - start
+        ids = [prop['centris_id'] for prop in properties]
+        assert len(ids) == len(set(ids))
+        assert set(ids) == expected
+
+    assert elapsed[8] < elapsed[1] / 2
@@ -0,0 +1,15 @@
+from centris_apify import ApifyClient, CentrisApify
+
+
+def test_scrape_retries_over_one_connection_with_long_polls(fake_apify):
+    # POSTs are only retried on 429s
+    server = fake_apify(run_seconds=2.5, failures={'POST': [429], 'GET': [503]})
+    client = ApifyClient('fake-token', server.base_url, backoff_base=0.1)
+
+    properties = CentrisApify(client=client).search_properties(max_results=25, max_wait=30)
+
+    assert len(properties) == 25
+    assert server.stats['failures'] == 2
+    assert server.stats['connections'] == 1
+    # One or two long polls instead of one poll every few seconds
+    assert server.stats['polls'] <= 2
@@ -0,0 +1,33 @@
+import driver_pool
+
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_calls = 0
+
+    def execute_script(self, script):
+        return 1
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+def test_exit_handler_quits_the_current_shared_pools(monkeypatch):
+    drivers = []
+
+    def launch(headless=True):
+        drivers.append(FakeDriver())
+        return drivers[-1]
+
+    monkeypatch.setattr(driver_pool, 'chrome_driver', launch)
+    monkeypatch.setattr(driver_pool, '_pools', {})
+    replaced = driver_pool.shared_pool()
+    replaced.warm()
+    replaced.close()
+    pool = driver_pool.shared_pool()
+    assert pool is not replaced
+    pool.warm()
+
+    driver_pool._close_pools()
+    assert pool.closed
+    assert [driver.quit_calls for driver in drivers] == [1, 1]
@@ -0,0 +1,33 @@
+from centris_api import CentrisAPI
+from centris_apify import ApifyClient, CentrisApify
+from tests.fake_centris import synthetic_listings
+from http_cache import get_cache
+
+
+def test_recorded_scrapes_replay_offline(tmp_path, monkeypatch, fake_apify, fake_centris):
+    monkeypatch.setenv('HTTP_CACHE_DIR', str(tmp_path))
+    apify_server = fake_apify(run_seconds=1.0, failures={'GET': [503]})
+    centris_server = fake_centris(listings=synthetic_listings(1500), latency=0.01)
+
+    def scrape_and_crawl(mode):
+        # The scrapers' adapters pick the mode up from the environment
+        monkeypatch.setenv('HTTP_CACHE_MODE', mode)
+        client = ApifyClient('fake-token', apify_server.base_url, backoff_base=0.1)
+        scraped = CentrisApify(client=client).search_properties(max_results=300, max_wait=30)
+        api = CentrisAPI()
+        api.api_url = centris_server.api_url
+        crawled = api.crawl_properties(rate=None)
+        return scraped, sorted(crawled, key=lambda prop: prop['centris_id'])
+
+    recorded_scrape, recorded_crawl = scrape_and_crawl('record')
+    for server in (apify_server, centris_server):
+        server.shutdown()
+        server.server_close()
+
+    get_cache().replayed.clear()
+    replayed_scrape, replayed_crawl = scrape_and_crawl('replay')
+
+    assert len(recorded_scrape) == 300
+    assert len(recorded_crawl) == 1500
+    assert replayed_scrape == recorded_scrape
+    assert replayed_crawl == recorded_crawl
@@ -0,0 +1,75 @@
+import threading
+import time
+
+from job_manager import FINISHED, JobManager
+
+
+def _wait_for(get_job, job_id, statuses, timeout=30):
+    """Poll a job until it reaches one of the statuses."""
+    deadline = time.time() + timeout
+    job = get_job(job_id)
+    while (job is None or job['status'] not in statuses) and time.time() < deadline:
+        time.sleep(0.1)
+        job = get_job(job_id)
+    return job
+
+
+def test_scrape_is_polled_to_completion_on_another_worker(app_module, fake_apify, tmp_path, monkeypatch):
+    count = 300
+    fake_apify(run_seconds=0.5, items=count)
+    jobs_path = str(tmp_path / 'jobs.db')
+    client = app_module.app.test_client()
+
+    monkeypatch.setattr(app_module, 'job_manager', JobManager(db_file=jobs_path))
+    response = client.post('/api/scrape', json={'max_listings': count, 'store': True})
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+
+    # The polls land on another worker (or the same one after a restart)
+    monkeypatch.setattr(app_module, 'job_manager', JobManager(db_file=jobs_path))
+
+    def get_job(job_id):
+        return client.get(f"/api/jobs/{job_id}").get_json().get('job')
+
+    job = _wait_for(get_job, job_id, FINISHED)
+    assert job['status'] == 'succeeded', job['error']
+    assert job['result']['count'] == count
+    assert job_id in [entry['id'] for entry in client.get('/api/jobs').get_json()['jobs']]
+    assert client.get('/api/jobs/unknown').status_code == 404
+
+
+def _start_blocked_job(manager):
+    release = threading.Event()
+    job = manager.submit('test', lambda report_progress: release.wait(10))
+    assert _wait_for(manager.get_job, job['id'], ('running',))['status'] == 'running'
+    return job['id'], release
+
+
+def test_job_of_a_stopped_worker_is_reported_failed(tmp_path):
+    jobs_path = str(tmp_path / 'jobs.db')
+    # A worker that stopped: its heartbeat never comes
+    stopped = JobManager(db_file=jobs_path, heartbeat_interval=3600)
+    job_id, release = _start_blocked_job(stopped)
+    try:
+        other = JobManager(db_file=jobs_path, heartbeat_interval=0.1)
+        time.sleep(0.5)
+        job = other.get_job(job_id)
+        assert job['status'] == 'failed'
+        assert job['error'].startswith('Interrupted')
+    finally:
+        release.set()
+        stopped.executor.shutdown()
+
+
+def test_job_of_a_live_worker_keeps_running(tmp_path):
+    jobs_path = str(tmp_path / 'jobs.db')
+    live = JobManager(db_file=jobs_path, heartbeat_interval=0.1)
+    job_id, release = _start_blocked_job(live)
+    try:
+        other = JobManager(db_file=jobs_path, heartbeat_interval=0.1)
+        time.sleep(0.6)
+        assert other.get_job(job_id)['status'] == 'running'
+    finally:
+        release.set()
+        live.executor.shutdown()
+    assert other.get_job(job_id)['status'] == 'succeeded'
@@ -0,0 +1,102 @@
+import time
+
+import requests
+
+from listing_enricher import ListingEnricher
+from mortgage_calculator import MortgageCalculator
+from property_storage import DETAIL_FIELDS
+
+EXPECTED = {
+    '21000001': {'latitude': 45.52391, 'longitude': -73.58467, 'municipal_taxes': 2954.0,
+                 'school_taxes': 248.0, 'condo_fees': 3120.0},
+    '21000002': {'latitude': 45.54127, 'longitude': -73.59512, 'municipal_taxes': 6812.0,
+                 'school_taxes': 611.0},
+    '21000003': {'latitude': 45.52011, 'longitude': -73.55893, 'municipal_taxes': 2104.0,
+                 'school_taxes': 187.0, 'condo_fees': 2940.0},
+    '21000004': {'latitude': 45.45893, 'longitude': -73.56821},
+}
+MISSING_ID = '29999999'  # No fixture: answered with a 404
+
+
+def _enrich(server, concurrency, rate, failures=0):
+    """Enrich 40 listings with fixtures and one without, returning them, the stats and the time taken."""
+    server.failures = failures
+    listings = [{'centris_id': centris_id, 'price': 500000, 'url': f"{server.base_url}/{centris_id}"}
+                for centris_id in sorted(EXPECTED) * 10 + [MISSING_ID]]
+    enricher = ListingEnricher(concurrency=concurrency, rate=rate, session=requests.Session())
+    start = time.perf_counter()
+    enricher.enrich_listings(listings)
+    elapsed = time.perf_counter() - start
+    enricher.close()
+    return listings, dict(enricher.stats), elapsed
+
+
+def test_enrich_extracts_details_within_limits(detail_page_server):
+    listings, stats, _ = _enrich(detail_page_server, concurrency=8, rate=50.0, failures=2)
+
+    for listing in listings[:-1]:
+        found = {field: listing[field] for field in DETAIL_FIELDS if field in listing}
+        assert found == EXPECTED[listing['centris_id']]
+    assert 'latitude' not in listings[-1]
+    assert stats['failed'] == 1
+    assert stats['retries'] == 2 and stats['fetched'] == 40
+    assert 1 < detail_page_server.stats['max_in_flight'] <= 8
+    # 43 requests (41 pages, 2 retries) at 50 per second span at least 0.84s
+    started = detail_page_server.started
+    assert started[-1] - started[0] >= (detail_page_server.stats['requests'] - 1) / 50.0 * 0.95
+
+
+def test_concurrent_enrichment_is_faster(detail_page_server):
+    _, _, sequential = _enrich(detail_page_server, concurrency=1, rate=None)
+    _, _, concurrent = _enrich(detail_page_server, concurrency=8, rate=None)
+    assert concurrent < sequential / 2
+
+
+def test_known_costs_replace_defaults():
+    calculator = MortgageCalculator()
+    condo = EXPECTED['21000001']
+    costs = calculator.calculate_total_monthly_costs(
+        500000, condo['municipal_taxes'] + condo['school_taxes'], condo['condo_fees']
+    )
+    defaults = calculator.calculate_total_monthly_costs(500000)
+    assert costs['property_tax'] == round(3202 / 12, 2)
+    assert costs['maintenance'] == 260.0
+    assert defaults['maintenance'] == round(calculator.monthly_maintenance, 2)
+
+
+def _store_enriched(storage):
+    """Store an enriched listing; return it and the same listing as a search result would bring it."""
+    listing = dict(EXPECTED['21000001'], centris_id='21000001', price=500000, bedrooms=2, bathrooms=1,
+                   address='1234 Rue Saint-Denis, Montreal, QC H2X 3K2',
+                   url='https://www.centris.ca/en/condos~for-sale~montreal/21000001')
+    list(storage.add_properties([dict(listing)]))
+    plain = {field: value for field, value in listing.items() if field not in DETAIL_FIELDS}
+    return listing, plain
+
+
+def _details(storage, centris_id):
+    stored = storage.get_property(centris_id)
+    return {field: stored.get(field) for field in DETAIL_FIELDS}
+
+
+def test_plain_reingest_is_unchanged_and_keeps_details(storage):
+    listing, plain = _store_enriched(storage)
+    results = list(storage.add_properties([dict(plain)], skip_unchanged=True))
+    assert [result['status'] for result in results] == ['unchanged']
+    assert _details(storage, '21000001') == {field: listing[field] for field in DETAIL_FIELDS}
+
+
+def test_changed_listing_keeps_details(storage):
+    listing, plain = _store_enriched(storage)
+    results = list(storage.add_properties([dict(plain, price=plain['price'] - 10000)], skip_unchanged=True))
+    assert [result['status'] for result in results] == ['updated']
+    assert _details(storage, '21000001') == {field: listing[field] for field in DETAIL_FIELDS}
+
+
+def test_moved_listing_keeps_costs_but_not_coordinates(storage):
+    listing, plain = _store_enriched(storage)
+    storage.add_property(dict(plain, address='5000 Rue Wellington, Verdun, QC H4G 1X4'))
+    moved = _details(storage, '21000001')
+    assert moved['condo_fees'] == listing['condo_fees']
+    assert moved['municipal_taxes'] == listing['municipal_taxes']
+    assert (moved['latitude'], moved['longitude']) != (listing['latitude'], listing['longitude'])
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+from pipeline import Pipeline
+
+
+def test_slow_stage_holds_back_the_source():
+    produced = []
+    consumed = []
+    in_flight = []
+
+    def source():
+        for number in range(60):
+            produced.append(number)
+            in_flight.append(len(produced) - len(consumed))
+            yield [number] * 10
+
+    def slow(batch):
+        time.sleep(0.005)
+        return batch
+
+    pipeline = Pipeline(source(), [('double', lambda batch: batch * 2), ('slow', slow)],
+                        buffer_size=2, name='test')
+    stats = pipeline.run(lambda batch: consumed.append(batch[0]))
+
+    assert consumed == list(range(60))
+    # Two buffers of two, one batch in each stage and one in the source
+    assert max(in_flight) <= 2 * 3 + 3
+    assert stats[2]['items_out'] == 1200
+
+
+def test_failing_stage_cancels_the_pipeline():
+    closed = []
+
+    def source():
+        try:
+            for number in range(1000):
+                yield [number]
+        finally:
+            closed.append(True)
+
+    def fail(batch):
+        if batch[0] == 5:
+            raise ValueError('bad batch')
+        return batch
+
+    pipeline = Pipeline(source(), [('fail', fail)], buffer_size=2, name='test')
+    with pytest.raises(ValueError, match='bad batch'):
+        pipeline.run()
+    assert closed
+    assert not any(thread.is_alive() for thread in pipeline.threads)
+
+
+def test_quitting_early_stops_the_stages():
+    pipeline = Pipeline(iter([[number] for number in range(1000)]), [('same', lambda batch: batch)],
+                        buffer_size=2, name='test')
+    for batch in pipeline:
+        if batch[0] == 3:
+            break
+    assert not any(thread.is_alive() for thread in pipeline.threads)
@@ -0,0 +1,74 @@
+import multiprocessing
+import os
+import time
+
+from scheduler import JobSkipped, Scheduler
+
+
+def _wait_until_idle(scheduler, timeout=5):
+    deadline = time.time() + timeout
+    while any(job.running for job in scheduler.jobs.values()) and time.time() < deadline:
+        time.sleep(0.05)
+
+
+def _schedule_logged_job(state_dir, log_path, seconds):
+    """One 'gunicorn worker': schedule a shared job that logs its runs."""
+    def job():
+        start = time.time()
+        time.sleep(0.2)
+        with open(log_path, 'a') as f:
+            f.write(f"{os.getpid()} {start} {time.time()}\n")
+        return {'pid': os.getpid()}
+
+    scheduler = Scheduler(state_dir=state_dir, jitter=0.2)
+    scheduler.add('refresh', job, interval=1.0, delay=0.1)
+    scheduler.start()
+    time.sleep(seconds)
+    scheduler.stop()
+    # Let a run in progress finish, or it stays 'running' in the shared state
+    _wait_until_idle(scheduler)
+
+
+def test_shared_job_runs_once_per_interval_across_processes(tmp_path):
+    state_dir = str(tmp_path)
+    log_path = str(tmp_path / 'runs.log')
+    seconds = 6
+    processes = [multiprocessing.Process(target=_schedule_logged_job, args=(state_dir, log_path, seconds))
+                 for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    with open(log_path, 'r') as f:
+        runs = sorted((float(start), float(end)) for _, start, end in (line.split() for line in f))
+    assert all(runs[i + 1][0] >= runs[i][1] for i in range(len(runs) - 1)), 'runs overlap'
+    assert 3 <= len(runs) <= seconds + 1
+
+    # Another process sees the runs in the shared state
+    shared = Scheduler(state_dir=state_dir)
+    shared.add('refresh', lambda: None, interval=1.0)
+    refresh = shared.status()[0]
+    assert refresh['runs'] == len(runs)
+    assert refresh['last_run']['outcome'] == 'succeeded'
+
+
+def test_failed_and_skipped_runs_are_recorded(tmp_path):
+    scheduler = Scheduler(state_dir=str(tmp_path))
+
+    def fail():
+        raise ValueError('boom')
+
+    def skip():
+        raise JobSkipped('nothing to do')
+
+    scheduler.add('fail', fail, interval=60)
+    scheduler.add('skip', skip, interval=60, shared=False)
+    for name in ('fail', 'skip'):
+        scheduler.run_now(name)
+    _wait_until_idle(scheduler)
+
+    status = {job['name']: job for job in scheduler.status()}
+    assert status['fail']['last_run']['outcome'] == 'failed'
+    assert status['fail']['failures'] == 1
+    assert status['skip']['last_run']['outcome'] == 'skipped'
@@ -0,0 +1,73 @@
+import pytest
+
+from centris_apify import ApifyError
+
+
+def _scrape(app, **kwargs):
+    return app.run_scrape_job(lambda message: None, **kwargs)
+
+
+def test_refresh_streams_a_10k_scrape_into_storage(app_module, fake_apify):
+    count = 10000
+    fake_apify(run_seconds=0.5)
+    first = _scrape(app_module, max_listings=count, store=True, analyze=True)
+    second = _scrape(app_module, max_listings=count, store=True, analyze=True)
+
+    properties, columns = app_module.property_storage.get_portfolio()
+    assert first['ingest']['new'] == count and len(properties) == count
+    assert second['ingest']['unchanged'] == count and not second['ranking']
+
+    # The streamed ranking matches an analysis of the whole stored portfolio
+    portfolio = app_module.AnalyzedPortfolio.from_columns(properties, columns)
+    expected = [str(properties[portfolio.rows[position]]['centris_id']) for position in portfolio.order.tolist()]
+    assert first['ranking'] == expected
+    top = [str(analysis['listing']['centris_id']) for analysis in first['properties']]
+    assert top == expected[:len(top)]
+
+
+def test_complete_scrape_with_a_failed_page_removes_nothing(app_module, fake_apify):
+    count = 1000
+    fake_apify(run_seconds=0.2, items=count)
+    clean = _scrape(app_module, max_listings=count, store=True, complete=True)
+    assert clean['ingest']['new'] == count
+
+    fake_apify(run_seconds=0.2, items=count, failed_offsets=(250,))
+    with pytest.raises(ApifyError):
+        _scrape(app_module, max_listings=count, store=True, complete=True)
+    assert app_module.property_storage.get_property_count() == count
+
+
+def test_refresh_stores_studios_and_removes_delisted(app_module, fake_apify, monkeypatch):
+    # The fake market has studios: listings with 0 bedrooms
+    monkeypatch.setattr(app_module, 'REFRESH_MAX_LISTINGS', 1000)
+    fake_apify(run_seconds=0.2, items=200)
+    first = app_module.refresh_market()
+    assert first['store_errors'] == 0 and first['ingest']['new'] == 200
+    assert app_module.property_storage.get_property('30000000')['bedrooms'] == 0
+
+    fake_apify(run_seconds=0.2, items=190)
+    second = app_module.refresh_market()
+    assert second['removal_skipped'] is None
+    assert second['ingest']['removed'] == 10
+    assert app_module.property_storage.get_property_count() == 190
+
+
+def test_invalid_listing_fails_the_refresh_and_removes_nothing(app_module, fake_apify, monkeypatch):
+    monkeypatch.setattr(app_module, 'REFRESH_MAX_LISTINGS', 1000)
+    fake_apify(run_seconds=0.2, items=200)
+    app_module.refresh_market()
+
+    # One listing that parsing lets through but storage rejects
+    parse_items = app_module.CentrisApify.parse_items
+
+    def parse_with_an_invalid_listing(self, items):
+        listings = parse_items(self, items)
+        if listings and listings[0]['centris_id'] == '30000000':
+            listings[0]['bedrooms'] = 'two'
+        return listings
+
+    monkeypatch.setattr(app_module.CentrisApify, 'parse_items', parse_with_an_invalid_listing)
+    fake_apify(run_seconds=0.2, items=190)
+    with pytest.raises(RuntimeError, match='failed to store'):
+        app_module.refresh_market()
+    assert app_module.property_storage.get_property_count() == 200
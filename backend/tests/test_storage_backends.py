@@ -0,0 +1,66 @@
+import multiprocessing
+
+import pytest
+
+from property_storage import PropertyStorage
+from storage_backends import _synthetic_listing, create_backend
+
+LISTINGS_PER_WRITER = 300
+
+
+def _write_listings(kind, path, writer_id, count, start):
+    """One 'gunicorn worker': add `count` listings of its own to the shared store."""
+    storage = PropertyStorage(path, backend=kind)
+    start.wait()
+    for i in range(count):
+        result = storage.add_property(_synthetic_listing(writer_id * count + i))
+        if not result['success']:
+            raise RuntimeError(result['error'])
+
+
+@pytest.mark.parametrize('kind', ['sqlite', 'json'])
+@pytest.mark.parametrize('writers', [1, 4, 8])
+def test_concurrent_writers_lose_nothing(tmp_path, kind, writers):
+    path = str(tmp_path / f"properties.{kind}")
+    create_backend(kind, path)
+    start = multiprocessing.Event()
+    processes = [
+        multiprocessing.Process(target=_write_listings,
+                                args=(kind, path, writer_id, LISTINGS_PER_WRITER, start))
+        for writer_id in range(writers)
+    ]
+    for process in processes:
+        process.start()
+    start.set()
+    for process in processes:
+        process.join()
+
+    assert [process.exitcode for process in processes] == [0] * writers
+    stored = {prop['centris_id']: prop for prop in create_backend(kind, path).load()[0]}
+    expected = [_synthetic_listing(i) for i in range(writers * LISTINGS_PER_WRITER)]
+    assert len(stored) == len(expected)
+    assert all(stored[listing['centris_id']]['price'] == listing['price'] for listing in expected)
+
+
+@pytest.mark.parametrize('kind', ['sqlite', 'json'])
+def test_old_tombstones_are_pruned(tmp_path, kind):
+    backend = create_backend(kind, str(tmp_path / f"properties.{kind}"))
+    backend.tombstone_retention = 5
+    backend.upsert_many([_synthetic_listing(i) for i in range(3)], 'now')
+    backend.delete('10000000', 'now')
+    deleted_at = backend.changes_since(0)[3]
+    for i in range(3, 13):
+        backend.upsert_many([_synthetic_listing(i)], 'now')
+    if kind == 'json':
+        backend.compact()
+
+    upserts, deletes, _, version, pruned_version = backend.changes_since(0)
+    assert deletes == [] and pruned_version == deleted_at
+    assert backend.changes_since(deleted_at)[1] == []
+    # Recent deletes are still reported to clients that are not too far behind
+    backend.delete('10000001', 'now')
+    assert backend.changes_since(version)[1] == ['10000001']
+    if kind == 'json':
+        backend.compact()
+        reopened = create_backend(kind, backend.storage_file)
+        assert reopened.changes_since(version)[1:] == backend.changes_since(version)[1:]